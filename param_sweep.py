@@ -1,6 +1,6 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
+# matplotlib 只在画图的函数里导入，无界面的 sweep worker 不加载它
+from swarm_sim.convergence import has_converged # 统一的收敛检测函数
 
 # 设置是否启用通信
 use_comm = True
@@ -11,12 +11,6 @@ if use_comm:
 else:
     from q1_q2.swarm import Swarm #无通信版本 （Q1/Q2）
 
-# 统一的收敛检测函数
-def has_converged(positions, thresh=5.0):
-    center = positions.mean(axis=0)
-    maxd = np.max(np.linalg.norm(positions - center, axis=1))
-    return maxd < thresh
-
 # 跑一轮实验，返回收敛所需步数或None
 def run_once(perception_radius=30, communication_radius=None,num_agents=30, 
              speed=0.5, max_steps=300, strategy="between", seed=None):
@@ -32,10 +26,9 @@ def run_once(perception_radius=30, communication_radius=None,num_agents=30,
                       speed=speed,
                       perception_radius=perception_radius)
     
-    for step in range(max_steps):
-        swarm.step(strategy)
-        if has_converged(swarm.get_positions()):
-            return step
+    steps, converged = swarm.run(max_steps, strategy)
+    if converged:
+        return steps - 1 # 收敛的那一步的下标
     return None #未收敛
 
 # 参数扫描
@@ -57,6 +50,8 @@ def sweep():
     
 # 绘图
 def plot(results_x, results_dict):
+    import matplotlib.pyplot as plt
+
     steps = [results_dict[k] for k in results_x]
     steps = [s if s!=-1 else 300 for s in steps] # 用max_steps 替代未收敛
 
@@ -74,6 +69,9 @@ def plot(results_x, results_dict):
 
 def visualize(communication_radius=None, perception_radius=30, num_agents=30, 
               speed=0.5, max_steps=300, strategy="between", seed=None):
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+
     if seed is not None:
         np.random.seed(seed)
 
@@ -1,29 +1,20 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.cluster import DBSCAN
-import matplotlib.animation as animation
+# matplotlib 只在画图的函数里导入，无界面的 sweep worker 不加载它
 from q3.swarm import Swarm #确保导入的是你第二份或第一份的Swarm，看你用哪个
-
-# 判断是否收敛(所有agent距离中心小于某个阈值)
-def has_converged(positions, thresh=5.0):
-    center = positions.mean(axis=0)
-    maxd = np.max(np.linalg.norm(positions - center, axis=1))
-    return maxd < thresh
-
-def get_cluster_count(positions, eps=5.0, min_samples=2):
-    #from sklearn.cluster import DBSCAN
-    clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(positions)
-    labels = clustering.labels_
-    n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
-    return n_clusters
+from swarm_sim.cluster import get_cluster_count # 网格 + 并查集，结果和 DBSCAN 相同
+from swarm_sim.convergence import has_converged # 判断是否收敛(所有agent距离中心小于某个阈值)
+from swarm_sim.recorder import TrajectoryRecorder
+from swarm_sim.render import convergence_titles, render
+from swarm_sim.sweep import run_sweep
 
 # 单次实验
 def run_once(perception_radius, speed=0.5, num_agents=30, 
-             max_steps=300, strategy="between", seed=None):
-    if seed is not None:
+             max_steps=300, strategy="between", seed=None, rng=None):
+    # rng: 并行 sweep 时每个任务自己的 Generator；不传时用全局随机数
+    if rng is None and seed is not None:
         np.random.seed(seed) #固定随机性
     
-    swarm = Swarm(num_agents=num_agents, speed=speed, perception_radius=perception_radius)
+    swarm = Swarm(num_agents=num_agents, speed=speed, perception_radius=perception_radius, rng=rng)
     for step in range(max_steps):
         swarm.step(strategy)
     
@@ -33,14 +24,18 @@ def run_once(perception_radius, speed=0.5, num_agents=30,
     return converged, n_clusters
 
 # 参数扫描
-def param_sweep(seed=42):
+# store: 可选的 ResultStore(("converged", "clusters"))，每次运行的原始结果追加进去
+def param_sweep(seed=42, workers=None, cache=None, checkpoint=None, store=None):
     perception_radii = [10, 20, 30, 40, 50, 60, 80, 100]
     results_converged = []
     results_clusters = []
 
-    for r in perception_radii:
+    cells = [dict(perception_radius=r) for r in perception_radii]
+    cell_results = run_sweep(run_once, cells, [seed], workers=workers, cache=cache, checkpoint=checkpoint,
+                             store=store)
+
+    for r, [(converged, n_clusters)] in zip(perception_radii, cell_results):
         print(f"Running perception_radius = {r} ...")
-        converged, n_clusters = run_once(perception_radius=r, seed=seed)
         results_converged.append(int(converged))
         results_clusters.append(n_clusters)
         print(f"-> Converged: {converged}, Clusters: {n_clusters}")
@@ -49,6 +44,8 @@ def param_sweep(seed=42):
 
 # 可视化结果
 def plot_results(perception_radii, converged_list, cluster_list):
+    import matplotlib.pyplot as plt
+
     fig, ax1 = plt.subplots()
 
     color = 'tab:blue'
@@ -70,11 +67,27 @@ def plot_results(perception_radii, converged_list, cluster_list):
 
 # 感兴趣时，输出动画版的结果
 def visualize_swarm(perception_radius, speed=0.5, num_agents=30, 
-                    strategy="between", seed=None, save_path=None):
+                    strategy="between", seed=None, save_path=None, frames=100):
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+
     if seed is not None:
         np.random.seed(seed)
+    # 先模拟并记录轨迹，保存 GIF 和动画显示都直接用记录下来的帧
+    recorder = TrajectoryRecorder(num_agents, capacity=frames + 1)
     swarm = Swarm(num_agents=num_agents, speed=speed, 
-                  perception_radius=perception_radius)
+                  perception_radius=perception_radius,
+                  recorder=recorder)
+    for _ in range(frames):
+        swarm.step(strategy)
+    trajectory = recorder.frames()[1:] # 第 frame 帧 = 走完 frame+1 步之后的位置
+
+    # 保存为GIF（可选），离线渲染，不经过 matplotlib
+    if save_path:
+        print(f"Saving GIF to {save_path} ...")
+        titles = convergence_titles(trajectory, running=f"Swarm Strategy: {strategy} (Step {{step}})")
+        render(trajectory, save_path, fps=10, titles=titles)
+
     fig, ax = plt.subplots()
     scat = ax.scatter([], [], s=50)
     ax.set_xlim(0, 100)
@@ -86,8 +99,7 @@ def visualize_swarm(perception_radius, speed=0.5, num_agents=30,
         return scat, # 注意返回是元组
     
     def update(frame):
-        swarm.step(strategy)
-        positions = swarm.get_positions()
+        positions = trajectory[frame]
         scat.set_offsets(positions)
 
             # 判断是否收敛
@@ -97,12 +109,8 @@ def visualize_swarm(perception_radius, speed=0.5, num_agents=30,
             ax.set_title(f"Swarm Strategy: {strategy} (Step {frame})")
         return scat,
 
-    ani = animation.FuncAnimation(fig, update, frames=100, init_func=init,
+    ani = animation.FuncAnimation(fig, update, frames=len(trajectory), init_func=init,
                                    interval=100, blit=True)
-    # 保存为GIF（可选）
-    if save_path:
-        print(f"Saving GIF to {save_path} ...")
-        ani.save(save_path, writer='pillow', fps=10)
 
     # 添加这一行：把 ani 存起来
     plt.ani = ani  # 关键点！
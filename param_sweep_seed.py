@@ -1,51 +1,64 @@
 # 并未实现聚类算法
 import numpy as np
-from sklearn.cluster import DBSCAN
-import matplotlib.pyplot as plt
+# matplotlib 只在画图的函数里导入，无界面的 sweep worker 不加载它
 from q3.swarm import Swarm # 或根据你的路径导入
-
-def has_converged(positions, thresh=5.0):
-    center = positions.mean(axis=0)
-    maxd = np.max(np.linalg.norm(positions - center, axis=1))
-    return maxd < thresh
-
-def get_cluster_count(positions, eps=5.0, min_samples=2):
-    #from sklearn.cluster import DBSCAN
-    clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(positions)
-    labels = clustering.labels_
-    n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
-    return n_clusters
+from swarm_sim.batch import BatchedSwarm
+from swarm_sim.cluster import get_cluster_count # 网格 + 并查集，结果和 DBSCAN 相同
+from swarm_sim.results import ResultStore, series_by
+from swarm_sim.schedule import CostModel, run_adaptive_sweep
+from swarm_sim.sweep import run_batched_sweep, run_sweep
 
 # 跑一次实验(指定种子)，测试感知半径
 def run_once(seed=None, perception_radius=30, communication_radius=50,
-             num_agents=30, speed=0.5, max_steps=300, strategy="between"):
-    if seed is not None:
+             num_agents=30, speed=0.5, max_steps=300, strategy="between", rng=None):
+    # rng: 并行 sweep 时每个任务自己的 Generator；不传时用全局随机数
+    if rng is None and seed is not None:
         np.random.seed(seed) # 这里重设随机性
 
     swarm = Swarm(num_agents=num_agents,
                   speed=speed,
                   perception_radius=perception_radius,
-                  communication_radius=communication_radius) # 所有实验用的是相同的初始位置
+                  communication_radius=communication_radius, # 所有实验用的是相同的初始位置
+                  neighbors="kdtree", # 长时间运行，邻居表跨 step 缓存
+                  rng=rng)
     
-    for step in range(max_steps):
-        swarm.step(strategy)
-        if has_converged(swarm.get_positions()):
-            converged= True
-            break
-    else:
-        step = max_steps
-        converged = False
+    step, converged = swarm.run(max_steps, strategy) # 收敛后立即停止
+    if converged:
+        step -= 1 # 收敛的那一步的下标
 
     final_positions = swarm.get_positions()
     n_clusters = get_cluster_count(final_positions, eps=0.6) # eps和thresh接近
     return step, converged, n_clusters
     #return max_steps # 若未收敛，返回最大步数
 
+# 同一组参数的多个副本(每个 seed×trial 一个 Generator)一次批量模拟，结果和逐个调用 run_once(rng=...) 相同
+def run_replicas(rngs, perception_radius=30, communication_radius=50,
+                 num_agents=30, speed=0.5, max_steps=300, strategy="between"):
+    batch = BatchedSwarm(rngs, num_agents,
+                         speed=speed,
+                         perception_radius=perception_radius,
+                         communication_radius=communication_radius)
+    result = batch.run(max_steps=max_steps, strategy=strategy)
+
+    runs = []
+    for steps, converged, final_positions in zip(result["steps"], result["converged"], result["positions"]):
+        step = int(steps) - 1 if converged else max_steps # 和 run_once 一样：收敛时返回那一步的下标
+        n_clusters = get_cluster_count(final_positions, eps=0.6)
+        runs.append((step, bool(converged), n_clusters))
+    return runs
+
 # 主sweep函数， 测试通信半径
 def sweep_with_repeats(comm_radii, seeds, trials=3, 
                        fix_mode="communication", 
                        fixed_value=30,
-                       strategy="between"):
+                       strategy="between",
+                       workers=None,
+                       batched=True,
+                       cache=None,
+                       checkpoint=None,
+                       adaptive=False,
+                       cost_model=None,
+                       store=None):
     """
     通用 sweep 函数。
     
@@ -53,6 +66,14 @@ def sweep_with_repeats(comm_radii, seeds, trials=3,
     - "communication": 固定感知半径，测试通信半径
     - "perception": 固定通信半径，测试感知半径
     fixed_value: 被固定的那个半径的值（如固定感知半径为 30）
+    workers: 并行进程数，默认用全部核；每个 (seed, trial) 有独立的随机数流，结果与进程数无关
+    batched: 每个半径的所有 seed×trial 用 BatchedSwarm 一次模拟（结果与逐个 run_once 相同）
+    cache: 结果缓存（True 用仓库根目录的 .sweep_cache.sqlite），重画图或多加一个半径时只算新的格子
+    checkpoint: 断点日志文件，每算完一个格子就追加写入；中断后传同一个文件重跑会从断点继续
+    adaptive: 重复次数自适应（见 run_adaptive_sweep），收敛步数的置信区间够窄就提前停，seeds×trials 是上限
+    cost_model: 耗时预测（CostModel），耗时长的格子先跑；多次 sweep 共用一个时后面的 sweep 预测更准
+    store: 可选的 ResultStore，每个 trial 的原始结果（参数、seed、trial、steps、converged、clusters、耗时）追加进去，
+           之后换分组 / 换统计量直接 store.aggregate，不用重跑
     """
 
     mean_steps = []
@@ -61,47 +82,48 @@ def sweep_with_repeats(comm_radii, seeds, trials=3,
     std_clusters = []
     conv_rates = []
 
+    cells = []
     for r in comm_radii:
-        all_steps = []
-        all_converged = []
-        all_clusters = []
+        if fix_mode == "communication":
+            cells.append(dict(communication_radius=r, perception_radius=fixed_value, strategy=strategy))
+        else: # fix_mode == "perception"
+            cells.append(dict(communication_radius=fixed_value, perception_radius=r, strategy=strategy))
+    cost_model = CostModel(run_once) if cost_model is None else cost_model
+    trials_store = ResultStore(("steps", "converged", "clusters"))
+    if adaptive:
+        run_adaptive_sweep(run_once, cells, seeds, trials=trials, workers=workers,
+                           cache=cache, checkpoint=checkpoint, cost_model=cost_model, store=trials_store)
+    elif batched:
+        run_batched_sweep(run_replicas, cells, seeds, trials=trials, workers=workers,
+                          cache=cache, checkpoint=checkpoint, cost_model=cost_model, store=trials_store)
+    else:
+        run_sweep(run_once, cells, seeds, trials=trials, workers=workers,
+                  cache=cache, checkpoint=checkpoint, cost_model=cost_model, store=trials_store)
+    if store is not None:
+        store.append(trials_store)
+
+    swept = "communication_radius" if fix_mode == "communication" else "perception_radius"
+    agg = trials_store.aggregate(swept, stats=("mean", "std"))
+    for r in comm_radii:
+        row = agg[agg[swept] == r][0]
 
         if fix_mode == "communication":
             print(f"Testing communication_radius = {r} (fixed perception_radius = {fixed_value})")
         else:
             print(f"Testing perception_radius = {r} (fixed communication_radius = {fixed_value})")
-        #print(f"Testing communication_radius = {r}")
-        for seed in seeds:
-            for t in range(trials):
-                if fix_mode == "communication":
-                    step, converged, n_clusters = run_once(
-                        seed=seed, 
-                        communication_radius=r,
-                        perception_radius=fixed_value,
-                        strategy=strategy)
-                else: # fix_mode == "perception"
-                    step, converged, n_clusters = run_once(
-                        seed=seed,
-                        communication_radius=fixed_value,
-                        perception_radius=r,
-                        strategy=strategy
-                    )
-
-                all_steps.append(step)
-                all_converged.append(converged)
-                all_clusters.append(n_clusters)
-
-        print(f" -> Mean Steps: {np.mean(all_steps):.2f}, Conv Rate: {np.mean(all_converged):.2f}, Avg Clusters: {np.mean(all_clusters):.2f}")
-        mean_steps.append(np.mean(all_steps))
-        std_steps.append(np.std(all_steps))
-        mean_clusters.append(np.mean(all_clusters))
-        std_clusters.append(np.mean(all_clusters))
-        conv_rates.append(np.mean(all_converged))
+        print(f" -> Mean Steps: {row['steps_mean']:.2f}, Conv Rate: {row['converged_mean']:.2f}, Avg Clusters: {row['clusters_mean']:.2f}")
+        mean_steps.append(row["steps_mean"])
+        std_steps.append(row["steps_std"])
+        mean_clusters.append(row["clusters_mean"])
+        std_clusters.append(row["clusters_std"])
+        conv_rates.append(row["converged_mean"])
 
     return mean_steps, std_steps, conv_rates, mean_clusters, std_clusters
 
 # 绘图：误差棒图
 def plot_with_errorbars(comm_radii, means, stds):
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(7,5))
     plt.errorbar(comm_radii, means, yerr=stds, fmt='-o', capsize=5, color='blue')
     plt.xlabel("Communication Radius")
@@ -118,6 +140,7 @@ def plot_cluster_comparison(strategies, avg_cluster_dict, std_clusters_dict):
     avg_clusters_dict: dict mapping strategy name to list of avg cluster values (y-axis)
     std_clusters_dict: dict mapping strategy name to list of std cluster values
     """
+    import matplotlib.pyplot as plt
    
     x = list(range(len(avg_cluster_dict[strategies[0]]))) # 通常是index或对应radius数
     x_labels = ['10', '20', '30', '50', '80', '120']  # 示例横坐标
@@ -158,21 +181,25 @@ if __name__ == "__main__":
     # 实验3，比较Behind和between策略
     strategies = ["between", "behind"]
     perception_radii = [10, 20, 30, 50, 80, 120]  # 只跑一个感知半径值，作为固定条件
-    avg_clusters_dict = {}
-    std_clusters_dict = {}
+    cost_model = CostModel(run_once) # 两个策略共用，第二个 sweep 用第一个的实际耗时排序
+    store = ResultStore() # 两个策略的所有原始 trial
 
     for strategy in strategies:
         print(f"Running strategy: {strategy}")
         
         seeds = [0, 1, 2, 3, 4]
-        mean_steps, std_steps, conv_rates, mean_clusters, std_clusters = sweep_with_repeats(
+        sweep_with_repeats(
             perception_radii,
             seeds,
             fix_mode="perception",     # 选择变化感知半径，但一个值也是固定
             fixed_value=50,            # 通信半径固定 = 50
-            strategy=strategy          # 关键点：传入行为策略
+            strategy=strategy,         # 关键点：传入行为策略
+            cache=True,                # 只调图时直接读缓存，不重跑
+            cost_model=cost_model,
+            store=store
         )
 
-        avg_clusters_dict[strategy] = mean_steps #mean_clusters
-        std_clusters_dict[strategy] = std_steps #std_clusters
+    store.save("sweep_results.npz") # 原始结果，之后 ResultStore.load 再分组，不用重跑
+    agg = store.aggregate(("strategy", "perception_radius"))
+    _, avg_clusters_dict, std_clusters_dict = series_by(agg, "strategy", "perception_radius", "steps") # "clusters"
     plot_cluster_comparison(strategies, avg_clusters_dict, std_clusters_dict)
@@ -1,49 +1,37 @@
 # 并未实现聚类算法
 import numpy as np
-from sklearn.cluster import DBSCAN
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
+# matplotlib 只在画图的函数里导入，无界面的 sweep worker 不加载它
 from q3.swarm import Swarm # 或根据你的路径导入
+from swarm_sim.cluster import get_cluster_count # 网格 + 并查集，结果和 DBSCAN 相同
+from swarm_sim.recorder import TrajectoryRecorder
+from swarm_sim.render import convergence_titles, render_many
+from swarm_sim.results import ResultStore
+from swarm_sim.sweep import run_sweep
 import itertools
 import os
 
-def has_converged(positions, thresh=5.0):
-    center = positions.mean(axis=0)
-    maxd = np.max(np.linalg.norm(positions - center, axis=1))
-    return maxd < thresh
-
-def get_cluster_count(positions, eps=5.0, min_samples=2):
-    #from sklearn.cluster import DBSCAN
-    clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(positions)
-    labels = clustering.labels_
-    n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
-    return n_clusters
-
 # 跑一次实验(指定种子)，测试感知半径
 def run_once(seed=None, perception_radius=30, communication_radius=50,
              num_agents=30, speed=0.5, max_steps=300, strategy="between",
-             hetero_speed=False):
-    if seed is not None:
+             hetero_speed=False, rng=None):
+    # rng: 并行 sweep 时每个任务自己的 Generator；不传时用全局随机数
+    if rng is None and seed is not None:
         np.random.seed(seed) # 这里重设随机性
 
     if hetero_speed:
-        speed_list = np.random.uniform(0.3, 0.7, size=num_agents)
+        speed_list = (np.random if rng is None else rng).uniform(0.3, 0.7, size=num_agents)
     else:
         speed_list = [speed] * num_agents
 
     swarm = Swarm(num_agents=num_agents,
                   speed_list=speed_list,
                   perception_radius=perception_radius,
-                  communication_radius=communication_radius) # 所有实验用的是相同的初始位置
+                  communication_radius=communication_radius, # 所有实验用的是相同的初始位置
+                  rng=rng)
     
-    for step in range(max_steps):
-        swarm.step(strategy)
-        if has_converged(swarm.get_positions()):
-            converged= True
-            break
-    else:
-        step = max_steps
-        converged = False
+    step, converged = swarm.run(max_steps, strategy) # 收敛后立即停止
+    if converged:
+        step -= 1 # 收敛的那一步的下标
 
     final_positions = swarm.get_positions()
     n_clusters = get_cluster_count(final_positions, eps=0.6) # eps和thresh接近
@@ -51,41 +39,39 @@ def run_once(seed=None, perception_radius=30, communication_radius=50,
     #return max_steps # 若未收敛，返回最大步数
 
 # 主sweep函数， 测试速度异质性
-def test_heterogeneous_speed(seeds, strategy="between", trials=3):
+# store: 可选的 ResultStore，每个 trial 的原始结果追加进去
+def test_heterogeneous_speed(seeds, strategy="between", trials=3, workers=None, cache=None, checkpoint=None,
+                             store=None):
     modes = [False, True]  # False: 同质，True: 异质
-    labels = ["Homogeneous Speed", "Heterogeneous Speed"]
 
+    cells = [dict(perception_radius=50,
+                  communication_radius=50,
+                  strategy=strategy,
+                  hetero_speed=hetero_speed) for hetero_speed in modes]
+    trials_store = ResultStore(("steps", "converged", "clusters"))
+    run_sweep(run_once, cells, seeds, trials=trials, workers=workers,
+              cache=cache, checkpoint=checkpoint, store=trials_store)
+    if store is not None:
+        store.append(trials_store)
+    return hetero_results(trials_store.aggregate("hetero_speed"))
+
+# aggregate(..., by="hetero_speed") 的结果 -> plot_hetero_results 要的 {标签: 统计量}
+def hetero_results(agg):
+    labels = {False: "Homogeneous Speed", True: "Heterogeneous Speed"}
     results = {}
-
-    for hetero_speed, label in zip(modes, labels):
-        print(f"\nRunning: {label}")
-        all_steps = []
-        all_converged = []
-        all_clusters = []
-
-        for seed in seeds:
-            for _ in range(trials):
-                step, converged, n_clusters = run_once(
-                    seed=seed,
-                    perception_radius=50,
-                    communication_radius=50,
-                    strategy=strategy,
-                    hetero_speed=hetero_speed
-                )
-                all_steps.append(step)
-                all_converged.append(converged)
-                all_clusters.append(n_clusters)
-
-        results[label] = {
-            "mean_steps": np.mean(all_steps),
-            "std_steps": np.std(all_steps),
-            "conv_rate": np.mean(all_converged),
-            "avg_clusters": np.mean(all_clusters),
+    for row in agg:
+        results[labels[bool(row["hetero_speed"])]] = {
+            "mean_steps": row["steps_mean"],
+            "std_steps": row["steps_std"],
+            "conv_rate": row["converged_mean"],
+            "avg_clusters": row["clusters_mean"],
+            "std_clusters": row["clusters_std"],
         }
-
     return results
 
 def plot_hetero_results(results):
+    import matplotlib.pyplot as plt
+
     labels = list(results.keys())
     mean_steps = [results[l]["mean_steps"] for l in labels]
     conv_rates = [results[l]["conv_rate"] for l in labels]
@@ -115,54 +101,38 @@ def plot_hetero_results(results):
     plt.show()
 
 
+# 记录一次运行的轨迹 (frames, N, 2)，供离线渲染；第 k 帧 = 走完 k+1 步之后的位置（和原来的 FuncAnimation 一样）
+def record_run(perception_radius, communication_radius, speed,
+               num_agents=30, strategy="between", seed=42, frames=100):
+    np.random.seed(seed)  # 保证相同初始状态
+    recorder = TrajectoryRecorder(num_agents, capacity=frames + 1)
+    swarm = Swarm(num_agents=num_agents, speed=speed,
+                  perception_radius=perception_radius,
+                  communication_radius=communication_radius,
+                  recorder=recorder)
+    for _ in range(frames):
+        swarm.step(strategy)
+    return recorder.frames()[1:]
+
 # 感兴趣时，输出动画版的结果
 def visualize_param_combinations(perception_list, comm_list, speed_list,
                                   num_agents=30, strategy="between", 
-                                  output_dir="swarm_gifs", seed=42):
+                                  output_dir="swarm_gifs", seed=42, workers=None):
 
     os.makedirs(output_dir, exist_ok=True)  # 创建输出文件夹
 
-    # 所有参数组合
-    param_combinations = list(itertools.product(perception_list, comm_list, speed_list))
-
-    for i, (perception_radius, communication_radius, speed) in enumerate(param_combinations):
-        print(f"Generating GIF {i+1}/{len(param_combinations)}: "
-              f"perception={perception_radius}, communication={communication_radius}, speed={speed}")
-
-        # 初始化 swarm
-        np.random.seed(seed)  # 保证相同初始状态
-        swarm = Swarm(num_agents=num_agents, speed=speed, 
-                      perception_radius=perception_radius, 
-                      communication_radius=communication_radius)
-
-        fig, ax = plt.subplots()
-        scat = ax.scatter([], [], s=50)
-        ax.set_xlim(0, 100)
-        ax.set_ylim(0, 100)
-
-        def init():
-            scat.set_offsets(np.empty((0, 2)))
-            return scat,
-
-        def update(frame):
-            swarm.step(strategy)
-            positions = swarm.get_positions()
-            scat.set_offsets(positions)
-
-            if has_converged(positions, thresh=5.0):
-                ax.set_title(f"Converged at step {frame}")
-            else:
-                ax.set_title(f"Step {frame}")
-            return scat,
-
-        ani = animation.FuncAnimation(fig, update, frames=100, init_func=init,
-                                      interval=100, blit=True)
-
+    # 所有参数组合，先模拟再离线渲染，多个组合并行
+    jobs = []
+    for perception_radius, communication_radius, speed in itertools.product(perception_list, comm_list, speed_list):
         filename = f"swarm_p{perception_radius}_c{communication_radius}_s{speed:.2f}.gif"
-        filepath = os.path.join(output_dir, filename)
-        ani.save(filepath, writer='pillow', fps=10)
-        plt.close(fig)  # 防止显示太多图
-
+        params = dict(perception_radius=perception_radius,
+                      communication_radius=communication_radius,
+                      speed=speed, num_agents=num_agents,
+                      strategy=strategy, seed=seed)
+        jobs.append((params, os.path.join(output_dir, filename)))
+
+    print(f"Generating {len(jobs)} GIFs ...")
+    for filepath in render_many(record_run, jobs, workers=workers, fps=10, titles=convergence_titles):
         print(f"Saved: {filepath}")
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
 # Main entry: Run simulation.
+# 在仓库根目录运行：python -m q1_q2.main
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from swarm import Swarm
+from q1_q2.swarm import Swarm
 import numpy as np
 
 # Create swarm
@@ -1,43 +1,120 @@
 # Swarm System Controller
+import importlib
+import os
 import numpy as np
-from q1_q2.agent import Agent
+from swarm_sim.checkpoint import resume_snapshot, run_signature, save_snapshot
+from swarm_sim.convergence import ConvergenceTracker, measure
+from swarm_sim.engine import NO_TARGET, UPDATES, move_sequential, move_synchronous, resolve_backend
+from swarm_sim.targets import pick_two
+from swarm_sim.world import make_world
 
 class Swarm:
-    def __init__(self, num_agents=20, speed=0.5, perception_radius=50):
-        self.agents = []
+    def __init__(self, num_agents=20, speed=0.5, perception_radius=50, rng=None, recorder=None,
+                 backend="numpy", world="open", update="sequential"):
+        """
+        rng: np.random.Generator，不传时用全局 np.random（np.random.seed 可复现）
+        recorder: 可选的 TrajectoryRecorder，记录初始位置和之后每步的位置
+        backend: "numpy"（默认，按依赖分层向量化）或 "numba"（逐 agent 的编译循环），两者结果相同；
+                 没装 numba 时自动退回 numpy
+        world: 边界模式 "open" / "reflect" / "periodic"（见 swarm_sim.world），也可以直接传 World
+        update: "sequential"（默认，agent 依次移动，后面的读到前面本步的新位置）或
+                "synchronous"（所有 agent 读本步开始时的位置，双缓冲，结果与编号顺序无关）
+        """
+        assert update in UPDATES, f"unknown update mode: {update}"
+        self.update = update
         self.size = 100  # 100x100 space
+        self.world = make_world(world, self.size)
+        self.rng = np.random if rng is None else rng
         self.perception_radius = perception_radius
+        self.backend = resolve_backend(backend)
+        self._kernels = importlib.import_module("swarm_sim.kernels") if self.backend == "numba" else None
 
-        self.history = [] # 可选：record positions in each step
-
-        for i in range(num_agents):
-            pos = np.random.rand(2) * self.size
-            agent = Agent(i, pos, speed, perception_radius)
-            self.agents.append(agent)
+        # 所有 agent 的状态放在连续数组里，第 i 行就是第 i 个 agent
+        self.positions = (self.rng.random((num_agents, 2)) * self.size).astype(np.float32)
+        self.speeds = np.full(num_agents, speed, dtype=np.float32)
+        self.perception_radii = np.full(num_agents, perception_radius, dtype=np.float32)
+        self.targets = np.full((num_agents, 2), NO_TARGET, dtype=np.int64)
+        self._back = np.empty_like(self.positions)  # synchronous 的写缓冲，每步和 positions 交换
 
         # Assign random targets
-        for agent in self.agents:
-            A, B = np.random.choice([a for a in self.agents if a != agent], 2, replace=False)
-            agent.set_targets(A, B)
-        #agent.select_targets(self.agents)
+        ids = np.arange(num_agents)
+        if rng is None:
+            for i in range(num_agents):
+                self.targets[i] = self.rng.choice(np.delete(ids, i), 2, replace=False)
+        elif num_agents >= 3:
+            # 一次抽完：在除自己以外的 N-1 个 agent 里选两个不同的
+            picks = np.stack(pick_two(num_agents - 1, self.rng.random((num_agents, 2))), axis=1)
+            self.targets[:] = picks + (picks >= ids[:, None])
+
+        self.t = 0
+        self.recorder = recorder # 可选：record positions in each step
+        if recorder is not None:
+            recorder.record(self.t, self.positions)
 
     def step(self, strategy="between"):
-        for agent in self.agents:
-            agent.update_position(strategy)
-        self.history.append(self.get_positions())
+        """
+        走一步，返回 (位移之和, 单个 agent 的最大位移)
+        synchronous 时 self.positions 每步换成另一块缓冲，需要保留旧位置请 copy
+        """
+        if self.update == "synchronous":
+            read, write = self.positions, self._back
+            if self.backend == "numba":
+                moved = self._kernels.move_synchronous_kernel(
+                    read, write, self.speeds, self.targets, self._kernels.strategy_code(strategy),
+                    *self._kernels.world_args(self.world))
+            else:
+                moved = move_synchronous(read, write, self.speeds, self.targets, strategy, self.world)
+            self.positions, self._back = write, read
+        elif self.backend == "numba":
+            moved = self._kernels.move_sequential_kernel(
+                self.positions, self.speeds, self.targets, self._kernels.strategy_code(strategy),
+                *self._kernels.world_args(self.world))
+        else:
+            moved = move_sequential(self.positions, self.speeds, self.targets, strategy, self.world)
+        self.t += 1
+        if self.recorder is not None:
+            self.recorder.record(self.t, self.positions)
+        return moved
+
+    @property
+    def history(self):
+        """记录下来的各帧位置 (K,N,2)，没有 recorder 时为空"""
+        if self.recorder is None:
+            return np.empty((0, len(self.positions), 2), dtype=np.float32)
+        return self.recorder.frames()
+
+    def run(self, max_steps, strategy="between", thresh=5.0, check_every=1, dispersion_thresh=None,
+            checkpoint=None, checkpoint_every=100):
+        """
+        一直 step 直到收敛或走满 max_steps，返回 (走的步数, 是否收敛)
+        收敛判据见 ConvergenceTracker，每 check_every 步检查一次
+        checkpoint: 快照文件（.npz），每 checkpoint_every 步保存一次；文件已存在时先恢复再接着跑，
+                    结果和一次跑完相同。快照属于参数或初始状态不同的 run 时抛 ValueError
+        """
+        start = 0
+        if checkpoint is not None:
+            signature = run_signature(self, strategy=strategy, thresh=thresh, check_every=check_every,
+                                      dispersion_thresh=dispersion_thresh)
+            if os.path.exists(checkpoint):
+                start = resume_snapshot(self, checkpoint, signature)
+        # periodic 世界里收敛判据用展开到同一个镜像里的位置（World.unwrap），其它模式就是 positions 本身
+        tracker = ConvergenceTracker(self.world.unwrap(self.positions), thresh, check_every, dispersion_thresh)
+        tracker.steps = start  # 保持 check_every 的检查步不变
+        for step in range(start + 1, max_steps + 1):
+            moved = self.step(strategy)
+            if tracker.update(self.world.unwrap(self.positions), *moved):
+                return step, True
+            if checkpoint is not None and step % checkpoint_every == 0:
+                save_snapshot(self, checkpoint, steps=step, run=signature)
+        return max_steps, False
 
     def get_positions(self):
-        return np.array([agent.position for agent in self.agents])
+        """返回内部的 (N,2) 位置数组（不拷贝），需要保存时请自行 copy"""
+        return self.positions
     
     def has_converged(self, thresh=5.0):
-        """检测最后一次记录的swarm是否收敛到阈值内"""
-        if not self.history:
-            return False
-        
-        pos = self.history[-1]
-        center = pos.mean(axis=0)
-        maxd = np.max(np.linalg.norm(pos - center, axis=1))
-        return maxd < thresh
+        """检测当前swarm是否收敛到阈值内"""
+        return self.metric(thresh)["converged"]
 
     def metric(self, thresh = 5.0):
         """
@@ -46,14 +123,10 @@ class Swarm:
         - avg_dispersion: 所有agents到中心点的平均距离
         - converged: 是否收敛 (最大距离小于阈值) 
         """
-        positions = self.get_positions()
-        center = positions.mean(axis=0)
-        distances = np.linlig.norm(positions - center, axis=1)
-        max_radius = np.max(distances)
-        avg_dispersion = np.mean(distances)
+        max_radius, avg_dispersion = measure(self.world.unwrap(self.get_positions()))
 
         return {
             "max_radius": max_radius,
             "avg_dispersion": avg_dispersion,
             "converged": max_radius < thresh
-        }
\ No newline at end of file
+        }
@@ -1,3 +1,4 @@
+# 逐对象的参考实现。Swarm 已改为数组存储（见 swarm_sim/engine.py），这里保留用于对照
 import numpy as np
 
 class Agent:
@@ -1,26 +1,18 @@
 # comm_sensitivity.py
 
+# 在仓库根目录运行：python -m q3.comm_sensitivity
 import numpy as np
-import matplotlib.pyplot as plt
-from swarm import Swarm
-
-def has_converged(positions, thresh=5.0):
-    """判断一组位置是否收敛：所有 agent 到质心的最大距离 < thresh。"""
-    center = positions.mean(axis=0)
-    maxd = np.max(np.linalg.norm(positions - center, axis=1))
-    return maxd < thresh
+from q3.swarm import Swarm
 
 def run_once(comm_radius, 
              num_agents=30, speed=0.6, perception_radius=30, 
              max_steps=500, strategy="between"):
     swarm = Swarm(num_agents, speed=speed,
                   perception_radius=perception_radius,
-                  communication_radius=comm_radius)
-    for step in range(1, max_steps+1):
-        swarm.step(strategy)
-        if has_converged(swarm.get_positions()):
-            return step
-    return None
+                  communication_radius=comm_radius,
+                  neighbors="kdtree")
+    step, converged = swarm.run(max_steps, strategy)
+    return step if converged else None
 
 def batch_test(comm_radii):
     results = {}
@@ -41,7 +33,9 @@ if __name__ == "__main__":
         t = run_once(r, max_steps=max_steps)
         results[r] = t if t is not None else max_steps
 
-    # 绘制折线图
+    # 绘制折线图（matplotlib 只在画图时导入）
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(6,4))
     plt.plot(list(results.keys()), list(results.values()), marker='o')
     plt.xlabel("Communication Radius")
@@ -1,6 +1,7 @@
+# 在仓库根目录运行：python -m q3.main
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from swarm import Swarm
+from q3.swarm import Swarm
 import numpy as np
 
 # 参数设置
@@ -0,0 +1,103 @@
+# 广播 / 接收的消息总线
+# 每步的广播存成一个结构化数组（每个 agent 一条），投递关系存成 CSR：
+# inbox 第 r 行 = receiver r 收到了哪些 sender 的消息（按编号升序）
+import numpy as np
+from swarm_sim.engine import NO_TARGET
+from swarm_sim.neighbors import pairs_to_csr
+
+MESSAGE_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("x", np.float32),
+    ("y", np.float32),
+    ("target_a", np.int64),
+    ("target_b", np.int64),
+])
+
+
+def used_keys(indptr, indices, targets):
+    """
+    inbox CSR (indptr, indices) 里所有 (receiver, 被占用的目标 id) 组合，编码成 receiver * (N+1) + id 并排序
+    （可能有重复，不影响查询）。targets: 每个 sender 广播的目标 (N,2)，N 为 agent 总数
+    """
+    width = len(targets) + 1
+    receivers = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    used = targets[indices]
+    keys = receivers[:, None] * width + used
+    return np.sort(keys[used != NO_TARGET])
+
+
+def is_used(keys, width, receivers, ids):
+    """判断 ids[k] 是否已被 receivers[k] 收到的消息里的某个 agent 选为目标；keys 来自 used_keys，width = N+1"""
+    query = np.asarray(receivers) * width + np.asarray(ids)
+    slot = np.searchsorted(keys, query)
+    slot[slot == len(keys)] = 0
+    return (keys[slot] == query) if len(keys) else np.zeros(len(query), dtype=bool)
+
+
+class MessageBus:
+    def __init__(self):
+        self.messages = np.empty(0, dtype=MESSAGE_DTYPE)
+        self._targets = np.zeros((0, 2), dtype=np.int64)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self._rows = []
+
+    def broadcast(self, positions, targets):
+        """所有 agent 同时广播自己的 id、位置和当前目标，覆盖上一步的消息"""
+        n = len(positions)
+        messages = np.empty(n, dtype=MESSAGE_DTYPE)
+        messages["id"] = np.arange(n)
+        messages["x"] = positions[:, 0]
+        messages["y"] = positions[:, 1]
+        messages["target_a"] = targets[:, 0]
+        messages["target_b"] = targets[:, 1]
+        self.messages = messages
+        self._targets = np.stack([messages["target_a"], messages["target_b"]], axis=1)  # 连续副本，逐 agent 查询更快
+        self._rows = []
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+
+    def deliver(self, receiver, senders):
+        """顺序更新时逐个投递：receiver 收到 senders（升序）的消息"""
+        self._rows.append((receiver, senders))
+
+    def deliver_all(self, indptr, indices):
+        """批量投递：直接用 (indptr, indices) 作为 inbox"""
+        self.indptr, self.indices = indptr, indices
+        self._rows = []
+
+    def finish(self):
+        """把逐个投递的结果整理成 inbox CSR"""
+        if self._rows:
+            receivers = np.concatenate([np.full(len(s), r, dtype=np.int64) for r, s in self._rows])
+            senders = np.concatenate([s for _, s in self._rows])
+            self.indptr, self.indices = pairs_to_csr(receivers, senders, len(self.messages))
+            self._rows = []
+        return self.indptr, self.indices
+
+    def targets_of(self, senders):
+        """senders 广播的目标 id，形状 (len(senders), 2)，没有目标为 NO_TARGET"""
+        return self._targets[senders]
+
+    def used_keys(self):
+        """
+        所有 (receiver, 被占用的目标 id) 组合，编码成 receiver * (N+1) + id 并排序（可能有重复，不影响查询）。
+        配合 is_used 可以一次判断任意多对 (receiver, candidate)
+        """
+        return used_keys(self.indptr, self.indices, self._targets)
+
+    def is_used(self, receivers, ids, keys=None):
+        """判断 ids[k] 是否已被 receivers[k] 收到的消息里的某个 agent 选为目标"""
+        keys = self.used_keys() if keys is None else keys
+        return is_used(keys, len(self.messages) + 1, receivers, ids)
+
+    def adjacency(self):
+        """sender -> receiver 的 CSR（inbox 的转置）"""
+        n = len(self.messages)
+        receivers = np.repeat(np.arange(n), np.diff(self.indptr))
+        return pairs_to_csr(self.indices, receivers, n)
+
+    @property
+    def message_count(self):
+        """本步投递的消息总数"""
+        return int(self.indptr[-1])
@@ -1,41 +1,352 @@
-from .agent import Agent
+import importlib
+import os
+import time
 import numpy as np
+from swarm_sim.checkpoint import resume_snapshot, run_signature, save_snapshot
+from swarm_sim.convergence import ConvergenceTracker, measure
+from swarm_sim.engine import NO_TARGET, UPDATES, move_rows, move_synchronous, resolve_backend
+from swarm_sim.neighbors import GridIndex, VerletList, all_pairs_csr, csr_rows, mask_csr
+from swarm_sim.targets import pick_two, select_csr
+from swarm_sim.world import make_world
+from .message_bus import MessageBus
 
 # 基本框架实现。在具体做实验时看期待代码文件。原因之一是position可能会发生改变
+# agent 的状态存放在连续数组里（第 i 行 = 第 i 个 agent）。逐对象的参考实现见 agent.py
 
 class Swarm:
     def __init__(self, num_agents, speed=1.0, speed_list=None,
-                 perception_radius=30, communication_radius=50):
-        
+                 perception_radius=30, communication_radius=50, neighbors="grid",
+                 skin=None, rng=None, recorder=None, backend="numpy", profiler=None,
+                 world="open", update="sequential", threads=None, tiles=None):
+        """
+        neighbors: 邻居查询方式
+        - "grid": 每步建一次均匀网格索引，批量查询（默认）
+        - "kdtree": KD-tree 邻居表，跨 step 缓存，位移超过 skin 才重建（需要 scipy）
+        - "brute": 每个 agent 扫描全部 agent
+        skin: kdtree 模式的 Verlet skin 宽度，默认取查询半径的 20%
+        rng: np.random.Generator，不传时用全局 np.random（np.random.seed 可复现）
+             传 Generator 时每步先给每个 agent 抽一对均匀数再选目标，和 BatchedSwarm 的单个副本结果一致
+        recorder: 可选的 TrajectoryRecorder，记录初始位置和之后每步的位置
+        backend: "numpy"（默认）或 "numba"（整步编译成一个内核，没装 numba 时自动退回 numpy）
+                 numba 总是按预先抽好的均匀数选目标；传 Generator 时和 numpy backend 结果完全一致，
+                 用全局 np.random 时同样可复现，但和 numpy backend 的 np.random.choice 序列不同
+        profiler: 可选的 swarm_sim.profiling.StepProfiler，记录每步各阶段的耗时、候选邻居对数和消息数
+        world: 边界模式 "open" / "reflect" / "periodic"（100x100，见 swarm_sim.world），也可以直接传 World；
+               periodic 时感知 / 通信距离和邻居索引都按最近镜像计算
+        update: "sequential"（默认，逐 agent 选目标并立即移动，后面的 agent 读到前面本步的新位置）或
+                "synchronous"（所有 agent 按本步开始时的位置一起 broadcast / 选目标（select_targets），
+                再从读缓冲一起移动到写缓冲，结果与编号顺序无关；需要 Generator）
+        threads: synchronous 时可以用多个线程走一步：场地切成 tiles=(tx, ty) 个 tile（默认每线程约 4 个），
+                 每个 tile 带一圈 max(感知半径, 通信半径) 的 halo 独立完成选目标和移动（见 swarm_sim.domain），
+                 结果和单线程相同；backend="numba" 时内核释放 GIL，并行效果最好
+        """
+        assert neighbors in ("grid", "kdtree", "brute"), f"unknown neighbors backend: {neighbors}"
+        assert update in UPDATES, f"unknown update mode: {update}"
+        assert update == "sequential" or rng is not None, "synchronous update needs rng=np.random.Generator"
+        assert threads is None or update == "synchronous", "threads needs update=\"synchronous\""
+        self.update = update
+
         if speed_list is not None:
             assert len(speed_list) == num_agents, "speed_list length must match num_agents"
-        self.agents = [
-            Agent(
-                id=i,
-                position=np.random.rand(2) * 100,
-                speed=speed_list[i] if speed_list is not None else speed,
-                perception_radius=perception_radius
-            )
-            for i in range(num_agents)
-        ]
-
-        self.agents = [
-            Agent(id=i,
-                  position=np.random.rand(2) * 100,
-                  speed=speed,
-                  perception_radius=perception_radius)
-            for i in range(num_agents)
-        ]
+        else:
+            speed_list = [speed] * num_agents
+
+        self.rng = np.random if rng is None else rng
+        self._legacy_rng = rng is None
+        if rng is None:
+            # 旧版本这里把 agents 创建了两次，第一次的位置被直接丢掉。
+            # 保留这一次随机数消耗，让同一个 seed 仍然得到同样的初始位置
+            np.random.rand(num_agents, 2)
+        self.positions = (self.rng.random((num_agents, 2)) * 100).astype(np.float32)
+        self.speeds = np.asarray(speed_list, dtype=np.float32)
+        self.perception_radii = np.full(num_agents, perception_radius, dtype=np.float32)
+        self.targets = np.full((num_agents, 2), NO_TARGET, dtype=np.int64)
+        self._back = np.empty_like(self.positions)  # synchronous 的写缓冲，每步和 positions 交换
         self.communication_radius = communication_radius
+        self.world = make_world(world, 100)
+        self.neighbors = neighbors
+        self.backend = resolve_backend(backend)
+        self._kernels = importlib.import_module("swarm_sim.kernels") if self.backend == "numba" else None
+        self.bus = MessageBus()
+        self.verlet = None
+        if neighbors == "kdtree":
+            radius = self._query_radius()
+            self.verlet = VerletList(radius, skin if skin is not None else 0.2 * radius, self.world)
+
+        self.t = 0
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.record(self.t, self.positions)
+        self.profiler = profiler
+        self._tiled = None
+        if threads is not None:
+            self._tiled = importlib.import_module("swarm_sim.domain").TiledStepper(threads, tiles)
+
+    def close(self):
+        """关闭 threads=... 时的线程池（没有线程池时什么都不做）；也可以用 with Swarm(...) as swarm"""
+        if self._tiled is not None:
+            self._tiled.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def step(self, strategy="between"):
-        for agent in self.agents:
-            agent.broadcast()
-        for agent in self.agents:
-            agent.receive_broadcasts(self.agents, self.communication_radius)
-            #agent.select_targets(self.agents)
-            agent.select_targets_upgrade(self.agents)
-            agent.update_position(strategy)
+        """
+        走一步，返回 (位移之和, 单个 agent 的最大位移)
+        synchronous 时 self.positions 每步换成另一块缓冲，需要保留旧位置请 copy
+        """
+        n = len(self.positions)
+        displacement, max_move = np.zeros(2), 0.0
+        if n == 0:
+            return displacement, max_move
+        prof = self.profiler
+        if prof is not None:
+            prof.begin_step(self.t + 1)
+        if self.update == "synchronous":
+            return self._step_synchronous(strategy)
+        # broadcast：每个 agent 广播本步开始时的位置和目标
+        self.bus.broadcast(self.positions, self.targets)
+        if prof is not None:
+            prof.lap("broadcast")
+        csr = self._candidate_lists()
+        if prof is not None:
+            prof.lap("neighbor_query")
+            prof.count("neighbor_pairs", n * (n - 1) if csr is None else len(csr[1]))
+        if self.backend == "numba":
+            return self._step_compiled(csr, strategy)
+        all_ids = np.arange(n)
+        used_flag = np.zeros(n + 1, dtype=bool)  # 最后一格对应 NO_TARGET (-1)
+        uniforms = None if self._legacy_rng else self.rng.random((n, 2))
+        if prof is not None:
+            prof.lap("selection")  # 选目标用的随机数
+            # 各阶段按 agent 交错进行：先累计到局部变量，整步结束后每个阶段只记一次
+            delivery = selection = movement = 0
+            last = time.perf_counter_ns()
+        for i in range(n):
+            # receive + select_targets_upgrade，距离用当前位置（编号小的 agent 本步已经移动过）
+            if csr is None:
+                candidates = all_ids
+            else:
+                indptr, indices = csr
+                candidates = indices[indptr[i]:indptr[i + 1]]
+            dist = np.linalg.norm(self.world.wrap_delta(self.positions[candidates] - self.positions[i]), axis=1)
+            if csr is None:
+                dist[i] = np.inf
+            local, received = self._receive(i, candidates, dist)
+            if prof is not None:
+                now = time.perf_counter_ns()
+                delivery += now - last
+                last = now
+            self._select_targets(i, candidates, local, received, used_flag, None if uniforms is None else uniforms[i])
+            if prof is not None:
+                now = time.perf_counter_ns()
+                selection += now - last
+                last = now
+            d, m = move_rows(self.positions, self.speeds, self.targets, [i], strategy, world=self.world)
+            displacement += d
+            max_move = max(max_move, m)
+            if prof is not None:
+                now = time.perf_counter_ns()
+                movement += now - last
+                last = now
+        self.bus.finish()
+        if prof is not None:
+            prof.add("delivery", delivery + time.perf_counter_ns() - last)
+            prof.add("selection", selection)
+            prof.add("movement", movement)
+            prof.mark()
+            prof.count("messages", self.bus.message_count)
+        self.t += 1
+        if self.recorder is not None:
+            self.recorder.record(self.t, self.positions)
+        return displacement, max_move
+
+    def _step_compiled(self, csr, strategy):
+        n = len(self.positions)
+        indptr, indices = csr if csr is not None else (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        # 按 NumPy 比较 dist <= communication_radius 时的精度先取整（python float 按 float32 比）
+        radius = float(np.result_type(self.positions.dtype, self.communication_radius).type(self.communication_radius))
+        displacement, max_move, inbox_indptr, inbox = self._kernels.swarm_step_kernel(
+            self.positions, self.speeds, self.perception_radii, radius,
+            self.targets, self.targets.copy(), indptr, indices, self.rng.random((n, 2)),
+            self._kernels.strategy_code(strategy), *self._kernels.world_args(self.world))
+        prof = self.profiler
+        if prof is not None:
+            prof.lap("kernel")
+        self.bus.deliver_all(inbox_indptr, inbox)
+        if prof is not None:
+            prof.lap("delivery")
+            prof.count("messages", self.bus.message_count)
+        self.t += 1
+        if self.recorder is not None:
+            self.recorder.record(self.t, self.positions)
+        return displacement, max_move
+
+    def _step_synchronous(self, strategy):
+        if self._tiled is not None:
+            moved = self._tiled.step(self, strategy)
+        else:
+            moved = self._step_buffers(strategy)
+        self.t += 1
+        if self.recorder is not None:
+            self.recorder.record(self.t, self.positions)
+        return moved
+
+    def _step_buffers(self, strategy):
+        self._select_all(self.profiler)
+        read, write = self.positions, self._back
+        if self.backend == "numba":
+            moved = self._kernels.move_synchronous_kernel(
+                read, write, self.speeds, self.targets, self._kernels.strategy_code(strategy),
+                *self._kernels.world_args(self.world))
+        else:
+            moved = move_synchronous(read, write, self.speeds, self.targets, strategy, self.world)
+        self.positions, self._back = write, read
+        if self.profiler is not None:
+            self.profiler.lap("movement")
+        return moved
+
+    def run(self, max_steps, strategy="between", thresh=5.0, check_every=1, dispersion_thresh=None,
+            checkpoint=None, checkpoint_every=100):
+        """
+        一直 step 直到收敛或走满 max_steps，返回 (走的步数, 是否收敛)
+        收敛判据见 ConvergenceTracker，每 check_every 步检查一次
+        checkpoint: 快照文件（.npz），每 checkpoint_every 步保存一次；文件已存在时先恢复再接着跑，
+                    结果和一次跑完相同。快照属于参数或初始状态不同的 run 时抛 ValueError
+        """
+        start = 0
+        if checkpoint is not None:
+            signature = run_signature(self, strategy=strategy, thresh=thresh, check_every=check_every,
+                                      dispersion_thresh=dispersion_thresh)
+            if os.path.exists(checkpoint):
+                start = resume_snapshot(self, checkpoint, signature)
+        # periodic 世界里收敛判据用展开到同一个镜像里的位置（World.unwrap），其它模式就是 positions 本身
+        tracker = ConvergenceTracker(self.world.unwrap(self.positions), thresh, check_every, dispersion_thresh)
+        tracker.steps = start  # 保持 check_every 的检查步不变
+        for step in range(start + 1, max_steps + 1):
+            moved = self.step(strategy)
+            if self.profiler is not None:
+                self.profiler.mark()
+            converged = tracker.update(self.world.unwrap(self.positions), *moved)
+            if self.profiler is not None:
+                self.profiler.lap("convergence")
+            if converged:
+                return step, True
+            if checkpoint is not None and step % checkpoint_every == 0:
+                save_snapshot(self, checkpoint, steps=step, run=signature)
+        return max_steps, False
+
+    def _candidate_lists(self, moving=True):
+        """
+        本步每个 agent 可能用到的邻居（超集，CSR 形式）；brute 模式返回 None
+        moving=False 表示查询期间位置不变（批量选目标），不需要给先移动的 agent 留余量
+        """
+        if self.neighbors == "brute":
+            return None
+        # 编号小的 agent 在本步里会先移动，最多移动 max(speed)，所以查询半径多留这一段
+        max_step = (self.speeds.max() if moving else 0.0) + 1e-3
+        if self.verlet is not None:
+            return self.verlet.update(self.positions, max_step)
+        radius = self._query_radius() + max_step
+        extent = self.world.size / 2 if self.world.periodic else np.ptp(self.positions, axis=0).max()
+        if radius >= extent:
+            return None  # 一个格子就盖住了所有 agent（periodic 时查询圆盖住了整个环面），直接全扫更快
+        index = GridIndex(radius, self.world).build(self.positions)
+        return index.query(self.positions, radius, exclude_self=True, backend=self.backend)
+
+    def _query_radius(self):
+        return float(max(self.perception_radii.max(initial=0.0), self.communication_radius))
+
+    def neighbor_stats(self):
+        """kdtree 模式下邻居表的重建统计：steps / rebuilds / skipped"""
+        return self.verlet.stats() if self.verlet is not None else None
+
+    def _receive(self, i, candidates, dist):
+        """agent i 收消息：通信范围内的 sender 投递给 i，返回 (感知范围内, 通信范围内) 两个掩码"""
+        local = dist <= self.perception_radii[i]
+        received = dist <= self.communication_radius
+        self.bus.deliver(i, candidates[received])
+        return local, received
+
+    def _select_targets(self, i, candidates, local, received, used_flag, u=None):
+        # 感知范围内的 agent + 通过通信收到的远处 agent
+        senders = candidates[received]
+        if self._legacy_rng:
+            # 和旧实现一致：先感知邻居再远处 agent，各自按编号排序
+            all_candidates = np.concatenate([candidates[local], candidates[received & ~local]])
+        else:
+            all_candidates = candidates[local | received]
+
+        # 去掉已被别人选过的
+        used_ids = self.bus.targets_of(senders)
+        used_flag[used_ids] = True
+        final_candidates = all_candidates[~used_flag[all_candidates]]
+        used_flag[used_ids] = False
+
+        # 优先选最干净的，没得选就退而选重复的
+        pool = final_candidates if len(final_candidates) >= 2 else all_candidates
+        if len(pool) < 2:
+            self.targets[i] = NO_TARGET
+        elif self._legacy_rng:
+            self.targets[i] = np.random.choice(pool, 2, replace=False)
+        else:
+            self.targets[i] = pool[list(pick_two(len(pool), u))]
+
+    def select_targets(self):
+        """
+        所有 agent 按当前位置同时 broadcast + receive + 选目标（不移动），整个 swarm 一次批量完成。
+        需要 Generator（rng=...）：随机数消耗和 step 相同，每个 agent 一对均匀数；
+        结果等于位置不变时逐个 agent 调用 _select_targets
+        """
+        assert not self._legacy_rng, "batched target selection needs rng=np.random.Generator"
+        return self._select_all()
+
+    def _select_all(self, prof=None):
+        n = len(self.positions)
+        self.bus.broadcast(self.positions, self.targets)
+        if prof is not None:
+            prof.lap("broadcast")
+        csr = self._candidate_lists(moving=False)
+        indptr, indices = csr or all_pairs_csr(n)
+        if prof is not None:
+            prof.lap("neighbor_query")
+            prof.count("neighbor_pairs", len(indices))
+        rows = csr_rows(indptr)
+        dist = np.linalg.norm(self.world.wrap_delta(self.positions[indices] - self.positions[rows]), axis=1)
+        local = dist <= self.perception_radii[rows]
+        received = dist <= self.communication_radius
+        self.bus.deliver_all(*mask_csr(indptr, indices, received))
+        if prof is not None:
+            prof.lap("delivery")
+            prof.count("messages", self.bus.message_count)
+        indptr, indices = mask_csr(indptr, indices, local | received)
+        used = self.bus.is_used(csr_rows(indptr), indices)
+        self.targets[:] = select_csr(indptr, indices, used, self.rng.random((n, 2)))
+        if prof is not None:
+            prof.lap("selection")
+        return self.targets
 
     def get_positions(self):
-        return np.array([agent.position for agent in self.agents])
+        """返回内部的 (N,2) 位置数组（不拷贝），需要保存时请自行 copy"""
+        return self.positions
+
+    def has_converged(self, thresh=5.0):
+        """检测当前swarm是否收敛到阈值内"""
+        return self.metric(thresh)["converged"]
+
+    def metric(self, thresh=5.0):
+        """
+        返回当前swarm的收敛状态和统计指标
+        - max_radius: 所有agents到中心点的最远距离
+        - avg_dispersion: 所有agents到中心点的平均距离
+        - converged: 是否收敛 (最大距离小于阈值)
+        """
+        max_radius, avg_dispersion = measure(self.world.unwrap(self.positions))
+        return {
+            "max_radius": max_radius,
+            "avg_dispersion": avg_dispersion,
+            "converged": max_radius < thresh
+        }
@@ -0,0 +1,6 @@
+# python -m swarm_sim run|sweep|render|bench，见 swarm_sim.cli
+import sys
+
+from swarm_sim.cli import main
+
+sys.exit(main())
@@ -0,0 +1,111 @@
+# 多副本批量模拟：R 个互相独立的 q3 swarm 打包成 (R,N,2) 一起推进
+# 每个副本有自己的 Generator，结果和单独跑 q3.swarm.Swarm(rng=同一个 Generator) 完全一致；
+# 已经收敛的副本不再参与计算
+# 只实现 open 世界 + sequential 更新（逐 agent 的循环是顺序更新语义本身要求的，向量化的是副本这一维）
+import numpy as np
+from swarm_sim.engine import NO_TARGET, get_directions, normalize, resolve_backend
+from swarm_sim.targets import select_dense
+from swarm_sim.world import make_world
+
+
+def max_radius(positions):
+    """(..., N, 2) 位置到各自质心的最大距离"""
+    center = positions.mean(axis=-2)
+    return np.max(np.linalg.norm(positions - center[..., None, :], axis=-1), axis=-1)
+
+
+class BatchedSwarm:
+    def __init__(self, rngs, num_agents, speed=1.0, speed_lists=None,
+                 perception_radius=30, communication_radius=50, world="open", update="sequential", backend="numpy"):
+        """
+        rngs: 每个副本一个 np.random.Generator
+        speed_lists: (R,N) 每个副本每个 agent 的速度，不传时全部为 speed
+        world / update / backend: 和 q3.Swarm 同名参数一致，但只支持 open 世界和 sequential 更新，
+            其它取值抛 ValueError（不会悄悄按 open 世界跑）；backend 只检查取值，总是用 NumPy 批量计算，
+            两个 backend 的结果本来就相同
+        """
+        if make_world(world, 100).mode != "open":
+            raise ValueError(f"BatchedSwarm only supports world='open', got {world!r}; use q3.swarm.Swarm")
+        if update != "sequential":
+            raise ValueError(f"BatchedSwarm only supports update='sequential', got {update!r}; use q3.swarm.Swarm")
+        resolve_backend(backend)
+        self.rngs = list(rngs)
+        num_replicas = len(self.rngs)
+        if speed_lists is None:
+            speed_lists = np.full((num_replicas, num_agents), speed)
+        assert np.shape(speed_lists) == (num_replicas, num_agents), "speed_lists must be (R, num_agents)"
+
+        self.num_agents = num_agents
+        self.positions = np.stack([(rng.random((num_agents, 2)) * 100).astype(np.float32)
+                                   for rng in self.rngs]).reshape(num_replicas, num_agents, 2)
+        self.speeds = np.asarray(speed_lists, dtype=np.float32)
+        self.targets = np.full((num_replicas, num_agents, 2), NO_TARGET, dtype=np.int64)
+        self.perception_radius = perception_radius
+        self.communication_radius = communication_radius
+
+        self.active = np.ones(num_replicas, dtype=bool)
+        self.steps = np.zeros(num_replicas, dtype=np.int64)
+        self.converged = np.zeros(num_replicas, dtype=bool)
+
+    def step(self, strategy="between"):
+        """所有仍在运行的副本各走一步（agent 顺序和 q3.Swarm.step 相同）"""
+        rows = np.flatnonzero(self.active)
+        n = self.num_agents
+        if len(rows) == 0 or n == 0:
+            return rows
+        pos = self.positions[rows]
+        speeds = self.speeds[rows]
+        targets = self.targets[rows]
+        broadcast = targets.copy()
+        uniforms = np.stack([self.rngs[r].random((n, 2)) for r in rows])
+        replica = np.arange(len(rows))
+        for k in range(n):
+            # receive：距离用当前位置，编号小的 agent 本步已经移动过
+            dist = np.linalg.norm(pos - pos[:, k:k + 1], axis=2)
+            dist[:, k] = np.inf
+            local = dist <= self.perception_radius
+            received = dist <= self.communication_radius
+            targets[:, k] = select_dense(local | received, self._used(received, broadcast), uniforms[:, k])
+
+            # update_position
+            tgt = targets[:, k]
+            has_target = tgt[:, 0] != NO_TARGET
+            m, tgt = replica[has_target], tgt[has_target]
+            directions = get_directions(pos[m, k], pos[m, tgt[:, 0]], pos[m, tgt[:, 1]], strategy)
+            unit, moving = normalize(directions)
+            m = m[moving]
+            pos[m, k] += unit[moving] * speeds[m, k, None]
+
+        self.positions[rows] = pos
+        self.targets[rows] = targets
+        self.steps[rows] += 1
+        return rows
+
+    @staticmethod
+    def _used(received, broadcast):
+        """(R',N) 每个副本里，收到的广播中已被选为目标的 agent"""
+        mask = received[:, :, None] & (broadcast != NO_TARGET)
+        replica = np.broadcast_to(np.arange(len(received))[:, None, None], broadcast.shape)
+        used = np.zeros(received.shape, dtype=bool)
+        used[replica[mask], broadcast[mask]] = True
+        return used
+
+    def run(self, max_steps=300, strategy="between", thresh=5.0):
+        """
+        推进到所有副本收敛或达到 max_steps，返回每个副本的：
+        - steps: 收敛时已经走的步数（未收敛为 max_steps）
+        - converged: 是否收敛
+        - positions: 最终位置 (R,N,2)
+        """
+        for _ in range(max_steps):
+            rows = self.step(strategy)
+            if len(rows) == 0:
+                break
+            done = rows[max_radius(self.positions[rows]) < thresh]
+            self.converged[done] = True
+            self.active[done] = False
+        return {
+            "steps": self.steps.copy(),
+            "converged": self.converged.copy(),
+            "positions": self.positions.copy(),
+        }
@@ -0,0 +1,263 @@
+# Swarm.step 吞吐量基准
+# 轴：实现（q1_q2 / q3）× backend × num_agents × perception_radius × communication_radius × strategy
+# 指标：steps/sec、agent-steps/sec、峰值内存和分配块数（tracemalloc），结果写成 JSON，
+# 不同版本 / backend 的结果可以用 compare 对比，用 scaling 看每步耗时随 N 增长的指数（≈2 就是撞上了 O(N²)）
+#
+# 另有冷启动基准（--imports）：在新进程里 import 各模块 / 跑一次无界面的 CLI，测墙钟时间
+#
+# 用法：python -m swarm_sim.bench [--quick] [--out bench.json] [--compare old.json] [--imports]
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+from swarm_sim.cache import code_version
+
+IMPLS = ("q1_q2", "q3")
+CASE_KEYS = ("impl", "backend", "neighbors", "num_agents", "perception_radius", "communication_radius", "strategy")
+
+FULL_GRID = {
+    "impl": IMPLS,
+    "backend": ("numpy", "numba"),
+    "num_agents": (100, 300, 1000, 3000),
+    "perception_radius": (10, 30),
+    "communication_radius": (25, 50),
+    "strategy": ("between", "behind"),
+}
+QUICK_GRID = {
+    "impl": IMPLS,
+    "backend": ("numpy",),
+    "num_agents": (100, 300, 1000),
+    "perception_radius": (30,),
+    "communication_radius": (50,),
+    "strategy": ("between",),
+}
+
+# 冷启动基准的对象：sweep worker 会导入的模块，以及一次无界面的运行
+IMPORT_TARGETS = ("numpy", "swarm_sim.cli", "q1_q2.swarm", "q3.swarm", "swarm_sim.workqueue",
+                  "param_sweep_seed", "param_sweep_speed", "param_sweep_cluster")
+HEADLESS_RUN = ("-m", "swarm_sim", "run", "--max-steps", "1", "--config", "")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_swarm(impl, num_agents, perception_radius=30, communication_radius=50, backend="numpy",
+               neighbors="grid", seed=0):
+    """按实现名建一个 Swarm；q1_q2 没有通信半径和邻居查询，对应参数忽略"""
+    assert impl in IMPLS, f"unknown impl: {impl}"
+    rng = np.random.default_rng(seed)
+    if impl == "q1_q2":
+        from q1_q2.swarm import Swarm
+        return Swarm(num_agents, perception_radius=perception_radius, rng=rng, backend=backend)
+    from q3.swarm import Swarm
+    return Swarm(num_agents, perception_radius=perception_radius, communication_radius=communication_radius,
+                 neighbors=neighbors, rng=rng, backend=backend)
+
+
+def cases(grid, neighbors="grid"):
+    """展开参数网格；q1_q2 的结果与通信半径无关，只保留第一个通信半径"""
+    seen = set()
+    for values in itertools.product(*grid.values()):
+        case = dict(zip(grid.keys(), values), neighbors=neighbors)
+        if case["impl"] == "q1_q2":
+            case["communication_radius"] = grid["communication_radius"][0]
+            case["neighbors"] = None
+        key = tuple(case[k] for k in CASE_KEYS)
+        if key not in seen:
+            seen.add(key)
+            yield case
+
+
+def bench_case(impl, num_agents, perception_radius=30, communication_radius=50, strategy="between",
+               backend="numpy", neighbors="grid", min_time=0.5, min_steps=3, max_steps=1000, warmup=1,
+               memory_steps=3, seed=0):
+    """
+    测一个配置，返回结果字典（参数 + 指标）
+    - 计时：先走 warmup 步（numba 编译、邻居表初始化），再至少走 min_steps 步、累计至少 min_time 秒
+    - 内存：另建一个同样的 swarm，在 tracemalloc 下走 memory_steps 步（tracemalloc 会拖慢计时，所以分开测）
+      peak_bytes 是相对步进前的峰值增量，alloc_blocks 是这几步分配且在结束时仍然存活的块数
+    """
+    swarm = make_swarm(impl, num_agents, perception_radius, communication_radius, backend, neighbors, seed)
+    for _ in range(warmup):
+        swarm.step(strategy)
+    steps, elapsed = 0, 0.0
+    start = time.perf_counter()
+    while steps < max_steps and (steps < min_steps or elapsed < min_time):
+        swarm.step(strategy)
+        steps += 1
+        elapsed = time.perf_counter() - start
+
+    swarm = make_swarm(impl, num_agents, perception_radius, communication_radius, backend, neighbors, seed)
+    swarm.step(strategy)  # 第一步里的一次性分配（缓存、编译）不算
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(memory_steps):
+        swarm.step(strategy)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "filename"))
+
+    return {
+        "impl": impl, "backend": swarm.backend, "neighbors": neighbors if impl == "q3" else None,
+        "num_agents": num_agents, "perception_radius": perception_radius,
+        "communication_radius": communication_radius, "strategy": strategy,
+        "steps": steps, "seconds": elapsed,
+        "steps_per_sec": steps / elapsed,
+        "agent_steps_per_sec": steps * num_agents / elapsed,
+        "peak_bytes": peak - base,
+        "alloc_blocks": blocks,
+    }
+
+
+def _versions():
+    versions = {"python": platform.python_version(), "numpy": np.__version__}
+    try:
+        import numba
+        versions["numba"] = numba.__version__
+    except ImportError:
+        versions["numba"] = None
+    return versions
+
+
+def run_suite(grid=None, neighbors="grid", verbose=True, **options):
+    """跑整个参数网格，返回 {"meta": 环境信息, "results": [bench_case 的结果]}；options 传给 bench_case"""
+    grid = FULL_GRID if grid is None else grid
+    results = []
+    for case in cases(grid, neighbors):
+        result = bench_case(**dict(case, neighbors=case["neighbors"] or neighbors), **options)
+        results.append(result)
+        if verbose:
+            print(format_row(result), flush=True)
+    meta = dict(_versions(), platform=platform.platform(), machine=platform.machine(),
+                code_version=code_version(), time=datetime.now(timezone.utc).isoformat(timespec="seconds"))
+    return {"meta": meta, "results": results}
+
+
+def format_row(result):
+    return (f"{result['impl']:6s} {result['backend']:6s} N={result['num_agents']:<5d} "
+            f"r={result['perception_radius']:<4g} c={result['communication_radius']:<4g} {result['strategy']:8s} "
+            f"{result['steps_per_sec']:10.1f} steps/s {result['agent_steps_per_sec']:12.0f} agent-steps/s "
+            f"peak {result['peak_bytes'] / 2**20:7.2f} MiB  blocks {result['alloc_blocks']}")
+
+
+def save(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _case_key(result):
+    return tuple(result[k] for k in CASE_KEYS)
+
+
+def compare(old, new):
+    """
+    按配置对齐两份报告，返回 [(配置, 旧 steps/s, 新 steps/s, 新/旧)]，只包含两边都有的配置
+    比值低于多少算变慢由调用方决定（main 里用 --tolerance，变慢时以非零状态退出）
+    """
+    before = {_case_key(r): r for r in old["results"]}
+    rows = []
+    for result in new["results"]:
+        key = _case_key(result)
+        if key in before:
+            a, b = before[key]["steps_per_sec"], result["steps_per_sec"]
+            rows.append((dict(zip(CASE_KEYS, key)), a, b, b / a))
+    return rows
+
+
+def scaling(report):
+    """
+    每条 (impl, backend, 半径, strategy) 曲线上，每步耗时对 N 的 log-log 斜率：
+    ≈1 说明邻居查询是局部的，≈2 就是 O(N²)。至少要有两个 N
+    """
+    curves = {}
+    for r in report["results"]:
+        key = (r["impl"], r["backend"], r["perception_radius"], r["communication_radius"], r["strategy"])
+        curves.setdefault(key, []).append((r["num_agents"], 1.0 / r["steps_per_sec"]))
+    slopes = {}
+    for key, points in curves.items():
+        if len(points) >= 2:
+            n, t = np.log([p[0] for p in points]), np.log([p[1] for p in points])
+            slopes[key] = float(np.polyfit(n, t, 1)[0])
+    return slopes
+
+
+def cold_start(args, repeats=5):
+    """在新的 Python 进程里执行 args（python 之后的参数），返回墙钟时间的中位数（秒）"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_times(targets=IMPORT_TARGETS, repeats=5):
+    """
+    {名字: 秒}：空解释器、import 每个模块、一次无界面的 `python -m swarm_sim run`（1 步）的冷启动耗时
+    减去 "python" 那一项就是 import 本身的开销
+    """
+    report = {"python": cold_start(["-c", "pass"], repeats)}
+    for module in targets:
+        report[module] = cold_start(["-c", f"import {module}"], repeats)
+    report["swarm_sim run (headless)"] = cold_start(list(HEADLESS_RUN), repeats)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Swarm.step throughput benchmark")
+    parser.add_argument("--quick", action="store_true", help="small grid, numpy backend only")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to time each case")
+    parser.add_argument("--neighbors", default="grid", choices=("grid", "kdtree", "brute"))
+    parser.add_argument("--imports", action="store_true", help="measure cold-start import times instead")
+    parser.add_argument("--repeats", type=int, default=5, help="processes per --imports target")
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        report = import_times(repeats=args.repeats)
+        base = report["python"]
+        for name, seconds in report.items():
+            print(f"{name:28s} {seconds * 1e3:8.1f} ms   +{(seconds - base) * 1e3:7.1f} ms")
+        if args.out:
+            save({"meta": {"python": platform.python_version()}, "imports": report}, args.out)
+        return 0
+
+    report = run_suite(QUICK_GRID if args.quick else FULL_GRID, neighbors=args.neighbors, min_time=args.min_time)
+    print("\nscaling exponent of seconds/step vs N:")
+    for key, slope in scaling(report).items():
+        print(f"  {' '.join(map(str, key)):40s} {slope:5.2f}")
+    if args.out:
+        save(report, args.out)
+
+    if args.compare:
+        slower = []
+        for case, a, b, ratio in compare(load(args.compare), report):
+            if ratio < 1 - args.tolerance:
+                slower.append(case)
+                print(f"SLOWER {ratio:5.2f}x  {a:10.1f} -> {b:10.1f} steps/s  {case}")
+        if slower:
+            return 1
+        print(f"no case slower than {1 - args.tolerance:.2f}x of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
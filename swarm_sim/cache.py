@@ -0,0 +1,202 @@
+# sweep 结果的磁盘缓存（SQLite）
+# 一次运行的结果只由 (函数, 全部参数含默认值, seed, trial, 代码版本) 决定，
+# 把它们规范化成 JSON 后取 sha256 作为键；代码改动后版本号变化，旧结果自动失效。
+# 只在主进程里读写，子进程只负责算没命中的任务
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+# 模拟时实际运行的模块（相对 ROOT）。CLI、画图、基准、队列、结果表这些不影响结果的模块不在其中，
+# 改它们不会让缓存失效；sweep.py 里有 task_rng（每个任务的随机数由它决定），所以算在内
+SIM_SOURCES = (
+    "swarm_sim/engine.py", "swarm_sim/world.py", "swarm_sim/neighbors.py", "swarm_sim/targets.py",
+    "swarm_sim/kernels.py", "swarm_sim/convergence.py", "swarm_sim/cluster.py", "swarm_sim/failures.py",
+    "swarm_sim/batch.py", "swarm_sim/domain.py", "swarm_sim/sweep.py",
+    "q1_q2/agent.py", "q1_q2/swarm.py", "q3/agent.py", "q3/swarm.py", "q3/message_bus.py",
+)
+DEFAULT_PATH = ROOT / ".sweep_cache.sqlite"
+MISSING = object()
+
+
+@lru_cache(maxsize=None)
+def _hash_sources(paths, extra=""):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(Path(path).name.encode())
+        digest.update(Path(path).read_bytes())
+    digest.update(extra.encode())
+    return digest.hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def code_version(fn=None):
+    """
+    模拟代码（SIM_SOURCES）加上 fn 自身源码的哈希。
+    只取 fn 的源码而不是整个脚本文件，改画图函数不会让结果失效；
+    fn 调用的同文件辅助函数不在其中，改了它们时请传 ResultCache(version=...) 或 invalidate
+    """
+    paths = tuple(str(ROOT / path) for path in SIM_SOURCES)
+    return _hash_sources(paths, inspect.getsource(fn) if fn is not None else "")
+
+
+def fn_name(fn):
+    """函数的稳定名字：直接运行脚本时 __module__ 是 "__main__"，改用文件名"""
+    module = fn.__module__
+    if module == "__main__":
+        module = Path(inspect.getsourcefile(fn)).stem
+    return f"{module}.{fn.__qualname__}"
+
+
+def _canonical(value):
+    """转成 JSON 能表示、且同值同形的对象（numpy 标量/数组、tuple 都归一）"""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)  # 30 和 30.0 是同一个格子
+    return value
+
+
+def task_params(fn, params, seed, trial):
+    """fn 的完整参数（补上默认值，去掉 rng/rngs）加上 seed、trial"""
+    signature = inspect.signature(fn)
+    bound = signature.bind_partial(**params)
+    bound.apply_defaults()
+    full = {k: v for k, v in bound.arguments.items() if k not in ("rng", "rngs", "seed")}
+    full.update(seed=seed, trial=trial)
+    return _canonical(full)
+
+
+def task_key(fn, params, seed, trial, version=None):
+    """缓存键：sha256(函数名 + 规范化参数 + 代码版本)"""
+    payload = {
+        "fn": fn_name(fn),
+        "params": task_params(fn, params, seed, trial),
+        "version": code_version(fn) if version is None else version,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    path: SQLite 文件，默认放在仓库根目录的 .sweep_cache.sqlite
+    max_bytes: 结果总大小上限，超过时按最近访问时间淘汰（LRU）
+    version: 固定的代码版本号；默认按源码内容自动计算
+    """
+    def __init__(self, path=DEFAULT_PATH, max_bytes=256 * 2**20, version=None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                fn TEXT, params TEXT, version TEXT,
+                value BLOB, size INTEGER, created REAL, accessed REAL)""")
+        self.db.commit()
+
+    def key(self, fn, params, seed, trial):
+        return task_key(fn, params, seed, trial, self.version)
+
+    def get(self, key):
+        """命中返回结果并刷新访问时间，否则返回 MISSING"""
+        row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return MISSING
+        self.db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def put(self, key, value, fn=None, params=None):
+        blob = pickle.dumps(value)
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, fn and fn_name(fn), json.dumps(params),
+             self.version or (code_version(fn) if fn else None), blob, len(blob), now, now))
+
+    def lookup(self, fn, tasks):
+        """tasks: [(params, seed, trial)]，返回 (keys, 已缓存的结果列表，没命中的为 MISSING)"""
+        keys = [self.key(fn, params, seed, trial) for params, seed, trial in tasks]
+        return keys, [self.get(key) for key in keys]
+
+    def record(self, fn, task, key, value):
+        """sweep 每完成一个任务 (params, seed, trial) 调用一次，立即提交"""
+        self.put(key, value, fn, task_params(fn, *task))
+        self.evict()
+        self.db.commit()
+
+    def invalidate(self, fn=None, stale_only=False):
+        """
+        删除缓存：fn 只删该函数的；stale_only 只删代码版本和当前不同的（需要 fn）
+        返回删除的条数
+        """
+        query, args = "DELETE FROM results", []
+        if fn is not None:
+            query += " WHERE fn = ?"
+            args.append(fn_name(fn))
+            if stale_only:
+                query += " AND version != ?"
+                args.append(self.version or code_version(fn))
+        deleted = self.db.execute(query, args).rowcount
+        self.db.commit()
+        return deleted
+
+    def evict(self, max_bytes=None):
+        """总大小超过上限时，从最久没访问的开始删"""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        total = self.size()
+        if total <= limit:
+            return 0
+        rows = self.db.execute("SELECT key, size FROM results ORDER BY accessed").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= limit:
+                break
+            doomed.append((key,))
+            total -= size
+        self.db.executemany("DELETE FROM results WHERE key = ?", doomed)
+        return len(doomed)
+
+    def size(self):
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self):
+        return {"entries": len(self), "bytes": self.size(), "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_cache(cache):
+    """sweep 函数的 cache 参数：None 不用缓存，True 用默认位置，字符串/路径为文件，也可以直接传 ResultCache"""
+    if cache is None or cache is False:
+        return None
+    if isinstance(cache, ResultCache):
+        return cache
+    return ResultCache(DEFAULT_PATH if cache is True else os.fspath(cache))
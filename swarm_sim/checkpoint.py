@@ -0,0 +1,169 @@
+# 断点续跑
+# - SweepLog：sweep 的追加式日志（JSON lines），每完成一个任务写一行并 fsync，
+#   中断后用同一个日志重跑 sweep 会跳过已经完成的任务
+# - save_snapshot / load_snapshot：单次长时间模拟的快照（位置、目标、速度、随机数状态、步数）；
+#   Swarm.run(checkpoint=...) 另外存 run_signature，参数不同的快照拒绝续跑
+import base64
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+from swarm_sim.cache import MISSING, _canonical, fn_name, task_key, task_params
+
+
+class SweepLog:
+    """
+    每行一条记录：key（同 cache.task_key）、函数名、完整参数、结果（pickle 后 base64）、完成时间。
+    写到一半被打断的最后一行在读取时忽略
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.results = {}
+        complete = True
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    complete = line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 中断时没写完的行
+                    self.results[record["key"]] = pickle.loads(base64.b64decode(record["result"]))
+        self.file = open(self.path, "a", encoding="utf-8")
+        if not complete:
+            self.file.write("\n")  # 让新记录从新的一行开始，不和没写完的行粘在一起
+
+    def lookup(self, fn, tasks):
+        """tasks: [(params, seed, trial)]，返回 (keys, 已完成的结果列表，没完成的为 MISSING)"""
+        keys = [task_key(fn, params, seed, trial) for params, seed, trial in tasks]
+        return keys, [self.results.get(key, MISSING) for key in keys]
+
+    def record(self, fn, task, key, value):
+        """追加一条完成记录，写盘后才返回"""
+        line = json.dumps({
+            "key": key,
+            "fn": fn_name(fn),
+            "params": task_params(fn, *task),
+            "result": base64.b64encode(pickle.dumps(value)).decode("ascii"),
+            "time": time.time(),
+        })
+        self.file.write(line + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.results[key] = value
+
+    def __len__(self):
+        return len(self.results)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_log(checkpoint):
+    """sweep 函数的 checkpoint 参数：None 不记日志，字符串/路径为日志文件，也可以直接传 SweepLog"""
+    if checkpoint is None or isinstance(checkpoint, SweepLog):
+        return checkpoint
+    return SweepLog(checkpoint)
+
+
+def rng_state(rng):
+    """Generator 或全局 np.random 的状态，可以 JSON 序列化"""
+    if isinstance(rng, np.random.Generator):
+        return {"kind": "generator", "state": rng.bit_generator.state}
+    name, keys, pos, has_gauss, cached = np.random.get_state()
+    return {"kind": "legacy", "state": [name, keys.tolist(), pos, has_gauss, cached]}
+
+
+def set_rng_state(rng, state):
+    if state["kind"] == "generator":
+        rng.bit_generator.state = state["state"]
+    else:
+        name, keys, pos, has_gauss, cached = state["state"]
+        np.random.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached))
+
+
+SNAPSHOT_ARRAYS = ("positions", "speeds", "perception_radii", "targets")
+
+
+def save_snapshot(swarm, path, **meta):
+    """
+    把 swarm 的状态写到 path（.npz），先写临时文件再改名，中断时不会留下半个快照。
+    meta: 额外要保存的信息（如 run 已经走的步数），必须能 JSON 序列化
+    邻居表、消息总线、recorder 不保存：前两者每步重建，结果与此无关
+    """
+    path = Path(path)
+    header = {"t": swarm.t, "rng": rng_state(swarm.rng), "meta": meta}
+    arrays = {name: getattr(swarm, name) for name in SNAPSHOT_ARRAYS}
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, header=np.array(json.dumps(header)), **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_snapshot(path):
+    """读出快照：{"t", "rng", "meta", 以及 SNAPSHOT_ARRAYS 里的数组}"""
+    with np.load(path) as data:
+        snapshot = json.loads(str(data["header"]))
+        for name in SNAPSHOT_ARRAYS:
+            snapshot[name] = data[name]
+    return snapshot
+
+
+def restore_snapshot(swarm, snapshot):
+    """把快照写回一个同样大小的 swarm（原地修改），之后的每一步和没中断时完全相同"""
+    for name in SNAPSHOT_ARRAYS:
+        current = getattr(swarm, name)
+        if current.shape != snapshot[name].shape:
+            raise ValueError(f"snapshot {name} shape {snapshot[name].shape} does not match swarm {current.shape}")
+        current[...] = snapshot[name]
+    swarm.t = snapshot["t"]
+    set_rng_state(swarm.rng, snapshot["rng"])
+    return snapshot["meta"]
+
+
+def run_signature(swarm, **options):
+    """
+    Swarm.run 的参数（options：strategy、thresh 等）+ swarm 的配置 + 开始时状态（位置、目标、速度、半径、
+    随机数状态）的哈希。存进快照，续跑前比较，换了 seed / 速度 / 半径 / 策略的重跑不会接着旧快照算
+    """
+    digest = hashlib.sha256()
+    for name in SNAPSHOT_ARRAYS:
+        digest.update(np.ascontiguousarray(getattr(swarm, name)).tobytes())
+    digest.update(json.dumps(rng_state(swarm.rng), sort_keys=True).encode())
+    signature = {
+        "swarm": f"{type(swarm).__module__}.{type(swarm).__qualname__}",
+        "backend": swarm.backend,
+        "world": swarm.world.mode,
+        "update": swarm.update,
+        "communication_radius": getattr(swarm, "communication_radius", None),
+        "state": digest.hexdigest()[:16],
+        **options,
+    }
+    return _canonical(signature)
+
+
+def resume_snapshot(swarm, path, signature):
+    """
+    Swarm.run(checkpoint=...) 用：path 的快照是同一个 run（run_signature 相同）时恢复，返回已经走的步数；
+    不同时抛 ValueError，不会悄悄接着别的参数的结果跑（确认不要了就删掉快照文件）
+    """
+    snapshot = load_snapshot(path)
+    saved = snapshot["meta"].get("run")
+    if saved != signature:
+        diff = sorted(key for key in set(signature) | set(saved or {})
+                      if (saved or {}).get(key) != signature.get(key))
+        raise ValueError(f"snapshot {path} belongs to a different run (differs in {', '.join(diff)}); "
+                         "delete it to start over")
+    return restore_snapshot(swarm, snapshot)["steps"]
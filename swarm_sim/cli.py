@@ -0,0 +1,223 @@
+# 命令行入口：python -m swarm_sim run|sweep|render|bench
+# 参数来自 config.yaml（--config，默认仓库根目录的 config.yaml，不存在就用默认值），命令行上给出的再覆盖。
+# 模块顶层只导入标准库；numpy 之外的依赖（PyYAML、Swarm 实现、聚类、渲染、sweep）都在用到时才导入，
+# 无界面的 worker 进程启动时不会加载 matplotlib / sklearn。启动耗时见 python -m swarm_sim bench --imports
+#
+#   python -m swarm_sim run --seed 3
+#   python -m swarm_sim sweep --vary perception_radius=10,30,50 --seeds 0 1 2 --trials 3 --out results.npz
+#   python -m swarm_sim render --out swarm.gif --frames 200
+#   python -m swarm_sim bench --quick
+import argparse
+import importlib
+import itertools
+import os
+import sys
+import time
+
+DEFAULTS = {
+    "model": "q3",             # q3（有通信）或 q1_q2（无通信）
+    "num_agents": 30,
+    "speed": 0.5,
+    "perception_radius": 30,
+    "communication_radius": 50,  # q1_q2 忽略
+    "strategy": "between",
+    "max_steps": 300,
+    "failure_rate": 0.0,       # 见 swarm_sim.failures
+    "recover_delay": 0,
+    "backend": "numpy",
+    "world": "open",
+    "update": "sequential",
+}
+KEY_ALIASES = {"perceptopm_radius": "perception_radius"}  # config.yaml 里的拼写
+STRATEGY_ALIASES = {"midpoint": "between"}  # between 就是走向两个目标的中点
+STRATEGIES = ("between", "behind")
+MODELS = ("q3", "q1_q2")
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yaml")
+
+
+def normalize(params):
+    """键名和策略名换成规范写法，检查取值"""
+    params = {KEY_ALIASES.get(key, key): value for key, value in params.items()}
+    unknown = set(params) - set(DEFAULTS)
+    assert not unknown, f"unknown parameters: {sorted(unknown)}"
+    if "strategy" in params:
+        params["strategy"] = STRATEGY_ALIASES.get(params["strategy"], params["strategy"])
+        assert params["strategy"] in STRATEGIES, f"unknown strategy: {params['strategy']}"
+    if "model" in params:
+        assert params["model"] in MODELS, f"unknown model: {params['model']}"
+    return params
+
+
+def load_config(path=DEFAULT_CONFIG):
+    """读 YAML 配置（需要 PyYAML），返回补全了默认值的参数字典；path 为 None 或文件不存在时只有默认值"""
+    params = dict(DEFAULTS)
+    if path and os.path.exists(path):
+        import yaml
+
+        with open(path, encoding="utf-8") as f:
+            params.update(normalize(yaml.safe_load(f) or {}))
+    return params
+
+
+def make_swarm(model="q3", num_agents=30, speed=0.5, perception_radius=30, communication_radius=50,
+               backend="numpy", world="open", update="sequential", rng=None, recorder=None, **_):
+    """按 model 建 Swarm（实现模块在这里才导入）"""
+    Swarm = importlib.import_module(f"{model}.swarm").Swarm
+    if model == "q1_q2":
+        return Swarm(num_agents, speed=speed, perception_radius=perception_radius, rng=rng, recorder=recorder,
+                     backend=backend, world=world, update=update)
+    return Swarm(num_agents, speed=speed, perception_radius=perception_radius,
+                 communication_radius=communication_radius, rng=rng, recorder=recorder,
+                 backend=backend, world=world, update=update)
+
+
+def _failures(swarm, params, rng):
+    if not params.get("failure_rate"):
+        return None
+    from swarm_sim.failures import Failures
+    return Failures(swarm, params["failure_rate"], params["recover_delay"], rng)
+
+
+def run_trial(rng=None, **params):
+    """
+    一次运行，返回 (收敛那一步的下标或 max_steps, 是否收敛, 簇数)，和 param_sweep_seed.run_once 的结果格式相同；
+    模块顶层函数，可以交给 run_sweep 的子进程 / 分布式 worker
+    """
+    from swarm_sim.cluster import get_cluster_count
+    from swarm_sim.failures import run_with_failures
+
+    params = dict(DEFAULTS, **normalize(params))
+    swarm = make_swarm(rng=rng, **params)
+    steps, converged = run_with_failures(swarm, params["max_steps"], params["strategy"],
+                                         _failures(swarm, params, rng))
+    if converged:
+        steps -= 1
+    return steps, converged, get_cluster_count(swarm.world.unwrap(swarm.positions), eps=0.6)
+
+
+def _scalar(text):
+    """命令行上的值：能转成 int / float 的转成数字，否则保持字符串"""
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            continue
+    return text
+
+
+def _add_params(parser):
+    """DEFAULTS 里每个参数一个 --选项（默认 None，表示沿用配置文件）"""
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="YAML config (default: repo config.yaml)")
+    for key in DEFAULTS:
+        parser.add_argument("--" + key.replace("_", "-"), dest=key, type=_scalar, default=None)
+
+
+def _params(args):
+    params = load_config(args.config)
+    params.update(normalize({key: getattr(args, key) for key in DEFAULTS if getattr(args, key) is not None}))
+    return params
+
+
+def cmd_run(args):
+    import numpy as np
+
+    params = _params(args)
+    start = time.perf_counter()
+    steps, converged, clusters = run_trial(rng=np.random.default_rng(args.seed), **params)
+    print(f"{params['model']} strategy={params['strategy']} perception_radius={params['perception_radius']} "
+          f"failure_rate={params['failure_rate']} recover_delay={params['recover_delay']}")
+    print(f"steps={steps} converged={converged} clusters={clusters} wall={time.perf_counter() - start:.3f}s")
+    return 0
+
+
+def cmd_sweep(args):
+    from swarm_sim.results import ResultStore
+    from swarm_sim.sweep import run_sweep
+
+    base = _params(args)
+    varied = {}
+    for item in args.vary:
+        key, _, values = item.partition("=")
+        key = KEY_ALIASES.get(key, key)
+        assert key in DEFAULTS, f"unknown parameter: {key}"
+        varied[key] = [_scalar(value) for value in values.split(",")]
+    cells = [normalize(dict(base, **dict(zip(varied, values)))) for values in itertools.product(*varied.values())]
+
+    store = ResultStore(("steps", "converged", "clusters"))
+    start = time.perf_counter()
+    run_sweep(run_trial, cells, args.seeds, trials=args.trials, workers=args.workers,
+              cache=True if args.cache else None, store=store)
+    print(f"{len(store)} trials in {time.perf_counter() - start:.2f}s")
+    if varied:
+        agg = store.aggregate(list(varied), stats=("mean", "std"))
+        print(" ".join(f"{key:>20s}" for key in varied) + f" {'steps':>16s} {'conv':>6s} {'clusters':>14s}")
+        for row in agg:
+            print(" ".join(f"{str(row[key]):>20s}" for key in varied)
+                  + f" {row['steps_mean']:8.1f}±{row['steps_std']:<7.1f} {row['converged_mean']:6.2f}"
+                  + f" {row['clusters_mean']:6.2f}±{row['clusters_std']:<7.2f}")
+    if args.out:
+        store.save(args.out)
+        print(f"saved {args.out}")
+    return 0
+
+
+def cmd_render(args):
+    import numpy as np
+    from swarm_sim.recorder import TrajectoryRecorder
+    from swarm_sim.render import convergence_titles, render
+
+    params = _params(args)
+    rng = np.random.default_rng(args.seed)
+    recorder = TrajectoryRecorder(params["num_agents"], capacity=args.frames + 1)
+    swarm = make_swarm(rng=rng, recorder=recorder, **params)
+    failures = _failures(swarm, params, rng)
+    for _ in range(args.frames):
+        if failures is not None:
+            failures.apply(swarm)
+        swarm.step(params["strategy"])
+    frames = recorder.frames()[1:]  # 第 k 帧 = 走完 k+1 步之后的位置，同 param_sweep_* 的动画
+    render(frames, args.out, fps=args.fps, titles=convergence_titles(frames))
+    print(f"saved {args.out}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m swarm_sim", description="swarm simulation tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="one headless run")
+    _add_params(run)
+    run.add_argument("--seed", type=int, default=None)
+    run.set_defaults(func=cmd_run)
+
+    sweep = commands.add_parser("sweep", help="parameter sweep with raw per-trial results")
+    _add_params(sweep)
+    sweep.add_argument("--vary", action="append", default=[], metavar="KEY=V1,V2,...",
+                       help="parameter to sweep (repeat for a grid)")
+    sweep.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2, 3, 4])
+    sweep.add_argument("--trials", type=int, default=1)
+    sweep.add_argument("--workers", type=int, default=None)
+    sweep.add_argument("--cache", action="store_true", help="reuse results from .sweep_cache.sqlite")
+    sweep.add_argument("--out", help="save the raw results (.npz or .parquet)")
+    sweep.set_defaults(func=cmd_sweep)
+
+    render = commands.add_parser("render", help="record a run and render it to GIF / MP4")
+    _add_params(render)
+    render.add_argument("--seed", type=int, default=None)
+    render.add_argument("--frames", type=int, default=100)
+    render.add_argument("--fps", type=int, default=10)
+    render.add_argument("--out", default="swarm.gif")
+    render.set_defaults(func=cmd_render)
+
+    commands.add_parser("bench", help="step throughput / import time benchmark (see swarm_sim.bench)",
+                        add_help=False)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["bench"]:  # 其余参数原样交给 swarm_sim.bench
+        from swarm_sim.bench import main as bench_main
+        return bench_main(argv[1:])
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,136 @@
+# 聚类计数：网格邻居 + 并查集求连通分量，结果和 sklearn 的 DBSCAN 一致
+# eps（0.6）比 100x100 的区域小得多，每个点只需要和相邻格子里的少数点比较
+import numpy as np
+from swarm_sim.neighbors import GridIndex, filter_radius
+
+NOISE = -1
+
+
+def _components(num_points, rows, cols):
+    """并查集（向量化的 hooking + 路径压缩），返回每个点所在分量的最小编号"""
+    parent = np.arange(num_points)
+    while True:
+        root_r, root_c = parent[rows], parent[cols]
+        low = np.minimum(root_r, root_c)
+        new = parent.copy()
+        np.minimum.at(new, root_r, low)
+        np.minimum.at(new, root_c, low)
+        while True:  # 路径压缩
+            jumped = new[new]
+            if np.array_equal(jumped, new):
+                break
+            new = jumped
+        if np.array_equal(new, parent):
+            return parent
+        parent = new
+
+
+def _labels(n, rows, cols, min_samples):
+    """eps 内的点对 (rows, cols)（两个方向都有，不含自己）→ DBSCAN 标签"""
+    labels = np.full(n, NOISE, dtype=np.int64)
+    if n == 0:
+        return labels
+    core = np.bincount(rows, minlength=n) + 1 >= min_samples
+
+    both = core[rows] & core[cols]
+    roots = _components(n, rows[both], cols[both])
+    core_roots = roots[core]
+    # 簇号：按每个簇的最小 core 编号（也就是 root）排序
+    unique_roots = np.unique(core_roots)
+    labels[core] = np.searchsorted(unique_roots, core_roots)
+
+    # 边界点：取相邻 core 点的最小簇号
+    border = (~core[rows]) & core[cols]
+    if border.any():
+        best = np.full(n, np.iinfo(np.int64).max)
+        np.minimum.at(best, rows[border], labels[cols[border]])
+        has = best != np.iinfo(np.int64).max
+        labels[has] = best[has]
+    return labels
+
+
+def _pairs(positions, radius):
+    """距离 <= radius 的所有点对 (rows, cols)，两个方向都有，不含自己"""
+    index = GridIndex(radius).build(positions)
+    return filter_radius(positions, positions, *index.candidates(positions, radius), radius, exclude_self=True)
+
+
+def _count(labels):
+    return len(set(labels)) - (1 if NOISE in labels else 0)
+
+
+def cluster_labels(positions, eps=0.6, min_samples=2):
+    """
+    和 DBSCAN(eps=eps, min_samples=min_samples).fit(positions).labels_ 相同：
+    - core 点：eps 内（含自己）至少 min_samples 个点
+    - core 点之间按 eps 连通成簇，簇号按簇内最小的 core 点编号排序
+    - 非 core 点挂到相邻 core 点里簇号最小的那个簇，没有就是噪声 (-1)
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+    return _labels(len(positions), *_pairs(positions, eps), min_samples)
+
+
+def get_cluster_count(positions, eps=5.0, min_samples=2, backend="grid"):
+    """
+    簇的数量（不含噪声）
+    backend: "grid" 网格 + 并查集（默认）；"dbscan" 用 sklearn 的 DBSCAN，结果相同，用来对照
+    """
+    if backend == "dbscan":
+        from sklearn.cluster import DBSCAN
+        labels = DBSCAN(eps=eps, min_samples=min_samples).fit(positions).labels_
+    else:
+        labels = cluster_labels(positions, eps=eps, min_samples=min_samples)
+    return _count(labels)
+
+
+class ClusterTracker:
+    """
+    跟踪簇数随时间的变化，每 every 步算一次。
+    实现了 record(step, positions)，可以直接作为 Swarm 的 recorder
+    相邻两次之间的状态是复用的（和 neighbors.VerletList 同样的思路）：
+    - 候选点对按 eps + skin 建一次网格表；自建表以来每个 agent 的位移都不超过 skin / 2 时，
+      表里一定包含所有距离 <= eps 的点对，只对这些候选重新算距离，不用重建网格
+    - 和上一次相比没有 agent 移动（收敛后、全部故障时）直接沿用上一次的簇数
+    - skin: 候选表的余量，默认等于 eps
+    """
+    def __init__(self, eps=0.6, min_samples=2, every=1, skin=None):
+        assert every > 0, "every must be positive"
+        self.eps = eps
+        self.min_samples = min_samples
+        self.every = every
+        self.skin = float(eps if skin is None else skin)
+        assert self.skin > 0, "skin must be positive"
+        self.steps = []
+        self.counts = []
+        self.rebuilds = 0      # 重建候选表的次数
+        self.reused = 0        # 位置没变、直接沿用的次数
+        self._reference = None  # 建候选表时的位置
+        self._candidates = None
+        self._last = None
+
+    def record(self, step, positions):
+        if step % self.every:
+            return
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        self.steps.append(step)
+        if self._last is not None and np.array_equal(positions, self._last):
+            self.reused += 1
+            self.counts.append(self.counts[-1])
+            return
+        self._last = positions.copy()
+        self.counts.append(_count(self.labels(positions)))
+
+    def labels(self, positions):
+        """positions 的 DBSCAN 标签（同 cluster_labels），必要时重建候选表"""
+        n = len(positions)
+        if self._reference is None or len(self._reference) != n or \
+                2 * np.linalg.norm(positions - self._reference, axis=1).max(initial=0.0) > self.skin:
+            self._candidates = _pairs(positions, self.eps + self.skin)
+            self._reference = positions.copy()
+            self.rebuilds += 1
+        rows, cols = filter_radius(positions, positions, *self._candidates, self.eps)
+        return _labels(n, rows, cols, self.min_samples)
+
+    def curve(self):
+        """(steps, counts) 两个数组，可以直接画图"""
+        return np.asarray(self.steps), np.asarray(self.counts)
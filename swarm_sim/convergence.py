@@ -0,0 +1,68 @@
+# 收敛检测
+# ConvergenceTracker 用每步的位移增量维护质心，并用 “上次精确值 - 之后的最大位移” 作为最大半径的下界：
+# 下界还没降到阈值以下时不用重新计算，省掉大部分步数里的全量 mean + norm
+import numpy as np
+
+# 抵消 float32 位置的舍入误差，保证下界是保守的：固定留 _EPS，每步再按坐标量级留 _REL
+_EPS = 1e-3
+_REL = 1e-6
+
+
+def measure(positions):
+    """返回 (max_radius, avg_dispersion)：所有 agent 到质心的最大距离和平均距离"""
+    center = positions.mean(axis=0)
+    distances = np.linalg.norm(positions - center, axis=1)
+    return np.max(distances), np.mean(distances)
+
+
+def has_converged(positions, thresh=5.0):
+    """判断一组位置是否收敛：所有 agent 到质心的最大距离 < thresh。"""
+    return measure(positions)[0] < thresh
+
+
+class ConvergenceTracker:
+    """
+    - thresh: 最大半径阈值
+    - dispersion_thresh: 可选的平均距离阈值，两个条件都满足才算收敛
+    - check_every: 每 k 步检查一次
+    """
+    def __init__(self, positions, thresh=5.0, check_every=1, dispersion_thresh=None):
+        assert check_every >= 1, "check_every must be >= 1"
+        self.thresh = thresh
+        self.dispersion_thresh = dispersion_thresh
+        self.check_every = check_every
+        self.count = max(len(positions), 1)
+        self.sum = positions.sum(axis=0, dtype=np.float64)
+        self.steps = 0
+        self.exact_checks = 0
+        self._measure(positions)
+
+    @property
+    def centroid(self):
+        return self.sum / self.count
+
+    def update(self, positions, displacement, max_move):
+        """
+        每步之后调用，返回是否已收敛
+        - displacement: 本步所有 agent 位移之和
+        - max_move: 本步单个 agent 的最大位移
+        """
+        self.steps += 1
+        self.sum += displacement
+        self.moved += max_move + _REL * self.scale
+        if self.steps % self.check_every:
+            return False
+        shift = np.linalg.norm(self.centroid - self.anchor)
+        if self.max_radius - self.moved - shift - _EPS >= self.thresh:
+            return False  # 下界都没到阈值，一定没收敛
+        self._measure(positions)
+        return self.converged
+
+    def _measure(self, positions):
+        self.exact_checks += 1
+        self.max_radius, self.avg_dispersion = measure(positions)
+        self.anchor = self.centroid.copy()
+        self.scale = np.linalg.norm(self.anchor) + self.max_radius + 1.0
+        self.moved = 0.0
+        self.converged = bool(self.max_radius < self.thresh and
+                              (self.dispersion_thresh is None or self.avg_dispersion < self.dispersion_thresh))
@@ -0,0 +1,155 @@
+# 单个大 swarm 的多线程 step：空间区域分解
+# 把场地切成 tx × ty 个 tile，每个 agent 属于它所在的 tile；tile 的成员再加上一圈宽度为
+# max(感知半径, 通信半径) 的 halo（邻 tile 里可能是邻居的 agent）。
+# 每个 tile 在线程池里独立完成：邻居查询 -> 投递 -> 选目标 -> 移动（只写自己的行），
+# 只在 synchronous 更新下成立（所有 agent 读本步开始时的位置和广播），结果和单线程逐位相同。
+# 并行度来自释放 GIL 的部分：numba 内核（nogil=True）和大数组上的 NumPy 运算
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from q3.message_bus import is_used, used_keys
+from swarm_sim.engine import move_rows
+from swarm_sim.neighbors import GridIndex, csr_rows, mask_csr, pairs_to_csr
+from swarm_sim.targets import select_csr
+
+
+class Tiling:
+    """
+    agent 到 tile 的划分
+    - tiles: (tx, ty) tile 数
+    - halo: halo 宽度
+    - world: open 时按当前位置的包围盒切分，reflect / periodic 按 [0, size) 切分；periodic 的 halo 跨边界
+    """
+    def __init__(self, positions, tiles, halo, world):
+        tx, ty = tiles
+        if world.mode == "open":
+            lo = positions.min(axis=0).astype(np.float64)
+            hi = positions.max(axis=0).astype(np.float64)
+        else:
+            lo, hi = np.zeros(2), np.full(2, float(world.size))
+        self.width = np.maximum((hi - lo) / (tx, ty), 1e-9)
+        self.lo = lo
+        cells = np.floor((positions - lo) / self.width).astype(np.int64)
+        cells = np.clip(cells, 0, (tx - 1, ty - 1))
+        tile_of = cells[:, 0] * ty + cells[:, 1]
+        order = np.argsort(tile_of, kind="stable")  # 每个 tile 内保持编号升序
+        bounds = np.searchsorted(tile_of[order], np.arange(tx * ty + 1))
+        self.owned = [order[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+        self.centers = [lo + (np.array(divmod(k, ty)) + 0.5) * self.width for k in range(tx * ty)]
+        self.halo = halo
+        self.world = world
+
+    def members(self, positions, k):
+        """tile k 的成员加 halo：到 tile 矩形的每个坐标方向距离都不超过 halo 的 agent（编号升序）"""
+        delta = np.abs(self.world.wrap_delta(positions - self.centers[k].astype(np.float32)))
+        inside = np.all(delta <= self.width / 2 + self.halo, axis=1)
+        return np.flatnonzero(inside)
+
+
+def default_tiles(threads):
+    """每个线程大约 4 个 tile，方便负载均衡"""
+    side = max(1, math.ceil(math.sqrt(4 * threads)))
+    return side, side
+
+
+def select_tile(positions, perception_radii, communication_radius, broadcast, world, own, members, radius,
+                uniforms, backend="numpy"):
+    """
+    一个 tile 的 receive + 选目标（位置和广播都是本步开始时的）：
+    返回 (inbox 的 (receiver, sender) 点对, own 的新目标, 候选邻居对数)
+    和 q3.Swarm.select_targets 对 own 这些行的结果完全一致
+    """
+    index = GridIndex(radius, world).build(positions[members])
+    indptr, cols = index.query(positions[own], radius, backend=backend)
+    cols = members[cols]  # members 升序，映射回全局编号后每行仍然升序
+    receivers = own[csr_rows(indptr)]
+    indptr, cols = mask_csr(indptr, cols, cols != receivers)
+    pairs = len(cols)
+    receivers = own[csr_rows(indptr)]
+    dist = np.linalg.norm(world.wrap_delta(positions[cols] - positions[receivers]), axis=1)
+    local = dist <= perception_radii[receivers]
+    received = dist <= communication_radius
+    inbox_indptr, inbox = mask_csr(indptr, cols, received)
+    keep = local | received
+    indptr, cols = mask_csr(indptr, cols, keep)
+    keys = used_keys(inbox_indptr, inbox, broadcast)
+    used = is_used(keys, len(broadcast) + 1, csr_rows(indptr), cols)
+    targets = select_csr(indptr, cols, used, uniforms[own])
+    return (receivers[received], inbox), targets, pairs
+
+
+class TiledStepper:
+    """
+    q3.Swarm(update="synchronous", threads=...) 用它走一步
+    - threads: 线程数
+    - tiles: (tx, ty)，默认见 default_tiles
+    """
+    def __init__(self, threads, tiles=None):
+        assert threads >= 1, "threads must be >= 1"
+        self.threads = threads
+        self.tiles = tuple(tiles) if tiles is not None else default_tiles(threads)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def close(self):
+        self.pool.shutdown()
+
+    def step(self, swarm, strategy="between"):
+        """
+        和 Swarm._step_synchronous 相同的一步：广播 -> 各 tile 并行选目标并移动 -> 汇总 inbox、交换缓冲。
+        返回 (位移之和, 最大位移)；位移之和按 tile 累加，和单线程只有浮点求和顺序的差别
+        """
+        prof = swarm.profiler
+        n = len(swarm.positions)
+        read, write = swarm.positions, swarm._back
+        swarm.bus.broadcast(read, swarm.targets)
+        broadcast = swarm.targets.copy()
+        uniforms = swarm.rng.random((n, 2))
+        write[...] = read
+        if prof is not None:
+            prof.lap("broadcast")
+
+        radius = swarm._query_radius() + 1e-3
+        tiling = Tiling(read, self.tiles, radius, swarm.world)
+        if swarm.backend == "numba":
+            code = swarm._kernels.strategy_code(strategy)
+            mode, box = swarm._kernels.world_args(swarm.world)
+
+        def run(k):
+            own = tiling.owned[k]
+            if len(own) == 0:
+                return None
+            members = tiling.members(read, k)
+            inbox, targets, pairs = select_tile(read, swarm.perception_radii, swarm.communication_radius,
+                                                broadcast, swarm.world, own, members, radius, uniforms,
+                                                swarm.backend)
+            swarm.targets[own] = targets  # 各 tile 只写自己的行
+            if swarm.backend == "numba":
+                moved = swarm._kernels.move_rows_kernel(read, write, swarm.speeds, swarm.targets, own,
+                                                        code, mode, box)
+            else:
+                moved = move_rows(write, swarm.speeds, swarm.targets, own, strategy, source=read, world=swarm.world)
+            return inbox, pairs, moved
+
+        displacement, max_move, pairs = np.zeros(2), 0.0, 0
+        rows, senders = [], []
+        for result in self.pool.map(run, range(len(tiling.owned))):
+            if result is None:
+                continue
+            (r, s), p, (d, m) = result
+            rows.append(r)
+            senders.append(s)
+            pairs += p
+            displacement += d
+            max_move = max(max_move, float(m))
+        if prof is not None:
+            prof.lap("kernel")
+            prof.count("neighbor_pairs", pairs)
+
+        if rows:
+            swarm.bus.deliver_all(*pairs_to_csr(np.concatenate(rows), np.concatenate(senders), n))
+        if prof is not None:
+            prof.lap("delivery")
+            prof.count("messages", swarm.bus.message_count)
+        swarm.positions, swarm._back = write, read
+        return displacement, max_move
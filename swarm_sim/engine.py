@@ -0,0 +1,154 @@
+# 向量化的 swarm 引擎
+# 所有 agent 的状态都放在连续的 (N,·) 数组里：positions (N,2) float32,
+# speeds (N,), targets (N,2) int64（没有目标时为 NO_TARGET）。
+# 下面的函数一次处理一批 agent，q1_q2 和 q3 的 Swarm 共用。
+# world（swarm_sim.world.World，可选）决定边界：periodic 时朝目标的最近镜像走，移动后按边界反射 / 取模
+# 编译版本的逐 agent 内核在 kernels.py（backend="numba"）
+import importlib.util
+import numpy as np
+
+NO_TARGET = -1
+BACKENDS = ("numpy", "numba")
+# sequential: 按编号依次移动，agent k 读到 0..k-1 本步已经移动过的位置（原来的语义）
+# synchronous: 所有 agent 都读本步开始时的位置（读缓冲），写到另一块缓冲，走完再交换
+UPDATES = ("sequential", "synchronous")
+
+
+def resolve_backend(backend):
+    """检查 backend 名字；要求 numba 但没装时自动退回 numpy"""
+    assert backend in BACKENDS, f"unknown backend: {backend}"
+    if backend == "numba" and importlib.util.find_spec("numba") is None:
+        return "numpy"
+    return backend
+
+
+def get_directions(self_pos, pos_a, pos_b, strategy="between"):
+    """批量计算方向向量，三个参数都是 (M,2) 数组，运算顺序和 Agent.get_direction 一致"""
+    if strategy == "between":
+        midpoint = (pos_a + pos_b) / 2
+        return midpoint - self_pos
+    elif strategy == "behind":
+        vector = pos_b - pos_a
+        target = pos_b + vector
+        return target - self_pos
+
+    # default no movement
+    return np.zeros_like(self_pos)
+
+
+def normalize(directions):
+    """
+    返回 (单位方向, moving)
+    - moving: 方向长度大于 0 的行，其余行保持 0，表示不移动
+    """
+    norms = np.linalg.norm(directions, axis=1)
+    moving = norms > 0
+    unit = np.zeros_like(directions)
+    unit[moving] = directions[moving] / norms[moving, None]
+    return unit, moving
+
+
+def _images(self_pos, pos_a, pos_b, world):
+    """periodic 世界里把两个目标换成离自己最近的镜像"""
+    if world is None or not world.periodic:
+        return pos_a, pos_b
+    return self_pos + world.delta(self_pos, pos_a), self_pos + world.delta(self_pos, pos_b)
+
+
+def move_rows(positions, speeds, targets, rows, strategy="between", source=None, world=None):
+    """
+    把 rows 里的 agent 各走一步（原地修改 positions）。
+    source: 读取目标位置用的数组，默认就是 positions 本身。
+    返回 (位移之和, 单个 agent 的最大位移)，供收敛检测增量更新质心
+    """
+    rows = np.asarray(rows)
+    tgt = targets[rows]
+    rows = rows[(tgt[:, 0] != NO_TARGET) & (tgt[:, 1] != NO_TARGET)]
+    if len(rows) == 0:
+        return np.zeros(2), 0.0
+    tgt = targets[rows]
+    src = positions if source is None else source
+    self_pos = src[rows]
+    directions = get_directions(self_pos, *_images(self_pos, src[tgt[:, 0]], src[tgt[:, 1]], world), strategy)
+    unit, moving = normalize(directions)
+    rows = rows[moving]
+    return _apply_moves(positions, rows, unit[moving] * speeds[rows, None], world)
+
+
+def _apply_moves(positions, rows, moves, world=None):
+    """
+    位移之和：periodic 用没取模的位移（质心在展开后的坐标里连续变化），reflect 用反射后的实际位移；
+    最大位移总是取这一步要走的长度（反射后的实际位移只会更短）
+    """
+    before = positions[rows] if world is not None and world.mode == "reflect" else None
+    positions[rows] += moves
+    if world is not None:
+        world.confine(positions, rows)
+    if len(rows) == 0:
+        return np.zeros(2), 0.0
+    actual = moves if before is None else positions[rows] - before
+    return actual.sum(axis=0, dtype=np.float64), float(np.linalg.norm(moves, axis=1).max())
+
+
+def dependency_levels(targets):
+    """
+    顺序更新时 agent k 会读到 0..k-1 已经移动过的位置。
+    level[k] = 1 + max(level[j])，j 取 k 的目标中编号比 k 小的那些；同一层的 agent 互不依赖，可以一起算。
+    用不动点迭代求解，迭代次数等于依赖链的最大深度。
+    """
+    n = len(targets)
+    idx = np.arange(n)
+    levels = np.zeros(n, dtype=np.int64)
+    deps = [(targets[:, c], (targets[:, c] != NO_TARGET) & (targets[:, c] < idx)) for c in range(2)]
+    while True:
+        new = levels.copy()
+        for t, m in deps:
+            np.maximum.at(new, idx[m], levels[t[m]] + 1)
+        if np.array_equal(new, levels):
+            return levels
+        levels = new
+
+
+def move_sequential(positions, speeds, targets, strategy="between", world=None):
+    """
+    和逐个 agent 调 update_position 完全等价的批量版本：
+    按 dependency_levels 分层，每层一次向量化计算。
+    编号比自己小的目标读本步更新后的位置，编号比自己大的读本步开始时的位置。
+    返回值同 move_rows
+    """
+    n = len(positions)
+    displacement, max_move = np.zeros(2), 0.0
+    if n == 0:
+        return displacement, max_move
+    old = positions.copy()
+    levels = dependency_levels(targets)
+    order = np.argsort(levels, kind="stable")
+    bounds = np.searchsorted(levels[order], np.arange(levels.max() + 2))
+    idx = np.arange(n)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        rows = order[lo:hi]
+        tgt = targets[rows]
+        valid = (tgt[:, 0] != NO_TARGET) & (tgt[:, 1] != NO_TARGET)
+        rows, tgt = rows[valid], tgt[valid]
+        if len(rows) == 0:
+            continue
+        ahead = tgt < idx[rows, None]
+        pos_a = np.where(ahead[:, :1], positions[tgt[:, 0]], old[tgt[:, 0]])
+        pos_b = np.where(ahead[:, 1:], positions[tgt[:, 1]], old[tgt[:, 1]])
+        self_pos = old[rows]
+        directions = get_directions(self_pos, *_images(self_pos, pos_a, pos_b, world), strategy)
+        unit, moving = normalize(directions)
+        rows = rows[moving]
+        d, m = _apply_moves(positions, rows, unit[moving] * speeds[rows, None], world)
+        displacement += d
+        max_move = max(max_move, m)
+    return displacement, max_move
+
+
+def move_synchronous(read, write, speeds, targets, strategy="between", world=None):
+    """
+    同步更新：所有 agent 只读 read（本步开始时的位置），结果写进 write，read 不变。
+    每一行只依赖 read 和自己的参数，可以任意分块 / 并行计算。返回值同 move_rows
+    """
+    write[...] = read
+    return move_rows(write, speeds, targets, np.arange(len(read)), strategy, source=read, world=world)
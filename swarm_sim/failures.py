@@ -0,0 +1,46 @@
+# agent 故障与恢复（config.yaml 的 failure_rate / recover_delay）
+# 每步开始前，正常的 agent 以 failure_rate 的概率故障：速度变成 0，原地不动 recover_delay 步后恢复原来的速度。
+# 故障的 agent 仍然被别人选作目标（q3 里也照常广播），只是自己不移动。
+# 只改 swarm.speeds，两个 Swarm、两个 backend 的 step 都不用动
+import numpy as np
+from swarm_sim.convergence import ConvergenceTracker
+
+
+class Failures:
+    """
+    - failure_rate: 每步每个正常 agent 的故障概率
+    - recover_delay: 故障持续的步数
+    - rng: np.random.Generator（一般和 swarm 共用同一个）
+    """
+    def __init__(self, swarm, failure_rate, recover_delay, rng):
+        assert 0 <= failure_rate <= 1, "failure_rate must be in [0, 1]"
+        assert recover_delay >= 0, "recover_delay must be >= 0"
+        self.failure_rate = failure_rate
+        self.recover_delay = int(recover_delay)
+        self.rng = rng
+        self.base = swarm.speeds.copy()
+        self.remaining = np.zeros(len(self.base), dtype=np.int64)  # 还要停几步，0 为正常
+
+    @property
+    def down(self):
+        return self.remaining > 0
+
+    def apply(self, swarm):
+        """在 swarm.step 之前调用：抽新的故障，把故障 agent 的速度置 0、恢复的还原"""
+        fail = ~self.down & (self.rng.random(len(self.base)) < self.failure_rate)
+        self.remaining[fail] = self.recover_delay
+        swarm.speeds[...] = np.where(self.down, np.float32(0), self.base)
+        np.maximum(self.remaining - 1, 0, out=self.remaining)
+
+
+def run_with_failures(swarm, max_steps, strategy="between", failures=None, thresh=5.0):
+    """和 Swarm.run 相同的收敛判据和返回值 (走的步数, 是否收敛)，每步之前先 failures.apply"""
+    if failures is None:
+        return swarm.run(max_steps, strategy, thresh=thresh)
+    tracker = ConvergenceTracker(swarm.world.unwrap(swarm.positions), thresh)
+    for step in range(1, max_steps + 1):
+        failures.apply(swarm)
+        moved = swarm.step(strategy)
+        if tracker.update(swarm.world.unwrap(swarm.positions), *moved):
+            return step, True
+    return max_steps, False
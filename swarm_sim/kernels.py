@@ -0,0 +1,287 @@
+# numba 编译的 step 内核（可选）
+# 和 engine.py / q3.Swarm 里的 NumPy 实现逐 agent 等价：同样的 float32 运算顺序，
+# 所以两种 backend 在同样的随机数下得到完全相同的位置和目标。
+# import numba 很慢，只在选了 backend="numba" 时才导入本模块（见 engine.resolve_backend）；
+# 没装 numba 时 njit 退化成普通函数，内核仍可以当作纯 Python 参考实现调用
+# nogil=True 的内核执行时释放 GIL，可以在线程池里并行跑（见 domain.py）
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+from swarm_sim.engine import NO_TARGET
+
+STRATEGIES = {"between": 0, "behind": 1}  # 其它策略不移动
+
+
+def strategy_code(strategy):
+    return STRATEGIES.get(strategy, -1)
+
+
+def world_args(world):
+    """内核的 (mode, box) 参数：mode 同 World.code（0 open / 1 reflect / 2 periodic），box 是 float32 边长"""
+    if world is None:
+        return 0, np.float32(0)
+    return world.code, world.size
+
+
+@njit(cache=True)
+def image(d, mode, box):
+    """坐标差的最近镜像，同 World.wrap_delta"""
+    if mode == 2:
+        half = box / np.float32(2)
+        if d > half:
+            return d - box
+        if d < -half:
+            return d + box
+    return d
+
+
+@njit(cache=True)
+def confine(x, mode, box):
+    """单个坐标的边界处理，同 World.confine"""
+    if mode == 1:
+        if x < 0:
+            x = -x
+        if x > box:
+            x = (box + box) - x
+    elif mode == 2:
+        if x < 0:
+            x = x + box
+        if x >= box:
+            x = x - box
+    return x
+
+
+@njit(cache=True)
+def direction(sx, sy, ax, ay, bx, by, code):
+    """单个 agent 的方向向量，同 engine.get_directions（float32）"""
+    if code == 0:
+        return (ax + bx) / np.float32(2) - sx, (ay + by) / np.float32(2) - sy
+    if code == 1:
+        return (bx + (bx - ax)) - sx, (by + (by - ay)) - sy
+    return np.float32(0), np.float32(0)
+
+
+@njit(cache=True)
+def move_one(positions, speeds, i, ax, ay, bx, by, code, mode, box):
+    """
+    agent i 朝目标走一步（原地修改），返回 (dx, dy, 位移长度)；不动时长度为 0
+    位移的含义同 engine._apply_moves：reflect 时是反射后的实际位移，长度总是这一步要走的长度
+    """
+    sx, sy = positions[i, 0], positions[i, 1]
+    if mode == 2:
+        ax, ay = sx + image(ax - sx, mode, box), sy + image(ay - sy, mode, box)
+        bx, by = sx + image(bx - sx, mode, box), sy + image(by - sy, mode, box)
+    dx, dy = direction(sx, sy, ax, ay, bx, by, code)
+    norm = np.sqrt(dx * dx + dy * dy)
+    if not norm > 0:
+        return np.float32(0), np.float32(0), np.float32(0)
+    mx = dx / norm * speeds[i]
+    my = dy / norm * speeds[i]
+    positions[i, 0] = confine(positions[i, 0] + mx, mode, box)
+    positions[i, 1] = confine(positions[i, 1] + my, mode, box)
+    length = np.sqrt(mx * mx + my * my)
+    if mode == 1:
+        return positions[i, 0] - sx, positions[i, 1] - sy, length
+    return mx, my, length
+
+
+@njit(cache=True)
+def move_sequential_kernel(positions, speeds, targets, code, mode=0, box=np.float32(0)):
+    """engine.move_sequential 的逐 agent 版本，返回 (位移之和 (2,), 最大位移)"""
+    displacement = np.zeros(2)
+    max_move = 0.0
+    for i in range(len(positions)):
+        a, b = targets[i, 0], targets[i, 1]
+        if a == NO_TARGET or b == NO_TARGET:
+            continue
+        mx, my, length = move_one(positions, speeds, i, positions[a, 0], positions[a, 1],
+                                  positions[b, 0], positions[b, 1], code, mode, box)
+        displacement[0] += mx
+        displacement[1] += my
+        max_move = max(max_move, float(length))
+    return displacement, max_move
+
+
+@njit(cache=True)
+def move_synchronous_kernel(read, write, speeds, targets, code, mode=0, box=np.float32(0)):
+    """engine.move_synchronous 的逐 agent 版本：目标位置都从 read 读，结果写进 write"""
+    write[:] = read
+    return move_rows_kernel(read, write, speeds, targets, np.arange(len(read)), code, mode, box)
+
+
+@njit(cache=True, nogil=True)
+def move_rows_kernel(read, write, speeds, targets, rows, code, mode=0, box=np.float32(0)):
+    """
+    只移动 rows 里的 agent：从 read 读位置，写进 write 的对应行（write 其它行不动）。
+    不同线程处理不相交的 rows 时互不干扰
+    """
+    displacement = np.zeros(2)
+    max_move = 0.0
+    for i in rows:
+        a, b = targets[i, 0], targets[i, 1]
+        if a == NO_TARGET or b == NO_TARGET:
+            continue
+        mx, my, length = move_one(write, speeds, i, read[a, 0], read[a, 1], read[b, 0], read[b, 1], code, mode, box)
+        displacement[0] += mx
+        displacement[1] += my
+        max_move = max(max_move, float(length))
+    return displacement, max_move
+
+
+@njit(cache=True)
+def pick_two_one(m, u0, u1):
+    """单个 agent 的 targets.pick_two"""
+    i1 = min(np.int64(np.floor(u0 * m)), m - 1)
+    i2 = min(np.int64(np.floor(u1 * (m - 1))), m - 2)
+    if i2 >= i1:
+        i2 += 1
+    return i1, i2
+
+
+@njit(cache=True)
+def _grow(buffer, size):
+    bigger = np.empty(max(2 * len(buffer), size), dtype=buffer.dtype)
+    bigger[:len(buffer)] = buffer
+    return bigger
+
+
+@njit(cache=True)
+def swarm_step_kernel(positions, speeds, perception_radii, communication_radius, targets,
+                      broadcast, indptr, indices, uniforms, code, mode=0, box=np.float32(0)):
+    """
+    q3.Swarm.step 的一整步（Generator 选目标模式），逐 agent 顺序更新：
+    - 邻居扫描：indptr 为空时扫描全部 agent，否则只看 CSR 候选
+    - 收到消息 = 距离 <= communication_radius；候选 = 感知范围内 + 收到消息的
+    - 去掉 broadcast（本步开始时的目标）里已被占用的，不够两个退回全部候选
+    - mode / box: 世界边界（见 world_args），periodic 时距离取最近镜像
+    返回 (位移之和, 最大位移, inbox_indptr, inbox_indices)
+    """
+    n = len(positions)
+    full = len(indptr) == 0
+    displacement = np.zeros(2)
+    max_move = 0.0
+    used = np.zeros(n + 1, dtype=np.bool_)  # 最后一格对应 NO_TARGET (-1)
+    pool = np.empty(n, dtype=np.int64)
+    final = np.empty(n, dtype=np.int64)
+    senders = np.empty(n, dtype=np.int64)
+    inbox_indptr = np.zeros(n + 1, dtype=np.int64)
+    inbox = np.empty(max(len(indices), 16), dtype=np.int64)
+    count = 0
+    for i in range(n):
+        lo = 0 if full else indptr[i]
+        hi = n if full else indptr[i + 1]
+        num_pool = 0
+        num_senders = 0
+        for k in range(lo, hi):
+            j = k if full else indices[k]
+            if j == i:
+                continue
+            dx = image(positions[j, 0] - positions[i, 0], mode, box)
+            dy = image(positions[j, 1] - positions[i, 1], mode, box)
+            dist = np.sqrt(dx * dx + dy * dy)
+            received = dist <= communication_radius
+            if dist <= perception_radii[i] or received:
+                pool[num_pool] = j
+                num_pool += 1
+            if received:
+                senders[num_senders] = j
+                num_senders += 1
+                used[broadcast[j, 0]] = True
+                used[broadcast[j, 1]] = True
+        # inbox 按行追加（内层循环只写定长的 senders，避免对会扩容的数组反复引用计数）
+        if count + num_senders > len(inbox):
+            inbox = _grow(inbox, count + num_senders)
+        inbox[count:count + num_senders] = senders[:num_senders]
+        count += num_senders
+        inbox_indptr[i + 1] = count
+
+        num_final = 0
+        for k in range(num_pool):
+            if not used[pool[k]]:
+                final[num_final] = pool[k]
+                num_final += 1
+        for k in range(num_senders):
+            used[broadcast[senders[k], 0]] = False
+            used[broadcast[senders[k], 1]] = False
+
+        chosen = final if num_final >= 2 else pool
+        m = num_final if num_final >= 2 else num_pool
+        if m < 2:
+            targets[i, 0] = NO_TARGET
+            targets[i, 1] = NO_TARGET
+            continue
+        i1, i2 = pick_two_one(m, uniforms[i, 0], uniforms[i, 1])
+        a, b = chosen[i1], chosen[i2]
+        targets[i, 0] = a
+        targets[i, 1] = b
+        mx, my, length = move_one(positions, speeds, i, positions[a, 0], positions[a, 1],
+                                  positions[b, 0], positions[b, 1], code, mode, box)
+        displacement[0] += mx
+        displacement[1] += my
+        max_move = max(max_move, float(length))
+    return displacement, max_move, inbox_indptr, inbox[:count].copy()
+
+
+@njit(cache=True, nogil=True)
+def grid_query_kernel(points, positions, origin, cell_size, nx, ny, keys, starts, counts, order,
+                      radius, exclude_self, box):
+    """
+    neighbors.GridIndex.query 的编译版本，索引数组直接用 GridIndex.build 的结果。
+    每行按编号升序，距离判据和 filter_radius 相同（float32 的 sqrt(dx^2+dy^2) <= radius）
+    box > 0 表示 periodic：nx × ny 个格子首尾相接，距离取最近镜像
+    """
+    n = len(points)
+    periodic = box > 0
+    mode = 2 if periodic else 0
+    reach = np.int64(np.ceil(radius / cell_size))
+    span = 2 * reach + 1
+    if periodic and span > nx:
+        span = nx  # 格子比扫描窗口少：每个格子扫一次
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indices = np.empty(max(16, 8 * n), dtype=np.int64)
+    row = np.empty(len(positions), dtype=np.int64)
+    count = 0
+    for i in range(n):
+        cx = np.int64(np.floor((points[i, 0] - origin[0]) / cell_size))
+        cy = np.int64(np.floor((points[i, 1] - origin[1]) / cell_size))
+        if periodic:
+            cx, cy = min(cx, nx - 1), min(cy, ny - 1)
+        num_row = 0
+        for ox in range(span):
+            gx = cx - reach + ox
+            if periodic:
+                gx = ox if span == nx and span < 2 * reach + 1 else gx % nx
+            elif gx < 0:
+                continue
+            for oy in range(span):
+                gy = cy - reach + oy
+                if periodic:
+                    gy = oy if span == nx and span < 2 * reach + 1 else gy % ny
+                elif gy < 0 or gy >= ny:
+                    continue
+                key = gx * ny + gy
+                slot = np.searchsorted(keys, key)
+                if slot == len(keys) or keys[slot] != key:
+                    continue
+                for k in range(starts[slot], starts[slot] + counts[slot]):
+                    j = order[k]
+                    if exclude_self and j == i:
+                        continue
+                    dx = image(positions[j, 0] - points[i, 0], mode, box)
+                    dy = image(positions[j, 1] - points[i, 1], mode, box)
+                    if np.sqrt(dx * dx + dy * dy) <= radius:
+                        row[num_row] = j
+                        num_row += 1
+        if count + num_row > len(indices):
+            indices = _grow(indices, count + num_row)
+        indices[count:count + num_row] = np.sort(row[:num_row])
+        count += num_row
+        indptr[i + 1] = count
+    return indptr, indices[:count].copy()
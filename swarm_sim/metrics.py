@@ -0,0 +1,199 @@
+# 流式的逐步指标
+# stream(swarm, ...) 是一个生成器：每走一步（或每 every 步）产出一条记录（dict），不保存历史位置；
+# 记录交给 sink（CSV / Parquet 写文件，或者 Reducer 在内存里只保留汇总量），内存占用和运行步数无关。
+#
+#   with CSVSink("run.csv") as csv_sink:
+#       summary = Reducer()
+#       pump(stream(swarm, 10_000, cluster_every=50), csv_sink, summary)
+#
+# 字段：step, centroid_x, centroid_y, max_radius, avg_dispersion,
+#       degree_mean, degree_max, degree_min, messages（q3 的消息总线；q1_q2 没有消息，记为 NaN）,
+#       clusters（每 cluster_every 步算一次，其余步为 NaN）, converged
+import csv
+import math
+
+import numpy as np
+from swarm_sim.cluster import get_cluster_count
+from swarm_sim.convergence import ConvergenceTracker, measure
+
+FIELDS = ("step", "centroid_x", "centroid_y", "max_radius", "avg_dispersion",
+          "degree_mean", "degree_max", "degree_min", "messages", "clusters", "converged")
+
+
+def snapshot_metrics(swarm, step, clusters=None, eps=5.0, min_samples=2):
+    """swarm 当前状态的一条记录；clusters=True 时顺便算簇数（periodic 世界用展开后的位置）"""
+    world = getattr(swarm, "world", None)
+    positions = swarm.positions if world is None else world.unwrap(swarm.positions)
+    max_radius, avg_dispersion = measure(positions)
+    centroid = positions.mean(axis=0, dtype=np.float64)
+    record = {"step": step, "centroid_x": float(centroid[0]), "centroid_y": float(centroid[1]),
+              "max_radius": float(max_radius), "avg_dispersion": float(avg_dispersion)}
+
+    bus = getattr(swarm, "bus", None)
+    if bus is not None and len(bus.indptr) == len(swarm.positions) + 1:
+        indptr, _ = bus.finish()
+        degree = np.diff(indptr)
+        record.update(degree_mean=float(degree.mean()) if len(degree) else math.nan,
+                      degree_max=int(degree.max(initial=0)), degree_min=int(degree.min(initial=0)),
+                      messages=int(indptr[-1]))
+    else:
+        record.update(degree_mean=math.nan, degree_max=math.nan, degree_min=math.nan, messages=math.nan)
+    record["clusters"] = (get_cluster_count(positions, eps=eps, min_samples=min_samples)
+                          if clusters else math.nan)
+    return record
+
+
+def stream(swarm, max_steps, strategy="between", every=1, cluster_every=None, eps=5.0, min_samples=2,
+           thresh=None, check_every=1, dispersion_thresh=None):
+    """
+    驱动 swarm 走 max_steps 步，每 every 步 yield 一条记录（第 0 步即初始状态也会产出）
+    - cluster_every: 每多少步算一次簇数（get_cluster_count(eps, min_samples)），None 不算
+    - thresh: 给出时按 ConvergenceTracker 判断收敛，收敛后产出最后一条记录并停止；
+      记录里的 converged 字段就是这个判据（不给 thresh 时恒为 False）
+    swarm 可以是 q1_q2 或 q3 的 Swarm；生成器可以在任意一步 close()，swarm 停在当时的状态
+    """
+    assert every >= 1, "every must be >= 1"
+    assert cluster_every is None or cluster_every >= 1, "cluster_every must be >= 1"
+    world = getattr(swarm, "world", None)
+    unwrap = (lambda p: p) if world is None else world.unwrap
+    tracker = None
+    if thresh is not None:
+        tracker = ConvergenceTracker(unwrap(swarm.positions), thresh, check_every, dispersion_thresh)
+
+    def record(step, converged):
+        clusters = cluster_every is not None and step % cluster_every == 0
+        rec = snapshot_metrics(swarm, step, clusters, eps, min_samples)
+        rec["converged"] = converged
+        return rec
+
+    yield record(0, False)
+    for step in range(1, max_steps + 1):
+        moved = swarm.step(strategy)
+        converged = tracker is not None and tracker.update(unwrap(swarm.positions), *moved)
+        if converged or step % every == 0:
+            yield record(step, converged)
+        if converged:
+            return
+
+
+def pump(records, *sinks):
+    """把 records 依次交给每个 sink.write，结束后 close 所有 sink，返回最后一条记录"""
+    last = None
+    try:
+        for last in records:
+            for sink in sinks:
+                sink.write(last)
+    finally:
+        for sink in sinks:
+            sink.close()
+    return last
+
+
+class CSVSink:
+    """逐行写 CSV，每 flush_every 行 flush 一次"""
+    def __init__(self, path, fields=FIELDS, flush_every=100):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=list(fields), extrasaction="ignore")
+        self.writer.writeheader()
+        self.flush_every = flush_every
+        self.rows = 0
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetSink:
+    """
+    攒够 batch 行写一个 row group，内存里最多 batch 行（需要 pyarrow）
+    所有列按 float64 写（step 为 int64、converged 为 bool），NaN 表示这一步没有该指标
+    """
+    def __init__(self, path, fields=FIELDS, batch=4096):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        types = {"step": pa.int64(), "converged": pa.bool_()}
+        self.schema = pa.schema([(name, types.get(name, pa.float64())) for name in fields])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.fields = tuple(fields)
+        self.batch = batch
+        self.rows = []
+
+    def write(self, record):
+        self.rows.append(record)
+        if len(self.rows) >= self.batch:
+            self._flush()
+
+    def _flush(self):
+        if not self.rows:
+            return
+        columns = {name: [row.get(name) for row in self.rows] for name in self.fields}
+        self.writer.write_table(self._pa.Table.from_pydict(columns, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        if self.writer is not None:
+            self._flush()
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Reducer:
+    """
+    内存里的汇总：每个数值字段的 count / mean / std / min / max（Welford，NaN 跳过），
+    以及最后一条记录。内存占用只和字段数有关
+    """
+    def __init__(self, fields=FIELDS[1:-1]):
+        self.fields = tuple(fields)
+        self.count = dict.fromkeys(self.fields, 0)
+        self.mean = dict.fromkeys(self.fields, 0.0)
+        self._m2 = dict.fromkeys(self.fields, 0.0)
+        self.min = dict.fromkeys(self.fields, math.inf)
+        self.max = dict.fromkeys(self.fields, -math.inf)
+        self.last = None
+
+    def write(self, record):
+        self.last = record
+        for name in self.fields:
+            value = record.get(name)
+            if value is None or value != value:  # NaN
+                continue
+            value = float(value)
+            self.count[name] += 1
+            delta = value - self.mean[name]
+            self.mean[name] += delta / self.count[name]
+            self._m2[name] += delta * (value - self.mean[name])
+            self.min[name] = min(self.min[name], value)
+            self.max[name] = max(self.max[name], value)
+
+    def close(self):
+        pass
+
+    def std(self, name):
+        count = self.count[name]
+        return math.sqrt(self._m2[name] / (count - 1)) if count > 1 else math.nan
+
+    def summary(self):
+        """{字段: {"count", "mean", "std", "min", "max"}}，只含出现过数值的字段"""
+        return {name: {"count": self.count[name], "mean": self.mean[name], "std": self.std(name),
+                       "min": self.min[name], "max": self.max[name]}
+                for name in self.fields if self.count[name]}
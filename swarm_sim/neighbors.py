@@ -0,0 +1,201 @@
+# 邻居索引：把 O(N^2) 的逐对距离扫描换成按格子分桶的半径查询
+# 查询结果统一用 CSR 形式返回：第 i 个查询点的邻居是 indices[indptr[i]:indptr[i+1]]（按编号升序）
+# 传 world（swarm_sim.world.World）且为 periodic 时，网格首尾相接，距离取最近镜像
+import numpy as np
+
+
+def pairs_to_csr(rows, cols, num_rows):
+    """把 (rows, cols) 点对整理成按 (row, col) 排序的 CSR"""
+    width = int(cols.max()) + 1 if len(cols) else 1
+    indices = np.sort(rows * width + cols) % width
+    counts = np.bincount(rows, minlength=num_rows)
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, indices
+
+
+def csr_rows(indptr):
+    """CSR 每个元素所在的行号"""
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def mask_csr(indptr, indices, mask):
+    """只保留 mask 为 True 的元素，行结构不变"""
+    kept = np.concatenate([[0], np.cumsum(mask)])
+    return kept[indptr], indices[mask]
+
+
+def all_pairs_csr(n):
+    """每个点的邻居是其余所有点（全扫描时用）"""
+    indptr = np.arange(n + 1, dtype=np.int64) * max(n - 1, 0)
+    cols = np.tile(np.arange(n - 1), n) if n > 1 else np.zeros(0, dtype=np.int64)
+    rows = np.repeat(np.arange(n), max(n - 1, 0))
+    return indptr, cols + (cols >= rows)
+
+
+def filter_radius(points, positions, rows, cols, radius, exclude_self=False, world=None):
+    """精确过滤候选点对，只保留距离 <= radius 的（距离算法和逐 agent 的 np.linalg.norm 一致）"""
+    delta = positions[cols] - points[rows]
+    if world is not None:
+        delta = world.wrap_delta(delta)
+    dist = np.linalg.norm(delta, axis=1)
+    keep = dist <= radius
+    if exclude_self:
+        keep &= rows != cols
+    return rows[keep], cols[keep]
+
+
+class GridIndex:
+    """
+    均匀网格（cell list）邻居索引
+    - cell_size: 格子边长，一般取查询半径
+    - 格子用哈希（排序后的 key）存储，agent 跑出 100x100 区域也不会让网格变大
+    - world: periodic 时把 [0, size) 分成 nx × nx 个格子（边长放大到能整除 size），查询时格子编号取模
+    """
+    def __init__(self, cell_size, world=None):
+        assert cell_size > 0, "cell_size must be positive"
+        self.world = world if world is not None and world.periodic else None
+        self.nx = 0
+        if self.world is not None:
+            box = float(self.world.size)
+            self.nx = max(int(box // cell_size), 1)
+            cell_size = box / self.nx
+        self.cell_size = float(cell_size)
+        self.positions = None
+
+    def build(self, positions):
+        self.positions = np.asarray(positions)
+        n = len(self.positions)
+        if self.world is not None:
+            self.origin = np.zeros(2)
+        else:
+            self.origin = self.positions.min(axis=0) if n else np.zeros(2)
+        cells = self._cells(self.positions)
+        if self.world is not None:
+            self.ny = self.nx
+        else:
+            self.ny = int(cells[:, 1].max()) + 1 if n else 1
+        keys = cells[:, 0] * self.ny + cells[:, 1]
+        self.order = np.argsort(keys, kind="stable")
+        self.keys, self.starts, self.counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+        return self
+
+    def _cells(self, points):
+        cells = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        if self.world is not None:
+            np.minimum(cells, self.nx - 1, out=cells)  # 紧挨 size 的坐标舍入后可能落到第 nx 格
+        return cells
+
+    def _offsets(self, reach):
+        """要扫描的格子偏移；periodic 时按 nx 取模去重，格子少于 2*reach+1 个时每个格子只扫一次"""
+        offsets = np.arange(-reach, reach + 1)
+        if self.world is not None and len(offsets) > self.nx:
+            offsets = np.arange(self.nx)
+        return offsets
+
+    def candidates(self, points, radius):
+        """返回 (rows, cols)：points[rows] 附近格子里的所有 agent，未做距离过滤"""
+        points = np.asarray(points)
+        empty = np.zeros(0, dtype=np.int64)
+        if len(self.keys) == 0:
+            return empty, empty
+        reach = int(np.ceil(radius / self.cell_size))
+        qcells = self._cells(points)
+        qidx = np.arange(len(points))
+        rows, cols = [], []
+        shifts = self._offsets(reach)
+        for dx in shifts:
+            for dy in shifts:
+                cx = qcells[:, 0] + dx
+                cy = qcells[:, 1] + dy
+                if self.world is not None:
+                    cx, cy = cx % self.nx, cy % self.ny
+                key = cx * self.ny + cy
+                slot = np.searchsorted(self.keys, key)
+                slot[slot == len(self.keys)] = 0
+                found = (cx >= 0) & (cy >= 0) & (cy < self.ny) & (self.keys[slot] == key)
+                if not found.any():
+                    continue
+                start = self.starts[slot[found]]
+                count = self.counts[slot[found]]
+                total = count.sum()
+                offsets = np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+                rows.append(np.repeat(qidx[found], count))
+                cols.append(self.order[np.repeat(start, count) + offsets])
+        if not rows:
+            return empty, empty
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def query(self, points, radius, exclude_self=False, backend="numpy"):
+        """
+        批量半径查询，返回 CSR (indptr, indices)。exclude_self 用于 points 就是建索引的那组位置时
+        backend="numba" 时用 kernels.grid_query_kernel 逐点扫描格子（调用方负责先 resolve_backend）
+        """
+        points = np.asarray(points)
+        if backend == "numba" and len(self.keys):
+            from swarm_sim.kernels import grid_query_kernel
+            box = self.world.size if self.world is not None else np.float32(0)
+            return grid_query_kernel(points, self.positions, self.origin, self.cell_size, self.nx, self.ny,
+                                     self.keys, self.starts, self.counts, self.order,
+                                     float(radius), exclude_self, box)
+        rows, cols = self.candidates(points, radius)
+        rows, cols = filter_radius(points, self.positions, rows, cols, radius, exclude_self, self.world)
+        return pairs_to_csr(rows, cols, len(points))
+
+
+class VerletList:
+    """
+    KD-tree + Verlet skin 的邻居表，跨 step 缓存
+    以 radius + skin 建表；只要自上次建表以来的位移满足 2*max_disp + max_step <= skin，
+    表里就一定包含所有距离 <= radius 的点对，不需要重建
+    - max_step: 本步之内 agent 还可能移动的距离（顺序更新时编号小的 agent 会先动）
+    - world: periodic 时用 cKDTree(boxsize=size) 按最近镜像建表，位移也取最近镜像
+    """
+    def __init__(self, radius, skin, world=None):
+        assert skin > 0, "skin must be positive"
+        self.radius = float(radius)
+        self.skin = float(skin)
+        self.world = world if world is not None and world.periodic else None
+        self.reference = None
+        self.csr = None
+        self.steps = 0
+        self.rebuilds = 0
+        self.skipped = 0
+        self.rebuild_steps = []  # 发生重建的 step 序号
+
+    def update(self, positions, max_step=0.0):
+        """每步开始时调用一次，返回 (indptr, indices)，是真实邻居的超集"""
+        positions = np.asarray(positions)
+        if self.reference is None or len(self.reference) != len(positions):
+            rebuild = True
+        else:
+            delta = positions - self.reference
+            if self.world is not None:
+                delta = self.world.wrap_delta(delta)
+            disp = np.linalg.norm(delta, axis=1).max(initial=0.0)
+            rebuild = 2 * disp + max_step > self.skin
+        if rebuild:
+            self._build(positions)
+            self.rebuilds += 1
+            self.rebuild_steps.append(self.steps)
+        else:
+            self.skipped += 1
+        self.steps += 1
+        return self.csr
+
+    def _build(self, positions):
+        from scipy.spatial import cKDTree
+
+        self.reference = positions.copy()
+        box = None if self.world is None else float(self.world.size)
+        pairs = cKDTree(positions, boxsize=box).query_pairs(self.radius + self.skin, output_type="ndarray")
+        rows = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        cols = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        self.csr = pairs_to_csr(rows, cols, len(positions))
+
+    def stats(self):
+        return {
+            "steps": self.steps,
+            "rebuilds": self.rebuilds,
+            "skipped": self.skipped,
+        }
@@ -0,0 +1,162 @@
+# backend 一致性检查：编译内核和参考实现在同样的随机数下必须逐位相同
+# - q1_q2：backend="numba" 的 Swarm 对照 q1_q2/agent.py 的逐对象 update_position
+# - q3：backend="numba" 对照 backend="numpy"（同一个 seed 的 Generator），比较位置、目标和 inbox
+# - 非 open 的世界 / synchronous 更新：q1_q2 对照 numpy backend；q3 另外检查 grid / kdtree 邻居索引和 brute 全扫描结果相同
+# - synchronous 更新和编号顺序无关：把 agent 重新编号后走一步，结果等于原结果按同样方式重排
+# - 多线程 tile 分解（threads=...）和单线程 synchronous 逐位相同
+# 用法：python -m swarm_sim.parity（check_all，更多随机配置）；tests/test_parity.py 用 pytest 跑同样的检查
+import numpy as np
+from q1_q2.agent import Agent
+from q1_q2.swarm import Swarm as SwarmQ12
+from q3.swarm import Swarm as SwarmQ3
+from swarm_sim.engine import NO_TARGET, UPDATES
+from swarm_sim.world import MODES as WORLDS
+
+STRATEGIES = ("between", "behind")
+NEIGHBORS = ("grid", "brute", "kdtree")
+
+
+def reference_step(positions, speeds, targets, strategy="between"):
+    """用 Agent 对象按编号顺序走一步，返回新位置（不修改输入）"""
+    agents = [Agent(i, p, float(s), 0) for i, (p, s) in enumerate(zip(positions, speeds))]
+    for agent, (a, b) in zip(agents, targets):
+        if a >= 0 and b >= 0:
+            agent.set_targets(agents[a], agents[b])
+    for agent in agents:
+        agent.update_position(strategy)
+    return np.array([agent.position for agent in agents])
+
+
+def check_q1_q2(seed, num_agents=30, steps=50, strategy="between", backend="numba", world="open",
+                update="sequential"):
+    """
+    返回第一个和参考实现不一致的 step，全部一致返回 None。
+    Agent 对象只有 open 世界的顺序更新，其它情况对照 numpy backend
+    """
+    options = dict(world=world, update=update)
+    swarm = SwarmQ12(num_agents, rng=np.random.default_rng(seed), backend=backend, **options)
+    reference = None
+    if world != "open" or update != "sequential":
+        reference = SwarmQ12(num_agents, rng=np.random.default_rng(seed), **options)
+    for t in range(1, steps + 1):
+        if reference is None:
+            expected = reference_step(swarm.positions, swarm.speeds, swarm.targets, strategy)
+        else:
+            reference.step(strategy)
+            expected = reference.positions
+        swarm.step(strategy)
+        if not np.array_equal(swarm.positions, expected):
+            return t
+    return None
+
+
+def check_q3(seed, num_agents=40, steps=30, strategy="between", neighbors="grid", **kwargs):
+    """numpy / numba 两个 backend 逐步比较，返回第一个不一致的 step，全部一致返回 None"""
+    swarms = [SwarmQ3(num_agents, neighbors=neighbors, rng=np.random.default_rng(seed), backend=backend, **kwargs)
+              for backend in ("numpy", "numba")]
+    for t in range(1, steps + 1):
+        inboxes = []
+        for swarm in swarms:
+            swarm.step(strategy)
+            inboxes.append(swarm.bus.finish())
+        a, b = swarms
+        same = (np.array_equal(a.positions, b.positions) and np.array_equal(a.targets, b.targets)
+                and all(np.array_equal(x, y) for x, y in zip(*inboxes)))
+        if not same:
+            return t
+    return None
+
+
+def check_neighbor_modes(seed, num_agents=40, steps=30, strategy="between", **kwargs):
+    """grid / kdtree 的邻居索引和 brute 全扫描逐步比较（numpy backend），返回第一个不一致的 step"""
+    swarms = [SwarmQ3(num_agents, neighbors=neighbors, rng=np.random.default_rng(seed), **kwargs)
+              for neighbors in NEIGHBORS]
+    for t in range(1, steps + 1):
+        for swarm in swarms:
+            swarm.step(strategy)
+        brute = swarms[NEIGHBORS.index("brute")]
+        if not all(np.array_equal(s.positions, brute.positions) and np.array_equal(s.targets, brute.targets)
+                   for s in swarms):
+            return t
+    return None
+
+
+def check_order_independence(seed, num_agents=30, steps=20, strategy="between", world="open"):
+    """synchronous 的 q1_q2：随机重新编号后逐步比较，返回第一个不一致的 step"""
+    swarm = SwarmQ12(num_agents, rng=np.random.default_rng(seed), world=world, update="synchronous")
+    perm = np.random.default_rng(seed + 1).permutation(num_agents)
+    inverse = np.argsort(perm)
+    shuffled = SwarmQ12(num_agents, rng=np.random.default_rng(seed), world=world, update="synchronous")
+    shuffled.positions[:] = swarm.positions[perm]
+    shuffled.speeds[:] = swarm.speeds[perm]
+    targets = swarm.targets[perm]
+    shuffled.targets[:] = np.where(targets == NO_TARGET, NO_TARGET, inverse[targets])
+    for t in range(1, steps + 1):
+        swarm.step(strategy)
+        shuffled.step(strategy)
+        if not np.array_equal(shuffled.positions, swarm.positions[perm]):
+            return t
+    return None
+
+
+def check_threads(seed, num_agents=60, steps=20, strategy="between", threads=3, tiles=(3, 2), **kwargs):
+    """q3 synchronous：单线程和 threads 个线程的 tile 分解逐步比较位置、目标和 inbox"""
+    swarms = [SwarmQ3(num_agents, rng=np.random.default_rng(seed), update="synchronous", threads=th, tiles=tl,
+                      **kwargs) for th, tl in ((None, None), (threads, tiles))]
+    try:
+        for t in range(1, steps + 1):
+            inboxes = []
+            for swarm in swarms:
+                swarm.step(strategy)
+                inboxes.append(swarm.bus.finish())
+            a, b = swarms
+            same = (np.array_equal(a.positions, b.positions) and np.array_equal(a.targets, b.targets)
+                    and all(np.array_equal(x, y) for x, y in zip(*inboxes)))
+            if not same:
+                return t
+        return None
+    finally:
+        for swarm in swarms:
+            swarm.close()
+
+
+def check_all(seeds=range(10), steps=30):
+    """跑一组随机配置，返回不一致的 (配置, step) 列表"""
+    failures = []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        num_agents = int(rng.integers(2, 80))
+        perception = float(rng.uniform(2, 40))
+        communication = float(rng.uniform(5, 60))
+        speeds = rng.uniform(0.2, 2.0, num_agents)
+        for strategy, world, update in ((s, w, u) for s in STRATEGIES for w in WORLDS for u in UPDATES):
+            config = (seed, num_agents, strategy, world, update)
+            t = check_q1_q2(seed, num_agents, steps, strategy, world=world, update=update)
+            if t is not None:
+                failures.append((("q1_q2", *config), t))
+            options = dict(speed_list=speeds, perception_radius=perception, communication_radius=communication,
+                           world=world, update=update)
+            for neighbors in NEIGHBORS:
+                t = check_q3(seed, num_agents, steps, strategy, neighbors, **options)
+                if t is not None:
+                    failures.append((("q3", *config, neighbors), t))
+            t = check_neighbor_modes(seed, num_agents, steps, strategy, **options)
+            if t is not None:
+                failures.append((("q3 neighbors", *config), t))
+        for strategy, world in ((s, w) for s in STRATEGIES for w in WORLDS):
+            t = check_order_independence(seed, num_agents, steps, strategy, world)
+            if t is not None:
+                failures.append((("q1_q2 order", seed, num_agents, strategy, world), t))
+            for backend in ("numpy", "numba"):
+                t = check_threads(seed, num_agents, steps, strategy, speed_list=speeds, perception_radius=perception,
+                                  communication_radius=communication, world=world, backend=backend)
+                if t is not None:
+                    failures.append((("q3 threads", seed, num_agents, strategy, world, backend), t))
+    return failures
+
+
+if __name__ == "__main__":
+    failures = check_all()
+    for config, t in failures:
+        print(f"mismatch at step {t}: {config}")
+    print("parity OK" if not failures else f"{len(failures)} mismatches")
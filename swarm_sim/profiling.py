@@ -0,0 +1,102 @@
+# Swarm.step 的分阶段计时（可选）
+# Swarm(profiler=StepProfiler()) 打开；不传时 step 里只多几个 `is not None` 判断。
+# q3 的顺序更新里各阶段是按 agent 交错进行的，step 先在局部变量里累计，每步每个阶段只记一次（add），
+# 导出 Chrome trace 时把它们在该步的时间段里依次排开（看占比用，不是真实的先后顺序）
+import json
+import time
+
+PHASES = ("broadcast", "neighbor_query", "delivery", "selection", "movement", "kernel", "convergence")
+# kernel: numba backend 把 delivery + selection + movement 编译成一个内核，整体计入这一项；
+#         多线程 step（swarm_sim.domain）里各 tile 并行的部分也计入这一项
+
+
+class StepProfiler:
+    """
+    每步一条记录：步号、开始时间、各阶段耗时（ns）、计数（neighbor_pairs 候选邻居对数、messages 投递消息数）
+    - max_steps: 最多保留多少步的记录，超过后只保留最近的（None 不限）
+    """
+    def __init__(self, max_steps=None):
+        self.max_steps = max_steps
+        self.records = []
+        self._index = {name: k for k, name in enumerate(PHASES)}
+        self._current = None
+        self._last = 0
+
+    def begin_step(self, t):
+        now = time.perf_counter_ns()
+        self._current = {"t": t, "start": now, "phases": [0] * len(PHASES), "counts": {}}
+        self.records.append(self._current)
+        if self.max_steps is not None and len(self.records) > self.max_steps:
+            del self.records[0]
+        self._last = now
+
+    def mark(self):
+        """从现在开始计下一段（跳过两段之间不想计入的代码）"""
+        self._last = time.perf_counter_ns()
+
+    def lap(self, phase):
+        """把上次 mark / lap 到现在的时间计入当前步的 phase"""
+        now = time.perf_counter_ns()
+        self._current["phases"][self._index[phase]] += now - self._last
+        self._last = now
+
+    def add(self, phase, ns):
+        """把在别处累计好的 ns 计入当前步的 phase（不移动 lap 的起点，之后一般接 mark）"""
+        self._current["phases"][self._index[phase]] += ns
+
+    def count(self, name, value):
+        counts = self._current["counts"]
+        counts[name] = counts.get(name, 0) + int(value)
+
+    def __len__(self):
+        return len(self.records)
+
+    def summary(self):
+        """
+        {"steps": 步数, "phases": {阶段: {"total_s", "per_step_ms", "share"}}, "counts": {名字: {"mean", "max"}}}
+        只列出出现过的阶段
+        """
+        steps = max(len(self.records), 1)
+        totals = [sum(r["phases"][k] for r in self.records) for k in range(len(PHASES))]
+        grand = sum(totals) or 1
+        phases = {name: {"total_s": total / 1e9, "per_step_ms": total / steps / 1e6, "share": total / grand}
+                  for name, total in zip(PHASES, totals) if total}
+        names = sorted({name for r in self.records for name in r["counts"]})
+        counts = {}
+        for name in names:
+            values = [r["counts"].get(name, 0) for r in self.records]
+            counts[name] = {"mean": sum(values) / steps, "max": max(values)}
+        return {"steps": len(self.records), "phases": phases, "counts": counts}
+
+    def table(self):
+        """summary 的文字表格"""
+        summary = self.summary()
+        lines = [f"{summary['steps']} steps",
+                 f"{'phase':16s} {'total s':>10s} {'ms/step':>10s} {'share':>7s}"]
+        for name, row in summary["phases"].items():
+            lines.append(f"{name:16s} {row['total_s']:10.4f} {row['per_step_ms']:10.3f} {row['share']:7.1%}")
+        for name, row in summary["counts"].items():
+            lines.append(f"{name:16s} mean {row['mean']:12.1f}   max {row['max']}")
+        return "\n".join(lines)
+
+    def chrome_trace(self, pid=0, tid=0):
+        """Chrome trace（chrome://tracing / Perfetto）格式：每步一个 "step" 事件，里面依次排开各阶段，计数作为 counter"""
+        events = []
+        origin = self.records[0]["start"] if self.records else 0
+        for record in self.records:
+            ts = (record["start"] - origin) / 1e3  # 微秒
+            total = sum(record["phases"]) / 1e3
+            events.append({"name": "step", "ph": "X", "ts": ts, "dur": total, "pid": pid, "tid": tid,
+                           "args": {"t": record["t"]}})
+            offset = ts
+            for name, ns in zip(PHASES, record["phases"]):
+                if ns:
+                    events.append({"name": name, "ph": "X", "ts": offset, "dur": ns / 1e3, "pid": pid, "tid": tid})
+                    offset += ns / 1e3
+            if record["counts"]:
+                events.append({"name": "counts", "ph": "C", "ts": ts, "pid": pid, "args": dict(record["counts"])})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path, **kwargs):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(**kwargs), f)
@@ -0,0 +1,62 @@
+# 轨迹记录器：预分配 (T,N,2) float32 缓冲区，q1_q2 和 q3 的 Swarm 共用
+import numpy as np
+
+
+class TrajectoryRecorder:
+    """
+    - capacity: 缓冲区能存多少帧
+    - stride: 每 stride 步记录一帧（第 0 步即初始位置总会记录）
+    - ring: True 时只保留最近 capacity 帧（环形覆盖）；False 时写满会报错
+    - path: 给出时缓冲区用 np.memmap 放在磁盘上，长时间、大 N 的运行不占内存
+    """
+    def __init__(self, num_agents, capacity, stride=1, ring=False, path=None):
+        assert capacity > 0 and stride > 0, "capacity and stride must be positive"
+        self.num_agents = num_agents
+        self.capacity = capacity
+        self.stride = stride
+        self.ring = ring
+        self.path = path
+        shape = (capacity, num_agents, 2)
+        if path is None:
+            self.buffer = np.empty(shape, dtype=np.float32)
+        else:
+            self.buffer = np.memmap(path, dtype=np.float32, mode="w+", shape=shape)
+        self.step_ids = np.empty(capacity, dtype=np.int64)
+        self.count = 0  # 一共记录过多少帧（ring 模式下可能大于 capacity）
+
+    def record(self, step, positions):
+        """Swarm 每步之后调用；不在 stride 上的步直接跳过"""
+        if step % self.stride:
+            return
+        if self.count >= self.capacity and not self.ring:
+            raise RuntimeError(f"recorder is full ({self.capacity} frames); use a larger capacity or ring=True")
+        slot = self.count % self.capacity
+        self.buffer[slot] = positions
+        self.step_ids[slot] = step
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def _order(self):
+        """按时间顺序排列的槽位下标"""
+        if self.count <= self.capacity:
+            return np.arange(self.count)
+        return np.roll(np.arange(self.capacity), -(self.count % self.capacity))
+
+    def frames(self):
+        """按时间顺序的 (K,N,2) 帧；没有绕回时是缓冲区的视图，不拷贝"""
+        if self.count <= self.capacity:
+            return self.buffer[:self.count]
+        return self.buffer[self._order()]
+
+    def steps(self):
+        """每一帧对应的 step 序号"""
+        return self.step_ids[self._order()]
+
+    def __getitem__(self, i):
+        return self.buffer[self._order()[i]]
+
+    def flush(self):
+        if isinstance(self.buffer, np.memmap):
+            self.buffer.flush()
@@ -0,0 +1,139 @@
+# 离线渲染：把记录好的轨迹直接光栅化成 NumPy 图像，再流式写入 GIF / MP4
+# 不经过 matplotlib，也不和模拟耦合，适合批量生成参数网格的动画
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# 调色板：0 = 背景（白），1 = agent（matplotlib 默认的 tab:blue），2 = 标题文字（黑）
+PALETTE = np.array([[255, 255, 255], [31, 119, 180], [0, 0, 0]], dtype=np.uint8)
+TEXT = 2
+
+
+def _disc(radius):
+    r = int(np.ceil(radius))
+    oy, ox = np.mgrid[-r:r + 1, -r:r + 1]
+    inside = ox ** 2 + oy ** 2 <= radius ** 2
+    return oy[inside], ox[inside]
+
+
+def rasterize(frames, width=400, height=400, extent=(0, 100, 0, 100), radius=4):
+    """
+    frames: (K,N,2) 位置 -> (K,H,W) uint8 调色板图像（下标对应 PALETTE）
+    extent: (xmin, xmax, ymin, ymax)，和 ax.set_xlim / set_ylim 一样，范围外的点不画
+    radius: 点的像素半径
+    """
+    frames = np.asarray(frames)
+    num_frames = len(frames)
+    xmin, xmax, ymin, ymax = extent
+    px = np.rint((frames[..., 0] - xmin) / (xmax - xmin) * (width - 1))
+    py = np.rint((1 - (frames[..., 1] - ymin) / (ymax - ymin)) * (height - 1))
+    finite = np.isfinite(px) & np.isfinite(py)
+    px = np.where(finite, px, -width - radius - 1).astype(np.int64)
+    py = np.where(finite, py, -height - radius - 1).astype(np.int64)
+
+    oy, ox = _disc(radius)
+    cx = px[..., None] + ox
+    cy = py[..., None] + oy
+    inside = (cx >= 0) & (cx < width) & (cy >= 0) & (cy < height)
+    k = np.broadcast_to(np.arange(num_frames)[:, None, None], cx.shape)
+    images = np.zeros((num_frames, height, width), dtype=np.uint8)
+    images[k[inside], cy[inside], cx[inside]] = 1
+    return images
+
+
+def iter_images(frames, chunk=64, **kwargs):
+    """分块光栅化，避免一次把所有帧的图像放进内存"""
+    for start in range(0, len(frames), chunk):
+        yield from rasterize(frames[start:start + chunk], **kwargs)
+
+
+def convergence_titles(frames, thresh=5.0, running="Step {step}", converged="Converged at step {step}"):
+    """
+    每帧的标题，和原来 FuncAnimation 里的写法相同：没收敛时 running，收敛后 converged（step 是帧号）。
+    running 里也可以写别的信息，比如 "Swarm Strategy: between (Step {step})"
+    """
+    from swarm_sim.convergence import has_converged
+
+    return [(converged if has_converged(positions, thresh) else running).format(step=step)
+            for step, positions in enumerate(frames)]
+
+
+def draw_titles(images, titles, xy=(6, 4)):
+    """在每帧左上角写一行标题（PIL 默认字体，颜色为调色板的 TEXT），逐帧 yield"""
+    from PIL import Image, ImageDraw
+
+    for a, title in zip(images, titles):
+        im = Image.fromarray(a)
+        ImageDraw.Draw(im).text(xy, title, fill=TEXT)
+        yield np.asarray(im)
+
+
+def save_gif(images, path, fps=10, palette=PALETTE):
+    from PIL import Image
+
+    def to_image(a):
+        im = Image.fromarray(a)
+        im.putpalette(palette.ravel().tolist())
+        return im
+
+    images = iter(images)
+    first = to_image(next(images))
+    first.save(path, save_all=True, append_images=(to_image(a) for a in images),
+               duration=int(1000 / fps), loop=0, optimize=False)
+
+
+def save_mp4(images, path, fps=10, palette=PALETTE):
+    """通过 ffmpeg 管道逐帧写入 MP4（需要系统里有 ffmpeg）"""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("saving MP4 requires ffmpeg on PATH")
+    images = iter(images)
+    first = next(images)
+    height, width = first.shape
+    cmd = [ffmpeg, "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24",
+           "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+           "-pix_fmt", "yuv420p", "-vcodec", "libx264", path]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        proc.stdin.write(palette[first].tobytes())
+        for a in images:
+            proc.stdin.write(palette[a].tobytes())
+    finally:
+        proc.stdin.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed while writing {path}")
+
+
+def render(frames, path, fps=10, titles=None, **kwargs):
+    """
+    把 (K,N,2) 轨迹渲染到 path，按扩展名选 GIF 或 MP4；kwargs 传给 rasterize
+    titles: 每帧的标题（字符串列表），或者 frames -> 标题列表 的函数（如 convergence_titles，可以交给 render_many）
+    """
+    images = iter_images(frames, **kwargs)
+    if titles is not None:
+        images = draw_titles(images, titles(frames) if callable(titles) else titles)
+    if path.lower().endswith(".mp4"):
+        save_mp4(images, path, fps=fps)
+    else:
+        save_gif(images, path, fps=fps)
+    return path
+
+
+def _record_and_render(record_fn, params, path, options):
+    return render(record_fn(**params), path, **options)
+
+
+def render_many(record_fn, jobs, workers=None, **options):
+    """
+    并行渲染多组参数：jobs 是 [(params, path), ...]，
+    每个任务在子进程里调用 record_fn(**params) 得到 (K,N,2) 轨迹再渲染（record_fn 必须是模块顶层函数）
+    """
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(jobs) <= 1:
+        return [_record_and_render(record_fn, params, path, options) for params, path in jobs]
+    n = len(jobs)
+    with ProcessPoolExecutor(max_workers=min(workers, n)) as pool:
+        return list(pool.map(_record_and_render, [record_fn] * n, [p for p, _ in jobs],
+                             [path for _, path in jobs], [options] * n))
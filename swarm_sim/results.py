@@ -0,0 +1,303 @@
+# 列式的 sweep 结果表
+# 每个 (格子, seed, trial) 一行：格子的全部参数、seed、trial、结果的各个字段（steps / converged / clusters ...）
+# 和单次耗时 wall_time（从缓存 / 断点日志读出的任务没有耗时，记为 NaN）。
+# 列存成 NumPy 数组，table() 拼成一个结构化数组；aggregate 用 np.unique + bincount 分组汇总，
+# 几十万行重新分组只要几毫秒，换一种画法不用重跑 sweep。
+#
+#   store = ResultStore(("steps", "converged", "clusters"))
+#   run_sweep(run_once, cells, seeds, trials=3, store=store)
+#   agg = aggregate(store.table(), by=("strategy", "perception_radius"), values=("steps", "clusters"))
+#   x, mean, std = series(agg, "perception_radius", "steps", strategy="between")
+#
+# 保存：.npz（np.savez，不需要额外依赖）或 .parquet（需要 pyarrow）
+import math
+
+import numpy as np
+
+META = ("seed", "trial", "wall_time")
+STATS = ("mean", "std", "count", "min", "max")
+
+
+def _column(values):
+    """一列 Python 值 -> 数组：bool / int64 / float64 / 定长字符串"""
+    if all(isinstance(v, (bool, np.bool_)) for v in values):
+        return np.asarray(values, dtype=bool)
+    if all(isinstance(v, (int, np.integer)) and not isinstance(v, (bool, np.bool_)) for v in values):
+        return np.asarray(values, dtype=np.int64)
+    if all(isinstance(v, (int, float, np.number)) for v in values):
+        return np.asarray(values, dtype=np.float64)
+    return np.asarray([str(v) for v in values])
+
+
+def _missing(dtype, n):
+    """补齐后来才出现的列：数值为 NaN，字符串为空串"""
+    if dtype.kind in "US":
+        return np.full(n, "", dtype=dtype)
+    return np.full(n, math.nan)
+
+
+class ResultStore:
+    """
+    原始结果表
+    - fields: 结果元组各位置的列名，例如 run_once 的 ("steps", "converged", "clusters")；
+      结果不是元组时只有一列 fields[0]
+    可以直接传给 run_tasks / run_sweep / run_batched_sweep / run_adaptive_sweep 的 store 参数
+    """
+    def __init__(self, fields=("steps", "converged", "clusters")):
+        self.fields = tuple(fields)
+        self._chunks = []  # [(行数, {列名: 数组})]
+        self._columns = None
+        self._table = None
+        self._factors = {}  # 列名 -> factorize 结果，追加新行后失效
+
+    def __len__(self):
+        return sum(n for n, _ in self._chunks)
+
+    def extend(self, tasks, results, times=None):
+        """追加一批任务 [(params, seed, trial)] 的结果；times 是每个任务的耗时（秒），缺省为 NaN"""
+        if not tasks:
+            return
+        n = len(tasks)
+        times = [math.nan] * n if times is None else times
+        names = sorted({name for params, _, _ in tasks for name in params})
+        assert not set(names) & set(META + self.fields), "parameter names clash with result columns"
+        columns = {name: _column([params.get(name, math.nan) for params, _, _ in tasks]) for name in names}
+        columns["seed"] = np.asarray([seed for _, seed, _ in tasks], dtype=np.int64)
+        columns["trial"] = np.asarray([trial for _, _, trial in tasks], dtype=np.int64)
+        rows = [result if isinstance(result, tuple) else (result,) for result in results]
+        assert all(len(row) <= len(self.fields) for row in rows), "result has more values than fields"
+        for k, name in enumerate(self.fields):
+            if any(len(row) > k for row in rows):
+                columns[name] = _column([row[k] if len(row) > k else math.nan for row in rows])
+        columns["wall_time"] = np.asarray(times, dtype=np.float64)
+        self._chunks.append((n, columns))
+        self._columns = None
+        self._table = None
+        self._factors = {}
+
+    def add(self, params, seed, trial, result, wall_time=math.nan):
+        self.extend([(params, seed, trial)], [result], [wall_time])
+
+    def append(self, other):
+        """把另一个 ResultStore 的所有行追加进来（结果字段要相同）"""
+        assert other.fields == self.fields, "result fields differ"
+        self._chunks += other._chunks
+        self._columns = None
+        self._table = None
+        self._factors = {}
+
+    def columns(self):
+        """{列名: 连续的一维数组}（列 = 参数、seed、trial、结果字段、wall_time），缓存到下次追加"""
+        if self._columns is not None:
+            return self._columns
+        order = []
+        for _, columns in self._chunks:
+            order += [name for name in columns if name not in order]
+        params = sorted(name for name in order if name not in META + self.fields)
+        names = params + ["seed", "trial"] + [f for f in self.fields if f in order] + ["wall_time"]
+        merged = {}
+        for name in names:
+            parts = [columns.get(name) for _, columns in self._chunks]
+            kinds = [p for p in parts if p is not None]
+            if any(p.dtype.kind in "US" for p in kinds):
+                kinds = [p.astype(str) for p in kinds]
+            dtype = np.result_type(*kinds)
+            if len(kinds) < len(parts) and dtype.kind in "biu":
+                dtype = np.dtype(np.float64)  # 有缺失的整数 / bool 列改成浮点，缺失记为 NaN
+            merged[name] = np.concatenate([_missing(dtype, n) if p is None else p
+                                           for (n, _), p in zip(self._chunks, parts)]).astype(dtype, copy=False)
+        self._columns = merged
+        return merged
+
+    def table(self):
+        """所有行拼成一个结构化数组，列同 columns()"""
+        if self._table is None:
+            columns = self.columns()
+            self._table = np.empty(len(self), dtype=[(name, values.dtype) for name, values in columns.items()])
+            for name, values in columns.items():
+                self._table[name] = values
+        return self._table
+
+    def aggregate(self, by, values=None, stats=STATS):
+        """
+        aggregate(self.columns(), ...)：直接在连续的列上算（比结构化数组的跨步访问快），
+        分组列的 factorize 结果缓存起来，换统计量 / 换值列时不再重算；values 默认是所有结果字段
+        """
+        columns = self.columns()
+        by = [by] if isinstance(by, str) else list(by)
+        for name in by:
+            if name not in self._factors:
+                self._factors[name] = factorize(columns[name])
+        values = [f for f in self.fields if f in columns] if values is None else values
+        return aggregate(columns, by, values, stats, self._factors)
+
+    @classmethod
+    def from_table(cls, table, fields=None):
+        """从结构化数组恢复（fields 默认取 table 里出现的默认结果字段）"""
+        if fields is None:
+            fields = [f for f in cls().fields if f in table.dtype.names]
+        store = cls(fields)
+        if len(table):
+            store._chunks.append((len(table), {name: np.asarray(table[name]) for name in table.dtype.names}))
+        return store
+
+    def save(self, path):
+        """按扩展名保存：.parquet 用 pyarrow，其它用 np.savez"""
+        table = self.table()
+        if str(path).endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            columns = {name: table[name] for name in table.dtype.names}
+            meta = {b"fields": ",".join(self.fields).encode()}
+            pq.write_table(pa.table(columns).replace_schema_metadata(meta), path)
+        else:
+            columns = {f"col_{name}": table[name] for name in table.dtype.names}
+            np.savez(path, fields=np.asarray(self.fields), **columns)
+
+    @classmethod
+    def load(cls, path):
+        if str(path).endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            data = pq.read_table(path)
+            meta = data.schema.metadata or {}
+            fields = meta.get(b"fields", b"").decode().split(",") if b"fields" in meta else None
+            columns = {name: data.column(name).to_numpy(zero_copy_only=False) for name in data.column_names}
+        else:
+            with np.load(path) as data:
+                fields = [str(f) for f in data["fields"]]
+                columns = {key[4:]: data[key] for key in data.files if key.startswith("col_")}
+        columns = {name: values.astype(str) if values.dtype == object else values
+                   for name, values in columns.items()}
+        table = np.empty(len(next(iter(columns.values()), [])),
+                         dtype=[(name, values.dtype) for name, values in columns.items()])
+        for name, values in columns.items():
+            table[name] = values
+        return cls.from_table(table, fields)
+
+
+def where(table, **conditions):
+    """按列值筛选：where(t, strategy="between", hetero_speed=True)"""
+    mask = np.ones(len(table), dtype=bool)
+    for name, value in conditions.items():
+        mask &= table[name] == value
+    return table[mask]
+
+
+def factorize(column):
+    """(各不相同的值（升序）, 每行对应的序号)；取值范围不大的整数 / bool 列用 bincount，不用排序"""
+    if column.dtype.kind in "biu" and len(column):
+        lo, hi = int(column.min()), int(column.max())
+        if hi - lo <= 4 * len(column):
+            offset = column.astype(np.int64) - lo
+            present = np.flatnonzero(np.bincount(offset, minlength=hi - lo + 1))
+            remap = np.zeros(hi - lo + 1, dtype=np.int64)
+            remap[present] = np.arange(len(present))
+            return (present + lo).astype(column.dtype), remap[offset]
+    uniques, inverse = np.unique(column, return_inverse=True)
+    return uniques, inverse.reshape(-1)
+
+
+def group_by(table, by, factors=None):
+    """
+    table: 结构化数组，或 {列名: 一维数组}（ResultStore.columns()）
+    返回 (各组的键（结构化数组，按键的字典序）, 每行所在组的序号)
+    各列分别 factorize 后按混合进制合成一个整数编码；factors 是预先算好的 {列名: factorize 结果}（可选）
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    factors = factors or {}
+    n = len(table[by[0]])
+    levels, code = [], np.zeros(n, dtype=np.int64)
+    for name in by:
+        uniques, inverse = factors[name] if name in factors else factorize(table[name])
+        levels.append(uniques)
+        code = code * len(uniques) + inverse
+    total = math.prod(len(uniques) for uniques in levels)
+    if total <= 4 * n + 1:
+        present = np.flatnonzero(np.bincount(code, minlength=total))
+        remap = np.zeros(total, dtype=np.int64)
+        remap[present] = np.arange(len(present))
+        inverse = remap[code]
+    else:
+        present, inverse = np.unique(code, return_inverse=True)
+        inverse = inverse.reshape(-1)
+    keys = np.empty(len(present), dtype=[(name, uniques.dtype) for name, uniques in zip(by, levels)])
+    rest = present
+    for name, uniques in reversed(list(zip(by, levels))):
+        rest, digit = np.divmod(rest, len(uniques))
+        keys[name] = uniques[digit]
+    return keys, inverse
+
+
+def aggregate(table, by, values=("steps", "converged", "clusters"), stats=STATS, factors=None):
+    """
+    按 by 列分组，对 values 每列算 stats（mean / std（总体标准差，同 np.std）/ count / min / max），
+    NaN 不参与统计。返回结构化数组：by 的各列 + "<列>_<统计量>"，每组一行，按键排序
+    table: 同 group_by；factors: 同 group_by（ResultStore.aggregate 会缓存各列的 factorize 结果）
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    values = [values] if isinstance(values, str) else list(values)
+    assert set(stats) <= set(STATS), f"unknown stats: {set(stats) - set(STATS)}"
+    keys, inverse = group_by(table, by, factors)
+    groups = len(keys)
+    out = {}
+    if "min" in stats or "max" in stats:
+        small = inverse.astype(np.int16) if groups < 2 ** 15 else inverse  # 16 位整数的稳定排序是基数排序
+        order = np.argsort(small, kind="stable")
+        starts = np.searchsorted(inverse[order], np.arange(groups))
+    sizes = np.bincount(inverse, minlength=groups)
+    for name in values:
+        column = table[name]
+        x = column.astype(np.float64)
+        if column.dtype.kind == "f":  # 只有浮点列可能有 NaN
+            valid = ~np.isnan(x)
+            count = np.bincount(inverse, weights=valid, minlength=groups)
+            x_min, x_max = np.where(valid, x, np.inf), np.where(valid, x, -np.inf)
+            x = np.where(valid, x, 0.0)
+        else:
+            valid, count, x_min, x_max = None, sizes, x, x
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.bincount(inverse, weights=x, minlength=groups) / count
+            dev = x - mean[inverse]
+            if valid is not None:
+                dev[~valid] = 0.0
+            std = np.sqrt(np.bincount(inverse, weights=dev * dev, minlength=groups) / count)
+        result = {"mean": mean, "std": std, "count": count.astype(np.int64)}
+        if "min" in stats or "max" in stats:
+            result["min"] = np.minimum.reduceat(x_min[order], starts)
+            result["max"] = np.maximum.reduceat(x_max[order], starts)
+            empty = count == 0
+            result["min"][empty] = result["max"][empty] = math.nan
+        for stat in stats:
+            out[f"{name}_{stat}"] = result[stat]
+    dtype = [(name, keys[name].dtype) for name in by] + [(name, column.dtype) for name, column in out.items()]
+    agg = np.empty(groups, dtype=dtype)
+    for name in by:
+        agg[name] = keys[name]
+    for name, column in out.items():
+        agg[name] = column
+    return agg
+
+
+def series(agg, x, value, stat="std", **conditions):
+    """
+    aggregate 结果里的一条曲线：(x 列, <value>_mean, <value>_<stat>)，按 x 排序；
+    conditions 先筛选（例如 strategy="between"），可直接交给 plot_with_errorbars
+    """
+    rows = where(agg, **conditions)
+    rows = rows[np.argsort(rows[x], kind="stable")]
+    return rows[x], rows[f"{value}_mean"], rows[f"{value}_{stat}"]
+
+
+def series_by(agg, group, x, value, stat="std", **conditions):
+    """
+    按 group 列拆成多条曲线：返回 (组名列表, {组: 均值数组}, {组: stat 数组})，
+    对应 plot_cluster_comparison(strategies, avg_dict, std_dict) 的参数
+    """
+    rows = where(agg, **conditions)
+    names = [name.item() if hasattr(name, "item") else name for name in np.unique(rows[group])]
+    means, spreads = {}, {}
+    for name in names:
+        _, means[name], spreads[name] = series(rows, x, value, stat, **{group: name})
+    return names, means, spreads
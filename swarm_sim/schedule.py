@@ -0,0 +1,116 @@
+# 自适应 sweep 调度
+# - CostModel：根据已完成任务的实际耗时预测新格子的耗时，run_tasks 据此从长到短提交任务
+# - run_adaptive_sweep：分轮追加重复次数，某个格子收敛步数的置信区间足够窄就不再给它加任务
+import inspect
+import json
+import math
+from statistics import NormalDist
+
+import numpy as np
+from swarm_sim.cache import _canonical
+from swarm_sim.sweep import run_tasks
+
+
+class CostModel:
+    """
+    每个格子的耗时预测（秒）：
+    - 参数完全相同的格子跑过：取观测值的中位数
+    - 否则：在 log(数值参数) 空间里找最近的已观测格子，再按先验的比例缩放
+    - 还没有任何观测：只用先验（只用于排序，量纲无所谓）
+    先验 = max_steps * N * (1 + N * 邻域面积占比)，邻域半径取感知 / 通信半径里大的那个，
+    对应每步的邻居扫描量；通信半径越大越靠前
+    fn: 可选，用它的默认参数补全格子里没写的参数
+    """
+    def __init__(self, fn=None):
+        self.defaults = {}
+        if fn is not None:
+            self.defaults = {k: p.default for k, p in inspect.signature(fn).parameters.items()
+                             if p.default is not inspect.Parameter.empty}
+        self.times = {}
+
+    def _params(self, params):
+        full = dict(self.defaults, **params)
+        return {k: float(v) for k, v in full.items()
+                if isinstance(v, (int, float, np.number)) and not isinstance(v, bool)}
+
+    def _key(self, params):
+        """规范化后的 JSON（和缓存键同样的处理），列表 / 数组参数也能作键"""
+        return json.dumps(_canonical(dict(self.defaults, **params)), sort_keys=True)
+
+    @staticmethod
+    def prior(numeric, area=100.0 ** 2):
+        n = numeric.get("num_agents", 30.0)
+        radius = max(numeric.get("perception_radius", 0.0), numeric.get("communication_radius", 0.0))
+        return numeric.get("max_steps", 300.0) * n * (1 + n * min(1.0, math.pi * radius ** 2 / area))
+
+    def observe(self, params, seconds):
+        self.times.setdefault(self._key(params), []).append(seconds)
+
+    def predict(self, params):
+        seen = self.times.get(self._key(params))
+        if seen:
+            return float(np.median(seen))
+        numeric = self._params(params)
+        best, best_dist = None, math.inf
+        for key, times in self.times.items():
+            other = self._params(json.loads(key))
+            shared = numeric.keys() & other.keys()
+            dist = sum((math.log1p(abs(numeric[k])) - math.log1p(abs(other[k]))) ** 2 for k in shared)
+            if dist < best_dist:
+                best, best_dist = (other, times), dist
+        if best is None:
+            return self.prior(numeric)
+        other, times = best
+        return float(np.median(times)) * self.prior(numeric) / self.prior(other)
+
+
+def ci_halfwidth(values, confidence=0.95):
+    """均值的置信区间半宽（正态近似）；少于两个值时为 inf"""
+    if len(values) < 2:
+        return math.inf
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return z * np.std(values, ddof=1) / math.sqrt(len(values))
+
+
+def steps_of(result):
+    """run_once 风格的结果 (step, converged, ...) 里的收敛步数"""
+    return result[0]
+
+
+def run_adaptive_sweep(fn, cells, seeds, trials=1, workers=None, cache=None, checkpoint=None,
+                       min_repeats=3, round_size=None, rel_tol=0.05, abs_tol=1.0,
+                       confidence=0.95, metric=steps_of, cost_model=None, store=None):
+    """
+    和 run_sweep 相同的调用方式，但重复次数是自适应的：
+    - 重复的顺序同 run_sweep（seed 外层、trial 内层），每个格子先跑前 min_repeats 个
+    - 之后每轮给还没停下的格子再加 round_size 个（默认 min_repeats），直到
+      metric 的置信区间半宽 <= max(abs_tol, rel_tol * |均值|)，或者 seeds × trials 全部用完
+    - 每轮里所有格子的任务一起提交，按 cost_model 从长到短排序（默认新建一个 CostModel(fn)）
+    - store: 原始结果表（见 swarm_sim.results.ResultStore），每轮实际跑过的任务追加进去
+    返回和 cells 等长的列表，每项是该格子实际跑过的结果（是完整重复序列的前缀，长度可能不同）
+    """
+    pairs = [(seed, t) for seed in seeds for t in range(trials)]
+    cost_model = CostModel(fn) if cost_model is None else cost_model
+    round_size = round_size or min_repeats
+    results = [[] for _ in cells]
+    active = list(range(len(cells)))
+    while active:
+        tasks, owners = [], []
+        for c in active:
+            done = len(results[c])
+            want = min_repeats if done == 0 else round_size
+            for seed, t in pairs[done:done + want]:
+                tasks.append((cells[c], seed, t))
+                owners.append(c)
+        for c, result in zip(owners, run_tasks(fn, tasks, workers, cache, checkpoint, cost_model,
+                                               store=store)):
+            results[c].append(result)
+
+        still = []
+        for c in active:
+            values = [metric(result) for result in results[c]]
+            tol = max(abs_tol, rel_tol * abs(np.mean(values)))
+            if len(values) < len(pairs) and ci_halfwidth(values, confidence) > tol:
+                still.append(c)
+        active = still
+    return results
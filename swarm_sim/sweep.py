@@ -0,0 +1,139 @@
+# 参数扫描的并行执行器
+# 每个任务有自己独立的 np.random.Generator（由 SeedSequence 派生），不依赖全局 np.random.seed，
+# 所以任务可以在任意进程、以任意顺序执行，结果都一样
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from swarm_sim.cache import MISSING, open_cache
+from swarm_sim.checkpoint import open_log
+
+
+def task_rng(seed, trial=0):
+    """(seed, trial) 对应的独立 Generator。同一个 seed 在不同参数格子里得到相同的初始状态"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(trial,)))
+
+
+def _run_task(fn, params, seed, trial):
+    start = time.perf_counter()
+    return fn(rng=task_rng(seed, trial), **params), time.perf_counter() - start
+
+
+def _run_cell(fn, params, pairs):
+    start = time.perf_counter()
+    return fn(rngs=[task_rng(seed, t) for seed, t in pairs], **params), time.perf_counter() - start
+
+
+def _open_stores(cache, checkpoint):
+    return [store for store in (open_cache(cache), open_log(checkpoint)) if store is not None]
+
+
+def _lookup(stores, fn, tasks):
+    """从缓存 / 断点日志里取出已完成的任务，返回 (每个 store 的 keys, 结果列表，没完成的为 MISSING)"""
+    keys, results = [], [MISSING] * len(tasks)
+    for store in stores:
+        store_keys, found = store.lookup(fn, tasks)
+        keys.append(store_keys)
+        results = [old if old is not MISSING else new for old, new in zip(results, found)]
+    return keys, results
+
+
+def _execute(run, jobs, workers):
+    """依次 yield (job 序号, 结果)；并行时按完成顺序，便于每完成一个就写日志"""
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(jobs) <= 1:
+        for i, job in enumerate(jobs):
+            yield i, run(*job)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {pool.submit(run, *job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def run_tasks(fn, tasks, workers=None, cache=None, checkpoint=None, cost_model=None, executor=None, store=None):
+    """
+    执行任意的任务列表 [(params, seed, trial)]，返回同样顺序的结果列表
+    - cache / checkpoint: 同 run_sweep
+    - cost_model: 可选的 schedule.CostModel，没完成的任务按预测耗时从长到短提交（多进程时负载更均衡），
+      每完成一个任务用实际耗时更新模型
+    - executor: 执行方式，签名同 _execute(run, jobs, workers)，按完成顺序 yield (序号, (结果, 耗时))；
+      默认本机进程池，分布式见 swarm_sim.workqueue.FileQueue.execute
+    - store: 可选的 results.ResultStore，所有任务的原始结果和耗时追加进去（缓存里读出的耗时为 NaN）
+    """
+    stores = _open_stores(cache, checkpoint)
+    keys, results = _lookup(stores, fn, tasks)
+    todo = [i for i, result in enumerate(results) if result is MISSING]
+    if cost_model is not None:
+        todo.sort(key=lambda i: -cost_model.predict(tasks[i][0]))
+
+    execute = _execute if executor is None else executor
+    times = [math.nan] * len(tasks)
+    for j, (result, elapsed) in execute(_run_task, [(fn, *tasks[i]) for i in todo], workers):
+        i = todo[j]
+        results[i] = result
+        times[i] = elapsed
+        for backend, backend_keys in zip(stores, keys):
+            backend.record(fn, tasks[i], backend_keys[i], result)
+        if cost_model is not None:
+            cost_model.observe(tasks[i][0], elapsed)
+    if store is not None:
+        store.extend(tasks, results, times)
+    return results
+
+
+def run_sweep(fn, cells, seeds, trials=1, workers=None, cache=None, checkpoint=None, cost_model=None,
+              executor=None, store=None):
+    """
+    对每个参数格子 cells[i]（kwargs 字典）× seeds × trials 调用 fn(rng=..., **cells[i])
+    - fn 必须是模块顶层函数（要能 pickle 到子进程）
+    - workers: 进程数，默认 os.cpu_count()；workers=1 时在当前进程串行执行
+    - cache: 结果缓存（见 swarm_sim.cache.open_cache），已经算过的 (格子, seed, trial) 直接读出
+    - checkpoint: 断点日志路径（见 swarm_sim.checkpoint.SweepLog），每完成一个任务追加一行；
+      中断后用同一个路径重跑，只算日志里没有的任务
+    - cost_model / executor: 调度顺序和执行方式（见 run_tasks）
+    - store: 原始结果表（见 swarm_sim.results.ResultStore），每个任务一行
+    返回和 cells 等长的列表，每项是该格子所有任务的结果（seed 外层、trial 内层），与 workers 无关
+    """
+    tasks = [(cell, seed, t) for cell in cells for seed in seeds for t in range(trials)]
+    results = run_tasks(fn, tasks, workers, cache, checkpoint, cost_model, executor, store)
+    per_cell = len(seeds) * trials
+    return [results[i * per_cell:(i + 1) * per_cell] for i in range(len(cells))]
+
+
+def run_batched_sweep(fn, cells, seeds, trials=1, workers=None, cache=None, checkpoint=None, cost_model=None,
+                      store=None):
+    """
+    和 run_sweep 相同的输出，但每个格子的所有 (seed, trial) 一次交给 fn(rngs=[...], **cell)，
+    由 fn 自己把这些副本批量模拟（见 swarm_sim.batch）。并行的粒度是格子；
+    用缓存 / 断点日志时每个格子只批量模拟没完成的 (seed, trial)，格子算完就写入
+    cost_model: 格子按 预测单次耗时 × 副本数 从长到短提交
+    store: 同 run_sweep；批量模拟的耗时按副本数平摊到每个任务
+    """
+    pairs = [(seed, t) for seed in seeds for t in range(trials)]
+    tasks = [(cell, seed, t) for cell in cells for seed, t in pairs]
+    stores = _open_stores(cache, checkpoint)
+    keys, results = _lookup(stores, fn, tasks)
+    per_cell = len(pairs)
+    todo = [[c * per_cell + k for k in range(per_cell) if results[c * per_cell + k] is MISSING]
+            for c in range(len(cells))]
+    todo = [(c, rows) for c, rows in enumerate(todo) if rows]
+    if cost_model is not None:
+        todo.sort(key=lambda job: -cost_model.predict(cells[job[0]]) * len(job[1]))
+
+    jobs = [(fn, cells[c], [pairs[i - c * per_cell] for i in rows]) for c, rows in todo]
+    times = [math.nan] * len(tasks)
+    for j, (values, elapsed) in _execute(_run_cell, jobs, workers):
+        c, rows = todo[j]
+        for i, value in zip(rows, values):
+            results[i] = value
+            times[i] = elapsed / len(rows)
+            for backend, backend_keys in zip(stores, keys):
+                backend.record(fn, tasks[i], backend_keys[i], value)
+        if cost_model is not None:
+            cost_model.observe(cells[c], elapsed / len(rows))
+    if store is not None:
+        store.extend(tasks, results, times)
+
+    return [results[i * per_cell:(i + 1) * per_cell] for i in range(len(cells))]
@@ -0,0 +1,75 @@
+# 用预先抽好的均匀随机数选目标
+# 每个 agent 每步用一对 u ∈ [0,1)^2，在候选池里选两个不同的位置，
+# 这样随机数的消耗和候选数量无关，批量选和逐个选得到的结果一样
+import numpy as np
+from swarm_sim.engine import NO_TARGET
+
+
+def pick_two(counts, u):
+    """在 counts 个候选里均匀地选两个不同的位置 (i1, i2)，u 的最后一维长度为 2"""
+    counts = np.asarray(counts)
+    u = np.asarray(u)
+    i1 = np.minimum(np.floor(u[..., 0] * counts).astype(np.int64), counts - 1)
+    i2 = np.minimum(np.floor(u[..., 1] * (counts - 1)).astype(np.int64), counts - 2)
+    i2 = i2 + (i2 >= i1)
+    return i1, i2
+
+
+def nth_true(mask, n):
+    """每一行第 n 个（从 0 数）True 的列号"""
+    return np.argmax(np.cumsum(mask, axis=-1) > np.asarray(n)[..., None], axis=-1)
+
+
+def select_dense(candidates, used, u):
+    """
+    稠密掩码版本的批量选择，每一行是一个 agent：
+    - candidates: (M,N) bool，可选的 agent（感知范围内 + 收到了广播的）
+    - used: (M,N) bool，已被别人选为目标的 agent
+    - u: (M,2) 均匀随机数
+    优先在没被占用的候选里选；不够两个时退回所有候选；还不够就是 NO_TARGET
+    返回 (M,2) 目标编号
+    """
+    final = candidates & ~used
+    n_final = final.sum(axis=-1)
+    n_all = candidates.sum(axis=-1)
+    use_final = n_final >= 2
+    pool = np.where(use_final[:, None], final, candidates)
+    counts = np.where(use_final, n_final, n_all)
+
+    chosen = np.full((len(pool), 2), NO_TARGET, dtype=np.int64)
+    ok = counts >= 2
+    if ok.any():
+        i1, i2 = pick_two(counts[ok], u[ok])
+        chosen[ok, 0] = nth_true(pool[ok], i1)
+        chosen[ok, 1] = nth_true(pool[ok], i2)
+    return chosen
+
+
+def select_csr(indptr, indices, used, u):
+    """
+    CSR 版本的批量选择，第 r 行的候选是 indices[indptr[r]:indptr[r+1]]（按编号升序）
+    - used: 和 indices 对齐的 bool，该候选已被第 r 行收到的消息里的某个 agent 选为目标
+    - u: (M,2) 均匀随机数
+    规则同 select_dense；所有行一次算完，不需要逐行循环
+    返回 (M,2) 目标编号
+    """
+    indptr = np.asarray(indptr)
+    num_rows = len(indptr) - 1
+    lengths = np.diff(indptr)
+    rows = np.repeat(np.arange(num_rows), lengths)
+    free = ~np.asarray(used, dtype=bool)
+    free_before = np.concatenate([[0], np.cumsum(free)])
+    n_final = free_before[indptr[1:]] - free_before[indptr[:-1]]
+    use_final = n_final >= 2
+    counts = np.where(use_final, n_final, lengths)
+
+    chosen = np.full((num_rows, 2), NO_TARGET, dtype=np.int64)
+    ok = np.flatnonzero(counts >= 2)
+    if len(ok):
+        # 每行的候选池：够两个时是没被占用的，否则是整行；第 k 个池内元素 = 累计计数第一次到 base+k+1 的位置
+        in_pool = free | ~use_final[rows]
+        pool_before = np.concatenate([[0], np.cumsum(in_pool)])
+        base = pool_before[indptr[ok]]
+        for c, i in enumerate(pick_two(counts[ok], u[ok])):
+            chosen[ok, c] = indices[np.searchsorted(pool_before, base + i + 1) - 1]
+    return chosen
@@ -0,0 +1,182 @@
+# 轨迹文件格式（.traj），用来保存一次运行，事后回放 / 分析不用重新模拟
+#
+# 文件布局（小端）：
+#   [0, 8)                 magic b"SWTRAJ01"
+#   [8, 16)                uint64 header 区长度 H（含 padding，4096 的倍数）
+#   [16, 16+H)             JSON header，空格补齐：num_agents, num_frames, dtype, chunk_frames, stride, params, seed
+#   [16+H, ...)            帧数据，按 chunk 连续写入，每帧 (N,2)，dtype 为 float32 或量化后的 int16
+#   index                  steps: int64[T]；chunk 表 float64[C,5] = (首帧, 帧数, scale, x 偏移, y 偏移)
+#                          int16 量化: 位置 = (q + 32767) * scale + 偏移
+#   末尾 24 字节           uint64 index 偏移, uint64 chunk 数, magic 的前 8 字节
+# 所有帧大小相同，第 t 帧的位置 = 数据区起点 + t * 帧大小，可以 O(1) 定位；读取时直接 memmap
+import json
+import struct
+import numpy as np
+
+MAGIC = b"SWTRAJ01"
+_HEADER_BLOCK = 4096
+_TRAILER = struct.Struct("<QQ8s")
+DTYPES = ("float32", "int16")
+
+
+class TrajectoryWriter:
+    """
+    和 TrajectoryRecorder 一样实现 record(step, positions)，可以直接作为 Swarm 的 recorder
+    - dtype: "float32" 原样保存；"int16" 按 chunk 量化（每个 chunk 一组 scale/offset），文件减半
+    - chunk_frames: 每攒够多少帧写一次盘（int16 时也是量化的粒度）
+    - params / seed: 写进 header，方便事后知道这条轨迹是怎么来的
+    """
+    def __init__(self, path, num_agents, dtype="float32", chunk_frames=64, stride=1,
+                 params=None, seed=None):
+        assert dtype in DTYPES, f"dtype must be one of {DTYPES}"
+        assert chunk_frames > 0 and stride > 0, "chunk_frames and stride must be positive"
+        self.path = path
+        self.num_agents = num_agents
+        self.dtype = dtype
+        self.chunk_frames = chunk_frames
+        self.stride = stride
+        self.params = dict(params or {})
+        self.seed = seed
+
+        self.num_frames = 0
+        self.steps = []
+        self.chunks = []  # (首帧, 帧数, scale, x 偏移, y 偏移)
+        self._pending = np.empty((chunk_frames, num_agents, 2), dtype=np.float32)
+        self._pending_count = 0
+
+        self._file = open(path, "wb")
+        self._header_size = self._header_capacity()
+        self._write_header()
+
+    def _header(self):
+        return {
+            "num_agents": self.num_agents,
+            "num_frames": self.num_frames,
+            "dtype": self.dtype,
+            "chunk_frames": self.chunk_frames,
+            "stride": self.stride,
+            "params": self.params,
+            "seed": self.seed,
+        }
+
+    def _header_capacity(self):
+        # num_frames 最后才知道，多留一些位置给它
+        size = len(json.dumps(self._header()).encode()) + 64
+        return -(-size // _HEADER_BLOCK) * _HEADER_BLOCK
+
+    def _write_header(self):
+        text = json.dumps(self._header()).encode()
+        assert len(text) <= self._header_size, "header grew beyond its reserved block"
+        self._file.seek(0)
+        self._file.write(MAGIC + struct.pack("<Q", self._header_size))
+        self._file.write(text.ljust(self._header_size, b" "))
+
+    def record(self, step, positions):
+        if step % self.stride:
+            return
+        self._pending[self._pending_count] = positions
+        self._pending_count += 1
+        self.steps.append(step)
+        self.num_frames += 1
+        if self._pending_count == self.chunk_frames:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        count = self._pending_count
+        if count == 0:
+            return
+        frames = self._pending[:count]
+        if self.dtype == "float32":
+            scale, offset = 1.0, np.zeros(2)
+            data = frames
+        else:
+            lo = frames.reshape(-1, 2).min(axis=0).astype(np.float64)
+            hi = frames.reshape(-1, 2).max(axis=0).astype(np.float64)
+            scale = max(float((hi - lo).max()) / 65534, 1e-12)
+            offset = lo
+            data = np.round((frames - offset) / scale - 32767).astype(np.int16)
+        self._file.write(np.ascontiguousarray(data).tobytes())
+        self.chunks.append((self.num_frames - count, count, scale, offset[0], offset[1]))
+        self._pending_count = 0
+
+    def close(self):
+        if self._file is None:
+            return
+        self._flush_chunk()
+        index_offset = self._file.tell()
+        self._file.write(np.asarray(self.steps, dtype=np.int64).tobytes())
+        self._file.write(np.asarray(self.chunks, dtype=np.float64).reshape(-1, 5).tobytes())
+        self._file.write(_TRAILER.pack(index_offset, len(self.chunks), MAGIC))
+        self._write_header()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """读取 .traj 文件，帧数据 memmap 进来，按需读取"""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, header_size = f.read(8), struct.unpack("<Q", f.read(8))[0]
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a trajectory file")
+            self.header = json.loads(f.read(header_size).decode())
+            f.seek(-_TRAILER.size, 2)
+            index_offset, num_chunks, tail = _TRAILER.unpack(f.read(_TRAILER.size))
+            if tail != MAGIC:
+                raise ValueError(f"{path} is incomplete (writer was not closed)")
+
+        self.num_agents = self.header["num_agents"]
+        self.num_frames = self.header["num_frames"]
+        self.dtype = self.header["dtype"]
+        self.params = self.header["params"]
+        self.seed = self.header["seed"]
+        self.chunk_frames = self.header["chunk_frames"]
+
+        index = np.memmap(path, dtype=np.uint8, mode="r", offset=index_offset)
+        t, c = self.num_frames, num_chunks
+        self.steps = np.frombuffer(index[:8 * t], dtype=np.int64)
+        table = np.frombuffer(index[8 * t:8 * t + 40 * c], dtype=np.float64).reshape(c, 5)
+        self.scales = table[:, 2]
+        self.offsets = table[:, 3:5]
+
+        shape = (self.num_frames, self.num_agents, 2)
+        self._data = np.memmap(path, dtype=np.dtype(self.dtype), mode="r",
+                               offset=16 + header_size, shape=shape) if self.num_frames else np.empty(shape, np.float32)
+
+    def __len__(self):
+        return self.num_frames
+
+    def frame(self, t):
+        """第 t 帧的位置 (N,2) float32"""
+        if t < 0:
+            t += self.num_frames
+        if not 0 <= t < self.num_frames:
+            raise IndexError(f"frame {t} out of range (0..{self.num_frames - 1})")
+        return self.frames(t, t + 1)[0]
+
+    def frames(self, start=0, stop=None):
+        """[start, stop) 范围内的帧 (K,N,2) float32"""
+        stop = self.num_frames if stop is None else min(stop, self.num_frames)
+        raw = np.asarray(self._data[start:stop])
+        if self.dtype == "float32":
+            return raw
+        c = np.arange(start, max(stop, start)) // self.chunk_frames
+        frames = (raw + 32767.0) * self.scales[c, None, None] + self.offsets[c, None, :]
+        return frames.astype(np.float32)
+
+    def __getitem__(self, t):
+        if isinstance(t, slice):
+            start, stop, step = t.indices(self.num_frames)
+            return self.frames(start, stop)[::step]
+        return self.frame(t)
+
+    def __iter__(self):
+        for t in range(self.num_frames):
+            yield self.frame(t)
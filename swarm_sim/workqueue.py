@@ -0,0 +1,249 @@
+# 基于共享目录的分布式 sweep 队列
+# 协调者把任务写成文件，各节点上的 worker 抢租约、运行、写回结果；只依赖原子的 link 和 rename，
+# 放在 NFS 等共享目录上就能跨机器用，本机起几个 worker 进程就能完整测试。
+#
+#   root/tasks/<序号>_<key>.pkl    任务（序号决定领取顺序，run_tasks 已按预测耗时从长到短排好）
+#   root/leases/<key>              租约，mtime 是最近一次心跳；超过 lease_timeout 没更新视为 worker 已死，可被抢走
+#   root/results/<key>.pkl         结果 (result, 耗时)，先写临时文件再 rename
+#   root/errors/<key>.<worker>.<时间>.txt   失败记录，满 max_attempts 次后不再重试
+#
+# key 和缓存用的 task_key 相同（参数 + 代码版本），同一个任务算几次结果都一样，重试和重复执行都是安全的
+#
+# 启动 worker：python -m swarm_sim.workqueue <root> [--idle-exit 秒]
+import argparse
+import importlib
+import inspect
+import os
+import pickle
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from pathlib import Path
+
+from swarm_sim.cache import ROOT, fn_name, task_key
+from swarm_sim.sweep import _run_task, run_sweep
+
+
+class FileQueue:
+    """
+    - lease_timeout: 租约超时（秒），worker 运行期间每 lease_timeout/3 秒续一次
+    - max_attempts: 同一个任务最多失败几次
+    - poll: 没有任务 / 等待结果时的轮询间隔
+    """
+    def __init__(self, root, lease_timeout=60.0, max_attempts=3, poll=0.2):
+        self.root = Path(root)
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.poll = poll
+        for name in ("tasks", "leases", "results", "errors"):
+            (self.root / name).mkdir(parents=True, exist_ok=True)
+
+    def _path(self, kind, key, suffix=""):
+        return self.root / kind / f"{key}{suffix}"
+
+    # ---- 协调者 ----
+
+    def publish(self, jobs):
+        """jobs: [(fn, params, seed, trial)]，写出还没有结果的任务，返回每个任务的 key"""
+        keys = []
+        stamp = time.time_ns()
+        for i, (fn, params, seed, trial) in enumerate(jobs):
+            key = task_key(fn, params, seed, trial)
+            keys.append(key)
+            if self._path("results", key, ".pkl").exists():
+                continue
+            module, qualname = fn_name(fn).rsplit(".", 1)
+            path = os.path.dirname(os.path.abspath(inspect.getsourcefile(fn)))  # worker 据此 import fn 所在模块
+            task = dict(module=module, qualname=qualname, path=path, params=params, seed=seed, trial=trial, key=key)
+            tmp = self._path("tasks", f".{key}.tmp")
+            tmp.write_bytes(pickle.dumps(task))
+            os.replace(tmp, self.root / "tasks" / f"{stamp}{i:08d}_{key}.pkl")
+        return keys
+
+    def execute(self, run, jobs, workers=None):
+        """
+        run_tasks 的 executor：发布任务并在结果出现时 yield (序号, (结果, 耗时))
+        workers: 在本机额外启动的 worker 进程数；0 / None 表示只等外部节点上的 worker
+        """
+        keys = self.publish(jobs)
+        procs = [self.spawn() for _ in range(workers or 0)]
+        pending = dict(enumerate(keys))
+        try:
+            while pending:
+                failures = self.failures()
+                for i, key in list(pending.items()):
+                    result = self._path("results", key, ".pkl")
+                    if result.exists():
+                        del pending[i]
+                        yield i, pickle.loads(result.read_bytes())
+                    elif failures[key] >= self.max_attempts:
+                        errors = sorted((self.root / "errors").glob(f"{key}.*"))
+                        raise RuntimeError(f"task {key} failed {len(errors)} times:\n{errors[-1].read_text()}")
+                if pending:
+                    time.sleep(self.poll)
+        finally:
+            for proc in procs:
+                proc.terminate()
+            for proc in procs:
+                proc.wait()
+
+    def spawn(self, idle_exit=None):
+        """在本机启动一个 worker 子进程"""
+        cmd = [sys.executable, "-m", "swarm_sim.workqueue", str(self.root),
+               "--lease-timeout", str(self.lease_timeout), "--max-attempts", str(self.max_attempts)]
+        if idle_exit is not None:
+            cmd += ["--idle-exit", str(idle_exit)]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+        return subprocess.Popen(cmd, cwd=ROOT, env=env)
+
+    def failures(self):
+        """每个 key 的失败次数（Counter）。每轮轮询只列一次 errors/，共享目录上逐个 glob 很慢"""
+        return Counter(name.split(".", 1)[0] for name in os.listdir(self.root / "errors"))
+
+    # ---- worker ----
+
+    def claim(self, key, worker):
+        """
+        抢 key 的租约，成功返回 True
+        新租约：先写好内容的临时文件再 os.link 成租约名，已存在时 link 失败，只有一个 worker 能成功。
+        过期的租约：rename 到自己的私有文件名后再 stat 一次，inode / mtime 和判过期时看到的不同，
+        说明拿走的是别人刚抢到（或原主刚续过）的租约，放回去并退出；相同才删掉旧租约重新抢
+        """
+        lease = self._path("leases", key)
+        tmp = self._path("leases", f".{key}.{worker}.tmp")
+        tmp.write_text(worker)
+        try:
+            os.link(tmp, lease)
+            return True
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+        try:
+            seen = lease.stat()
+            if time.time() - seen.st_mtime <= self.lease_timeout:
+                return False
+            stale = self._path("leases", f".{key}.{worker}.stale")
+            os.rename(lease, stale)
+        except FileNotFoundError:
+            return False  # 别的 worker 刚完成或刚抢走
+        moved = stale.stat()
+        if (moved.st_ino, moved.st_mtime_ns) != (seen.st_ino, seen.st_mtime_ns):
+            try:
+                os.link(stale, lease)
+            except FileExistsError:
+                pass  # 期间又有人建了新租约，原主和它都会跑这个任务；结果相同，重复执行是安全的
+            os.remove(stale)
+            return False
+        os.remove(stale)
+        return self.claim(key, worker)
+
+    def _next(self, worker):
+        failures = self.failures()
+        for name in sorted(os.listdir(self.root / "tasks")):
+            if name.startswith("."):
+                continue
+            key = name.split("_", 1)[1][:-len(".pkl")]
+            if self._path("results", key, ".pkl").exists():
+                self._remove(self.root / "tasks" / name)
+                continue
+            if failures[key] >= self.max_attempts:
+                continue
+            if self.claim(key, worker):
+                return name, key
+        return None
+
+    def _heartbeat(self, lease, stop):
+        while not stop.wait(self.lease_timeout / 3):
+            try:
+                os.utime(lease)
+            except FileNotFoundError:
+                return
+
+    def run_one(self, name, key, worker):
+        lease = self._path("leases", key)
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(lease, stop), daemon=True)
+        beat.start()
+        try:
+            task = pickle.loads((self.root / "tasks" / name).read_bytes())
+            if task["path"] not in sys.path:
+                sys.path.insert(0, task["path"])
+            fn = importlib.import_module(task["module"])
+            for part in task["qualname"].split("."):
+                fn = getattr(fn, part)
+            value = _run_task(fn, task["params"], task["seed"], task["trial"])
+            tmp = self._path("results", f".{key}.{worker}.tmp")
+            tmp.write_bytes(pickle.dumps(value))
+            os.replace(tmp, self._path("results", key, ".pkl"))
+            self._remove(self.root / "tasks" / name)
+        except FileNotFoundError:
+            pass  # 任务已被别的 worker 完成并清理
+        except Exception:
+            self._path("errors", key, f".{worker}.{time.time_ns()}.txt").write_text(traceback.format_exc())
+        finally:
+            stop.set()
+            beat.join()
+            self._release(lease, worker)
+
+    def _release(self, lease, worker):
+        """只删自己的租约：超时后被别的 worker 抢走的租约属于新主人，删掉会让第三个 worker 再跑一遍"""
+        try:
+            if lease.read_text() != worker:
+                return
+        except FileNotFoundError:
+            return
+        self._remove(lease)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def work(self, worker=None, idle_exit=None):
+        """worker 主循环：root/STOP 存在时退出；idle_exit 秒内没领到任务也退出"""
+        worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+        idle_since = time.time()
+        while not (self.root / "STOP").exists():
+            claimed = self._next(worker)
+            if claimed is None:
+                if idle_exit is not None and time.time() - idle_since > idle_exit:
+                    return
+                time.sleep(self.poll)
+                continue
+            self.run_one(*claimed, worker)
+            idle_since = time.time()
+
+
+def run_distributed_sweep(fn, cells, seeds, trials=1, queue_dir="sweep_queue", local_workers=0,
+                          cache=None, checkpoint=None, cost_model=None, store=None, **queue_options):
+    """
+    和 run_sweep 相同的输入输出，任务经共享目录 queue_dir 分发：
+    - local_workers: 在本机启动的 worker 进程数（测试时用它代替多台机器）
+    - 其它节点用 python -m swarm_sim.workqueue <queue_dir> 加入
+    - queue_options: 传给 FileQueue（lease_timeout / max_attempts / poll）
+    - cache / checkpoint / cost_model / store: 同 run_sweep
+    """
+    queue = FileQueue(queue_dir, **queue_options)
+    return run_sweep(fn, cells, seeds, trials, workers=local_workers, cache=cache, checkpoint=checkpoint,
+                     cost_model=cost_model, executor=queue.execute, store=store)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sweep work-queue worker")
+    parser.add_argument("root", help="shared queue directory")
+    parser.add_argument("--lease-timeout", type=float, default=60.0)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--idle-exit", type=float, default=None, help="exit after this many idle seconds")
+    args = parser.parse_args(argv)
+    FileQueue(args.root, lease_timeout=args.lease_timeout, max_attempts=args.max_attempts).work(idle_exit=args.idle_exit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# 世界边界
+# - "open": 无边界（原来的行为），距离是普通欧氏距离
+# - "reflect": [0, size) 的方形场地，走出边界的 agent 按镜面反射弹回
+# - "periodic": 环面，坐标对 size 取模，距离和方向都取最近镜像（minimum image）
+# 所有运算都保持 float32，逐 agent 的 numba 内核（kernels.py）用同样的公式，结果逐位一致
+import numpy as np
+
+MODES = ("open", "reflect", "periodic")
+
+
+class World:
+    def __init__(self, mode="open", size=100.0):
+        assert mode in MODES, f"unknown world mode: {mode}"
+        assert size > 0, "world size must be positive"
+        self.mode = mode
+        self.size = np.float32(size)
+        self.code = MODES.index(mode)  # 传给 numba 内核
+
+    @property
+    def periodic(self):
+        return self.mode == "periodic"
+
+    def __repr__(self):
+        return f"World({self.mode!r}, size={float(self.size):g})"
+
+    def wrap_delta(self, delta):
+        """把坐标差换成最近镜像（只对 periodic 生效）。输入的两点都在 [0, size) 内，所以 |delta| < size"""
+        if not self.periodic:
+            return delta
+        half = self.size / np.float32(2)
+        return np.where(delta > half, delta - self.size, np.where(delta < -half, delta + self.size, delta))
+
+    def delta(self, origin, points):
+        """points - origin 的位移（periodic 时取最近镜像）"""
+        return self.wrap_delta(points - origin)
+
+    def distance(self, origin, points):
+        return np.linalg.norm(self.delta(origin, points), axis=-1)
+
+    def confine(self, positions, rows=None):
+        """移动之后调用：reflect 把越界坐标反射回场地，periodic 取模，open 不变（原地修改）"""
+        if self.mode == "open":
+            return
+        sub = positions if rows is None else positions[rows]
+        if self.mode == "reflect":
+            sub = np.where(sub < 0, -sub, sub)
+            sub = np.where(sub > self.size, self.size + self.size - sub, sub)
+        else:
+            sub = np.where(sub < 0, sub + self.size, sub)
+            sub = np.where(sub >= self.size, sub - self.size, sub)
+        if rows is None:
+            positions[...] = sub
+        else:
+            positions[rows] = sub
+
+    def unwrap(self, positions):
+        """
+        收敛检测用：periodic 时把所有 agent 挪到以环面圆周平均为中心的最近镜像里，
+        聚成一团的 swarm 跨过边界时也能得到正确的质心和半径；其它模式原样返回
+        """
+        if not self.periodic or len(positions) == 0:
+            return positions
+        angle = positions.astype(np.float64) * (2 * np.pi / float(self.size))
+        center = np.arctan2(np.sin(angle).mean(axis=0), np.cos(angle).mean(axis=0)) * float(self.size) / (2 * np.pi)
+        center = np.mod(center, float(self.size)).astype(np.float32)
+        return center + self.delta(center, positions)
+
+
+def make_world(world="open", size=100.0):
+    """Swarm 的 world 参数：模式名，或者直接传 World"""
+    if isinstance(world, World):
+        return world
+    return World(world, size)
@@ -0,0 +1,5 @@
+# 测试从仓库根目录导入 swarm_sim / q1_q2 / q3（命名空间包，没有安装步骤）
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,40 @@
+# BatchedSwarm 的每个副本和单独跑 q3.Swarm(rng=同一个 Generator) 逐位相同
+import numpy as np
+import pytest
+from q3.swarm import Swarm
+from swarm_sim.batch import BatchedSwarm
+from swarm_sim.sweep import task_rng
+
+REPLICAS = 4
+
+
+@pytest.mark.parametrize("strategy", ("between", "behind"))
+def test_replicas_match_single_runs(strategy):
+    # between 全部收敛，behind 有的副本 150 步内收敛、有的没有
+    batch = BatchedSwarm([task_rng(7, r) for r in range(REPLICAS)], 20)
+    result = batch.run(max_steps=150, strategy=strategy)
+    for r in range(REPLICAS):
+        swarm = Swarm(20, rng=task_rng(7, r))
+        steps, converged = swarm.run(150, strategy)
+        assert (result["steps"][r], result["converged"][r]) == (steps, converged)
+        assert np.array_equal(result["positions"][r], swarm.positions)
+        assert np.array_equal(batch.targets[r], swarm.targets)
+    assert result["converged"].any()
+
+
+def test_step_by_step_with_speed_lists():
+    speed_lists = np.random.default_rng(1).uniform(0.3, 1.0, (REPLICAS, 15))
+    options = dict(perception_radius=8, communication_radius=12)
+    batch = BatchedSwarm([task_rng(3, r) for r in range(REPLICAS)], 15, speed_lists=speed_lists, **options)
+    swarms = [Swarm(15, speed_list=speed_lists[r], rng=task_rng(3, r), **options) for r in range(REPLICAS)]
+    for _ in range(10):
+        batch.step()
+        for r, swarm in enumerate(swarms):
+            swarm.step()
+            assert np.array_equal(batch.positions[r], swarm.positions)
+
+
+@pytest.mark.parametrize("options", (dict(world="periodic"), dict(world="reflect"), dict(update="synchronous")))
+def test_rejects_unsupported_modes(options):
+    with pytest.raises(ValueError, match="only supports"):
+        BatchedSwarm([task_rng(0, 0)], 10, **options)
@@ -0,0 +1,45 @@
+# 吞吐量基准：报告格式、compare 的对齐和退出码、scaling 的斜率
+import json
+
+import pytest
+from swarm_sim import bench
+
+TINY_GRID = dict(bench.QUICK_GRID, num_agents=(10, 20))
+
+
+def _report(steps_per_sec, grid=TINY_GRID):
+    results = []
+    for case in bench.cases(grid):
+        results.append(dict(case, steps_per_sec=steps_per_sec(case["num_agents"])))
+    return {"meta": {}, "results": results}
+
+
+def test_scaling_recovers_exponent():
+    quadratic = bench.scaling(_report(lambda n: 1e6 / n ** 2))
+    linear = bench.scaling(_report(lambda n: 1e6 / n))
+    assert set(quadratic) == {("q1_q2", "numpy", 30, 50, "between"), ("q3", "numpy", 30, 50, "between")}
+    assert all(slope == pytest.approx(2.0) for slope in quadratic.values())
+    assert all(slope == pytest.approx(1.0) for slope in linear.values())
+
+
+def test_compare_aligns_cases():
+    old = _report(lambda n: 100.0)
+    new = _report(lambda n: 50.0)
+    new["results"].append(dict(new["results"][0], num_agents=999))  # 只在新报告里的配置不参与比较
+    rows = bench.compare(old, new)
+    assert len(rows) == len(old["results"])
+    assert all(ratio == 0.5 for _, _, _, ratio in rows)
+
+
+@pytest.mark.parametrize("baseline, code", ((1e-3, 0), (1e9, 1)))
+def test_main_compare_exit_code(tmp_path, monkeypatch, capsys, baseline, code):
+    monkeypatch.setattr(bench, "QUICK_GRID", TINY_GRID)
+    old = tmp_path / "old.json"
+    bench.save(_report(lambda n: baseline), old)
+    out = tmp_path / "new.json"
+    argv = ["--quick", "--min-time", "0.01", "--out", str(out), "--compare", str(old)]
+    assert bench.main(argv) == code
+    report = json.loads(out.read_text())
+    assert len(report["results"]) == len(list(bench.cases(TINY_GRID)))
+    assert {"steps_per_sec", "agent_steps_per_sec", "peak_bytes", "alloc_blocks"} <= set(report["results"][0])
+    assert ("SLOWER" in capsys.readouterr().out) == bool(code)
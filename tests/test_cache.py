@@ -0,0 +1,66 @@
+# 结果缓存：键的规范化、命中、代码版本失效和淘汰
+import numpy as np
+from swarm_sim.cache import MISSING, ResultCache, task_key
+from swarm_sim.sweep import run_sweep
+
+CELLS = [dict(x=1), dict(x=2.0)]
+
+
+def toy(rng=None, x=0, y=5):
+    return float(rng.random()) + x
+
+
+def test_task_key_canonical():
+    # 30 和 30.0、tuple 和 list、显式写出默认值都是同一个任务
+    assert task_key(toy, dict(x=30), 0, 0) == task_key(toy, dict(x=30.0, y=5), 0, 0)
+    assert task_key(toy, dict(x=(1, 2)), 0, 0) == task_key(toy, dict(x=[1, 2]), 0, 0)
+    assert task_key(toy, dict(x=1), 0, 0) != task_key(toy, dict(x=1), 0, 1)
+
+
+def test_cache_hits_and_version(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with ResultCache(path, version="a") as cache:
+        first = run_sweep(toy, CELLS, [0, 1], workers=1, cache=cache)
+        assert len(cache) == 4 and cache.misses == 4
+    with ResultCache(path, version="a") as cache:
+        assert run_sweep(toy, CELLS, [0, 1], workers=1, cache=cache) == first
+        assert cache.hits == 4
+    with ResultCache(path, version="b") as cache:  # 代码版本变了，旧结果不再命中
+        keys, found = cache.lookup(toy, [(CELLS[0], 0, 0)])
+        assert found == [MISSING]
+
+
+def test_cache_eviction(tmp_path):
+    with ResultCache(tmp_path / "cache.sqlite", version="a") as cache:
+        for i in range(10):
+            cache.put(f"k{i}", np.zeros(100))
+        cache.evict(max_bytes=cache.size() // 2)
+        assert 0 < len(cache) < 10
+        assert cache.get("k9") is not MISSING  # 最近写入的留下
+
+
+def test_code_version_ignores_non_simulation_modules(tmp_path, monkeypatch):
+    import shutil
+    from swarm_sim import cache
+
+    for path in cache.SIM_SOURCES + ("swarm_sim/cli.py", "swarm_sim/render.py"):
+        (tmp_path / path).parent.mkdir(exist_ok=True)
+        shutil.copy(cache.ROOT / path, tmp_path / path)
+    monkeypatch.setattr(cache, "ROOT", tmp_path)
+
+    def version_after(edit):
+        if edit is not None:
+            with open(tmp_path / edit, "a", encoding="utf-8") as f:
+                f.write("\n# edited\n")
+        cache.code_version.cache_clear()  # 进程内按路径缓存了哈希
+        cache._hash_sources.cache_clear()
+        return cache.code_version(toy)
+
+    try:
+        before = version_after(None)
+        assert version_after("swarm_sim/cli.py") == before
+        assert version_after("swarm_sim/render.py") == before
+        assert version_after("swarm_sim/engine.py") != before
+    finally:
+        cache.code_version.cache_clear()
+        cache._hash_sources.cache_clear()
@@ -0,0 +1,79 @@
+# 断点日志和单次运行的快照
+import numpy as np
+import pytest
+from q1_q2.swarm import Swarm as SwarmQ12
+from q3.swarm import Swarm
+from swarm_sim.checkpoint import SweepLog, load_snapshot, restore_snapshot, save_snapshot
+from swarm_sim.sweep import run_sweep
+
+CELLS = [dict(x=1), dict(x=2.0)]
+
+
+def toy(rng=None, x=0):
+    return float(rng.random()) + x
+
+
+def test_sweep_log_resume(tmp_path):
+    path = tmp_path / "log.jsonl"
+    with SweepLog(path) as log:
+        first = run_sweep(toy, CELLS, [0, 1], workers=1, checkpoint=log)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "trunc')  # 中断时写了一半的行
+    with SweepLog(path) as log:
+        assert len(log) == 4
+        assert run_sweep(toy, CELLS, [0, 1, 2], workers=1, checkpoint=log)[0][:2] == first[0]
+        assert len(log) == 6
+    with SweepLog(path) as log:
+        assert len(log) == 6
+
+
+def test_snapshot_restore_matches_uninterrupted(tmp_path):
+    reference = Swarm(30, rng=np.random.default_rng(4))
+    for _ in range(40):
+        reference.step("between")
+
+    swarm = Swarm(30, rng=np.random.default_rng(4))
+    for _ in range(15):
+        swarm.step("between")
+    save_snapshot(swarm, tmp_path / "snap.npz", steps=15)
+    resumed = Swarm(30, rng=np.random.default_rng(99))
+    assert restore_snapshot(resumed, load_snapshot(tmp_path / "snap.npz")) == {"steps": 15}
+    for _ in range(25):
+        resumed.step("between")
+    assert np.array_equal(resumed.positions, reference.positions)
+    assert np.array_equal(resumed.targets, reference.targets)
+
+
+@pytest.mark.parametrize("Swarm", (Swarm, SwarmQ12))
+def test_run_checkpoint_resumes_same_run(tmp_path, Swarm):
+    path = tmp_path / "run.npz"
+    reference = Swarm(30, rng=np.random.default_rng(4))
+    expected = reference.run(60, thresh=0.0)
+    Swarm(30, rng=np.random.default_rng(4)).run(35, thresh=0.0, checkpoint=path, checkpoint_every=10)
+    resumed = Swarm(30, rng=np.random.default_rng(4))
+    assert resumed.run(60, thresh=0.0, checkpoint=path, checkpoint_every=10) == expected
+    assert np.array_equal(resumed.positions, reference.positions)
+
+
+@pytest.mark.parametrize("change, options", [
+    ("seed", {}),
+    ("speed", {}),
+    ("radius", {}),
+    ("strategy", dict(strategy="behind")),
+    ("thresh", dict(thresh=1.0)),
+])
+def test_run_checkpoint_rejects_other_runs(tmp_path, change, options):
+    path = tmp_path / "run.npz"
+    Swarm(30, rng=np.random.default_rng(4)).run(20, thresh=0.0, checkpoint=path, checkpoint_every=10)
+    swarm = Swarm(30, rng=np.random.default_rng(5 if change == "seed" else 4),
+                  speed=0.7 if change == "speed" else 1.0,
+                  perception_radius=20 if change == "radius" else 30)
+    options = dict(dict(thresh=0.0), **options)
+    with pytest.raises(ValueError, match="different run"):
+        swarm.run(40, checkpoint=path, **options)
+
+
+def test_restore_rejects_other_size(tmp_path):
+    save_snapshot(Swarm(30, rng=np.random.default_rng(4)), tmp_path / "snap.npz", steps=0)
+    with pytest.raises(ValueError, match="shape"):
+        restore_snapshot(Swarm(20, rng=np.random.default_rng(4)), load_snapshot(tmp_path / "snap.npz"))
@@ -0,0 +1,87 @@
+# python -m swarm_sim 的命令行和故障模型
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from q3.swarm import Swarm
+from swarm_sim import cli
+from swarm_sim.cache import ROOT
+from swarm_sim.failures import Failures
+from swarm_sim.results import ResultStore
+
+SMALL = ["--num-agents", "12", "--max-steps", "30"]
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text("strategy: midpoint\nperceptopm_radius: 12\nspeed: 0.8\nfailure_rate: 0.0\n")
+    return str(path)
+
+
+def _params(*argv):
+    return cli._params(cli.build_parser().parse_args(["run", *argv]))
+
+
+def test_config_aliases_and_override_order(config):
+    assert _params("--config", "missing.yaml") == cli.DEFAULTS
+    params = _params("--config", config)
+    assert (params["strategy"], params["perception_radius"], params["speed"]) == ("between", 12, 0.8)
+    assert "perceptopm_radius" not in params
+    params = _params("--config", config, "--speed", "0.3", "--strategy", "behind")  # 命令行覆盖配置文件
+    assert (params["strategy"], params["perception_radius"], params["speed"]) == ("behind", 12, 0.3)
+    with pytest.raises(AssertionError, match="unknown strategy"):
+        _params("--config", config, "--strategy", "nowhere")
+
+
+def test_run_prints_trial_result(config, capsys):
+    assert cli.main(["run", "--config", config, "--seed", "3", *SMALL]) == 0
+    params = dict(_params("--config", config, *SMALL))
+    steps, converged, clusters = cli.run_trial(rng=np.random.default_rng(3), **params)
+    assert f"steps={steps} converged={converged} clusters={clusters}" in capsys.readouterr().out
+
+
+def test_sweep_writes_raw_results(config, tmp_path, capsys):
+    out = tmp_path / "results.npz"
+    argv = ["sweep", "--config", config, *SMALL, "--vary", "perception_radius=10,30", "--seeds", "0", "1",
+            "--workers", "1", "--out", str(out)]
+    assert cli.main(argv) == 0
+    assert "4 trials" in capsys.readouterr().out
+    columns = ResultStore.load(out).columns()
+    assert sorted(columns["perception_radius"].tolist()) == [10, 10, 30, 30]
+    assert set(columns["strategy"].tolist()) == {"between"}
+
+
+def test_no_failures_is_a_plain_run():
+    params = dict(cli.DEFAULTS, num_agents=15, max_steps=40)
+    plain = Swarm(15, speed=0.5, perception_radius=30, communication_radius=50, rng=np.random.default_rng(7))
+    steps, converged = plain.run(40)
+    result = cli.run_trial(rng=np.random.default_rng(7), **params)
+    assert result[:2] == (steps - 1 if converged else steps, converged)
+
+
+def test_failed_agent_recovers_after_recover_delay():
+    swarm = Swarm(5, speed=0.5, rng=np.random.default_rng(0))
+    failures = Failures(swarm, 1.0, 3, np.random.default_rng(0))
+    failures.apply(swarm)  # 全部故障
+    failures.failure_rate = 0.0
+    stopped = [bool((swarm.speeds == 0).all())]
+    for _ in range(3):
+        failures.apply(swarm)
+        stopped.append(bool((swarm.speeds == 0).all()))
+    assert stopped == [True, True, True, False]  # 停 3 步，第 4 步恢复
+    assert np.array_equal(swarm.speeds, np.full(5, 0.5, dtype=np.float32))
+
+
+def test_failures_deterministic_with_generator():
+    params = dict(cli.DEFAULTS, num_agents=15, max_steps=40, failure_rate=0.05, recover_delay=4)
+    first = cli.run_trial(rng=np.random.default_rng(2), **params)
+    assert cli.run_trial(rng=np.random.default_rng(2), **params) == first
+
+
+def test_cli_import_stays_light():
+    code = ("import sys, swarm_sim.cli; "
+            "print(sorted({m.split('.')[0] for m in sys.modules} & {'matplotlib', 'sklearn', 'yaml'}))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
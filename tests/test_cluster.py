@@ -0,0 +1,61 @@
+# 网格 + 并查集的聚类和 sklearn DBSCAN 逐点一致；ClusterTracker 复用候选表后结果不变
+import numpy as np
+import pytest
+from q3.swarm import Swarm
+from swarm_sim.cluster import ClusterTracker, cluster_labels, get_cluster_count
+
+EPS = 0.6
+
+
+def _layout(seed, n):
+    """几团紧密的点 + 散点，团之间常有只挨着一侧的边界点"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0, 6, (max(n // 10, 1), 2))
+    clumps = centers[rng.integers(len(centers), size=n)] + rng.normal(0, 0.35, (n, 2))
+    return np.concatenate([clumps, rng.uniform(0, 6, (n // 4, 2))])
+
+
+@pytest.mark.parametrize("min_samples", (1, 2, 3, 5))
+@pytest.mark.parametrize("seed", range(8))
+def test_matches_dbscan(seed, min_samples):
+    DBSCAN = pytest.importorskip("sklearn.cluster").DBSCAN
+    positions = _layout(seed, 20 + 10 * seed)
+    expected = DBSCAN(eps=EPS, min_samples=min_samples).fit(positions).labels_
+    assert np.array_equal(cluster_labels(positions, EPS, min_samples), expected)
+    assert get_cluster_count(positions, EPS, min_samples) == get_cluster_count(
+        positions, EPS, min_samples, backend="dbscan")
+
+
+def test_border_points():
+    # min_samples=4：第 0 个点不是 core，同时挨着两个簇，挂到编号小的簇（由第 1 个点开始的那个）
+    positions = np.array([[0.75, 0], [1.3, 0], [1.38, 0], [1.4, 0], [1.5, 0],
+                          [0.0, 0], [0.05, 0], [0.1, 0], [0.2, 0], [9.0, 9]])
+    labels = cluster_labels(positions, EPS, min_samples=4)
+    assert labels.tolist() == [0, 0, 0, 0, 0, 1, 1, 1, 1, -1]
+    DBSCAN = pytest.importorskip("sklearn.cluster").DBSCAN
+    assert np.array_equal(labels, DBSCAN(eps=EPS, min_samples=4).fit(positions).labels_)
+
+
+@pytest.mark.parametrize("positions", (np.zeros((0, 2)), np.array([[1.0, 2.0]])))
+@pytest.mark.parametrize("min_samples", (1, 2))
+def test_tiny_inputs(positions, min_samples):
+    labels = cluster_labels(positions, EPS, min_samples)
+    assert len(labels) == len(positions)
+    assert get_cluster_count(positions, EPS, min_samples) == (len(positions) if min_samples == 1 else 0)
+
+
+@pytest.mark.parametrize("min_samples", (2, 4))
+def test_tracker_matches_fresh_counts(min_samples):
+    tracker = ClusterTracker(eps=2.0, min_samples=min_samples, every=2)
+    swarm = Swarm(60, speed=0.3, rng=np.random.default_rng(5), recorder=tracker)
+    frames = {0: swarm.positions.copy()}
+    for _ in range(40):
+        swarm.step()
+        frames[swarm.t] = swarm.positions.copy()
+    for _ in range(3):  # 位置不变：直接沿用
+        tracker.record(swarm.t + 2, swarm.positions)
+        frames[swarm.t + 2] = swarm.positions.copy()
+    steps, counts = tracker.curve()
+    assert steps.tolist() == sorted(frames)[::2][:21] + [swarm.t + 2] * 3
+    assert counts.tolist() == [get_cluster_count(frames[t], 2.0, min_samples) for t in steps]
+    assert tracker.rebuilds < 21 and tracker.reused == 3
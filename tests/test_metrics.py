@@ -0,0 +1,58 @@
+# 逐步指标：stream 的产出频率、Reducer 的 Welford 汇总、CSVSink 的输出
+import csv
+import math
+
+import numpy as np
+import pytest
+from q1_q2.swarm import Swarm as SwarmQ12
+from q3.swarm import Swarm as SwarmQ3
+from swarm_sim.metrics import FIELDS, CSVSink, Reducer, pump, stream
+
+
+def test_reducer_matches_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.normal(3, 2, 500)
+    reducer = Reducer(fields=("a", "b"))
+    for k, value in enumerate(values):
+        reducer.write({"a": value, "b": math.nan if k % 3 else value})  # NaN 跳过
+    summary = reducer.summary()
+    assert summary["a"]["count"] == 500
+    assert summary["a"]["mean"] == pytest.approx(values.mean(), rel=1e-12)
+    assert summary["a"]["std"] == pytest.approx(values.std(ddof=1), rel=1e-12)
+    assert (summary["a"]["min"], summary["a"]["max"]) == (values.min(), values.max())
+    assert summary["b"]["mean"] == pytest.approx(values[::3].mean(), rel=1e-12)
+    assert summary["b"]["count"] == len(values[::3])
+    assert Reducer(fields=("a",)).summary() == {}
+
+
+@pytest.mark.parametrize("Swarm", (SwarmQ12, SwarmQ3))
+def test_stream_every_k_steps(Swarm):
+    swarm = Swarm(20, rng=np.random.default_rng(2))
+    records = list(stream(swarm, 20, every=5, cluster_every=10))
+    assert [r["step"] for r in records] == [0, 5, 10, 15, 20]
+    assert swarm.t == 20
+    clusters = [r["clusters"] for r in records]
+    assert not math.isnan(clusters[0]) and not math.isnan(clusters[2]) and math.isnan(clusters[1])
+    assert all(set(r) == set(FIELDS) for r in records)
+    assert math.isnan(records[-1]["messages"]) == (Swarm is SwarmQ12)
+
+
+def test_stream_stops_at_convergence():
+    swarm = SwarmQ3(20, rng=np.random.default_rng(3))
+    steps, converged = SwarmQ3(20, rng=np.random.default_rng(3)).run(300, thresh=5.0)
+    assert converged
+    records = list(stream(swarm, 300, every=1000, thresh=5.0))
+    assert [r["step"] for r in records] == [0, steps]  # 收敛的那一步总会产出
+    assert records[-1]["converged"] and records[-1]["max_radius"] < 5.0
+
+
+def test_csv_sink(tmp_path):
+    path = tmp_path / "run.csv"
+    reducer = Reducer()
+    last = pump(stream(SwarmQ3(15, rng=np.random.default_rng(4)), 12, every=3), CSVSink(path, flush_every=2), reducer)
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == list(FIELDS)
+    assert [int(r["step"]) for r in rows] == [0, 3, 6, 9, 12]
+    assert float(rows[-1]["max_radius"]) == pytest.approx(last["max_radius"])
+    assert reducer.last is last and reducer.count["max_radius"] == 5
@@ -0,0 +1,64 @@
+# swarm_sim.parity 的检查函数：返回 None 表示逐位一致，否则是第一个不一致的 step
+import numpy as np
+import pytest
+from q3.swarm import Swarm as SwarmQ3
+from swarm_sim import parity
+from swarm_sim.engine import UPDATES
+from swarm_sim.world import MODES as WORLDS
+
+SEEDS = (0, 3)
+
+
+def _options(seed, num_agents):
+    rng = np.random.default_rng(seed)
+    return dict(speed_list=rng.uniform(0.2, 2.0, num_agents), perception_radius=float(rng.uniform(2, 40)),
+                communication_radius=float(rng.uniform(5, 60)))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("update", UPDATES)
+@pytest.mark.parametrize("world", WORLDS)
+@pytest.mark.parametrize("strategy", parity.STRATEGIES)
+def test_q1_q2(seed, strategy, world, update):
+    assert parity.check_q1_q2(seed, 30, 30, strategy, world=world, update=update) is None
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("update", UPDATES)
+@pytest.mark.parametrize("world", WORLDS)
+@pytest.mark.parametrize("neighbors", parity.NEIGHBORS)
+def test_q3(seed, neighbors, world, update):
+    options = _options(seed, 40)
+    assert parity.check_q3(seed, 40, 20, "between", neighbors, world=world, update=update, **options) is None
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("update", UPDATES)
+@pytest.mark.parametrize("world", WORLDS)
+@pytest.mark.parametrize("strategy", parity.STRATEGIES)
+def test_neighbor_modes(seed, strategy, world, update):
+    options = _options(seed, 40)
+    assert parity.check_neighbor_modes(seed, 40, 20, strategy, world=world, update=update, **options) is None
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("world", WORLDS)
+@pytest.mark.parametrize("strategy", parity.STRATEGIES)
+def test_order_independence(seed, strategy, world):
+    assert parity.check_order_independence(seed, 30, 20, strategy, world) is None
+
+
+@pytest.mark.parametrize("backend", ("numpy", "numba"))
+@pytest.mark.parametrize("world", WORLDS)
+@pytest.mark.parametrize("strategy", parity.STRATEGIES)
+def test_threads(strategy, world, backend):
+    options = _options(1, 60)
+    assert parity.check_threads(1, 60, 15, strategy, world=world, backend=backend, **options) is None
+
+
+def test_close_shuts_down_thread_pool():
+    with SwarmQ3(20, rng=np.random.default_rng(0), update="synchronous", threads=2, tiles=(2, 1)) as swarm:
+        swarm.step()
+        pool = swarm._tiled.pool
+    assert pool._shutdown
+    SwarmQ3(5, rng=np.random.default_rng(0)).close()  # 没有线程池也可以 close
@@ -0,0 +1,35 @@
+# 分阶段计时：开启后各阶段都有记录，且不改变模拟结果
+import numpy as np
+import pytest
+from q3.swarm import Swarm
+from swarm_sim.engine import UPDATES
+from swarm_sim.profiling import StepProfiler
+
+PHASES = {"broadcast", "neighbor_query", "delivery", "selection", "movement", "convergence"}
+
+
+@pytest.mark.parametrize("update", UPDATES)
+@pytest.mark.parametrize("neighbors", ("brute", "grid"))
+def test_profiled_run_reports_every_phase(update, neighbors):
+    plain = Swarm(40, rng=np.random.default_rng(2), update=update, neighbors=neighbors)
+    profiler = StepProfiler()
+    profiled = Swarm(40, rng=np.random.default_rng(2), update=update, neighbors=neighbors, profiler=profiler)
+    assert plain.run(8, thresh=0.0) == profiled.run(8, thresh=0.0)
+    assert np.array_equal(plain.positions, profiled.positions)
+    assert np.array_equal(plain.targets, profiled.targets)
+
+    summary = profiler.summary()
+    assert summary["steps"] == 8
+    assert set(summary["phases"]) == PHASES
+    assert summary["counts"]["neighbor_pairs"]["max"] > 0
+    assert summary["counts"]["messages"]["max"] > 0
+    events = profiler.chrome_trace()["traceEvents"]
+    assert {event["name"] for event in events} == PHASES | {"step", "counts"}
+
+
+def test_max_steps_keeps_latest():
+    profiler = StepProfiler(max_steps=3)
+    swarm = Swarm(10, rng=np.random.default_rng(0), profiler=profiler)
+    for _ in range(5):
+        swarm.step()
+    assert [record["t"] for record in profiler.records] == [3, 4, 5]
@@ -0,0 +1,41 @@
+# 离线渲染：光栅化和 GIF 往返
+import numpy as np
+import pytest
+from swarm_sim.render import PALETTE, TEXT, convergence_titles, rasterize, render
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _trajectory(frames=6, n=5):
+    rng = np.random.default_rng(0)
+    start = rng.uniform(10, 90, (n, 2))
+    weights = np.linspace(0, 1, frames)[:, None, None]
+    return (start * (1 - weights) + 50 * weights).astype(np.float32)  # 逐步收拢到 (50, 50)
+
+
+def test_rasterize_places_points():
+    images = rasterize([[[0, 100], [100, 0], [np.nan, 5], [500, 500]]], width=21, height=11, radius=0)
+    assert images.shape == (1, 11, 21)
+    assert images[0, 0, 0] == 1 and images[0, 10, 20] == 1  # 左上 (0,100)、右下 (100,0)
+    assert images.sum() == 2  # NaN 和范围外的点不画
+
+
+def test_convergence_titles():
+    titles = convergence_titles(_trajectory())
+    assert titles[0] == "Step 0"
+    assert titles[-1] == "Converged at step 5"
+
+
+@pytest.mark.parametrize("titles", (None, convergence_titles))
+def test_gif_round_trip(tmp_path, titles):
+    path = str(tmp_path / "swarm.gif")
+    trajectory = _trajectory()
+    assert render(trajectory, path, fps=10, titles=titles, width=64, height=48) == path
+    with Image.open(path) as gif:
+        assert gif.size == (64, 48)
+        assert gif.n_frames == len(trajectory)
+        gif.seek(len(trajectory) - 1)
+        last = np.asarray(gif.convert("RGB"))
+    colors = {tuple(c) for c in last.reshape(-1, 3)}
+    assert tuple(PALETTE[1]) in colors
+    assert (tuple(PALETTE[TEXT]) in colors) == (titles is not None)
@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+import pytest
+from swarm_sim.results import ResultStore, aggregate, group_by, series, series_by
+
+
+def _store(n=600):
+    rng = np.random.default_rng(0)
+    tasks = [(dict(strategy=("between", "behind")[i % 2], perception_radius=(10, 20, 30)[i % 3]), i % 5, i % 4)
+             for i in range(n)]
+    results = [(int(rng.integers(0, 300)), bool(rng.random() < 0.5), int(rng.integers(1, 5))) for _ in range(n)]
+    store = ResultStore()
+    store.extend(tasks, results, list(rng.random(n)))
+    return store
+
+
+def test_aggregate_matches_numpy():
+    store = _store()
+    table = store.table()
+    agg = store.aggregate(("strategy", "perception_radius"))
+    assert len(agg) == 6
+    assert (agg == aggregate(table, ("strategy", "perception_radius"))).all()
+    for row in agg:
+        mask = (table["strategy"] == row["strategy"]) & (table["perception_radius"] == row["perception_radius"])
+        steps = table["steps"][mask]
+        assert row["steps_count"] == len(steps)
+        assert row["steps_mean"] == pytest.approx(np.mean(steps))
+        assert row["steps_std"] == pytest.approx(np.std(steps))
+        assert (row["steps_min"], row["steps_max"]) == (steps.min(), steps.max())
+        assert row["converged_mean"] == pytest.approx(np.mean(table["converged"][mask]))
+
+
+def test_group_keys_sorted():
+    keys, inverse = group_by(_store().table(), ("strategy", "perception_radius"))
+    assert list(keys["strategy"]) == ["behind"] * 3 + ["between"] * 3
+    assert list(keys["perception_radius"]) == [10, 20, 30] * 2
+    assert inverse.max() == 5
+
+
+def test_series_for_plots():
+    agg = _store().aggregate(("strategy", "perception_radius"))
+    x, mean, std = series(agg, "perception_radius", "steps", strategy="between")
+    assert list(x) == [10, 20, 30] and len(mean) == len(std) == 3
+    names, means, stds = series_by(agg, "strategy", "perception_radius", "clusters")
+    assert names == ["behind", "between"]
+    assert set(means) == set(stds) == set(names)
+
+
+def test_missing_columns_and_nan():
+    store = ResultStore(("converged", "clusters"))
+    store.add(dict(perception_radius=10), 0, 0, (True, 2))
+    store.add(dict(perception_radius=20, hetero_speed=True), 0, 0, (False, 3), 0.5)
+    columns = store.columns()
+    assert math.isnan(columns["hetero_speed"][0]) and columns["hetero_speed"][1] == 1
+    agg = store.aggregate("perception_radius", ("clusters", "wall_time"))
+    assert agg["wall_time_count"].tolist() == [0, 1]
+    assert math.isnan(agg["wall_time_mean"][0]) and math.isnan(agg["wall_time_min"][0])
+
+
+def test_save_load_roundtrip(tmp_path):
+    store = _store()
+    store.save(tmp_path / "results.npz")
+    loaded = ResultStore.load(tmp_path / "results.npz")
+    assert loaded.fields == store.fields
+    assert loaded.table().dtype == store.table().dtype
+    assert (loaded.table() == store.table()).all()
+
+
+def test_append_invalidates_cache():
+    store = _store(60)
+    before = store.aggregate("strategy")
+    store.append(_store(60))
+    assert (store.aggregate("strategy")["steps_count"] == 2 * before["steps_count"]).all()
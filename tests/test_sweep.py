@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+import pytest
+from swarm_sim.cache import ResultCache
+from swarm_sim.checkpoint import SweepLog
+from swarm_sim.results import ResultStore
+from swarm_sim.schedule import CostModel, run_adaptive_sweep
+from swarm_sim.sweep import run_batched_sweep, run_sweep, task_rng
+
+CELLS = [dict(x=1), dict(x=2)]
+SEEDS = [0, 1]
+
+
+def toy(rng=None, x=0):
+    """run_once 风格的结果 (steps, converged, clusters)"""
+    return int(rng.integers(100)) + x, bool(x % 2), x
+
+
+def toy_batch(rngs=None, x=0):
+    return [toy(rng, x) for rng in rngs]
+
+
+def expected(trials=2):
+    return [[toy(task_rng(seed, t), **cell) for seed in SEEDS for t in range(trials)] for cell in CELLS]
+
+
+@pytest.fixture(params=["cache", "checkpoint"])
+def persisted(request, tmp_path):
+    """sweep 的 cache= 或 checkpoint= 参数"""
+    if request.param == "cache":
+        return {"cache": ResultCache(tmp_path / "cache.sqlite", version="test")}
+    return {"checkpoint": SweepLog(tmp_path / "log.jsonl")}
+
+
+@pytest.mark.parametrize("runner, fn", [(run_sweep, toy), (run_batched_sweep, toy_batch)])
+@pytest.mark.parametrize("with_store", [False, True])
+def test_persisted_sweep_with_and_without_store(persisted, runner, fn, with_store):
+    store = ResultStore() if with_store else None
+    assert runner(fn, CELLS, SEEDS, trials=2, workers=1, store=store, **persisted) == expected()
+    # 第二次全部命中缓存 / 日志，结果不变，store 里的耗时是 NaN
+    again = ResultStore() if with_store else None
+    assert runner(fn, CELLS, SEEDS, trials=2, workers=1, store=again, **persisted) == expected()
+    if with_store:
+        assert len(store) == len(again) == 8
+        assert not np.isnan(store.columns()["wall_time"]).any()
+        assert np.isnan(again.columns()["wall_time"]).all()
+
+
+def test_adaptive_sweep_with_cache_and_store(tmp_path):
+    store = ResultStore()
+    cache = ResultCache(tmp_path / "cache.sqlite", version="test")
+    results = run_adaptive_sweep(toy, CELLS, SEEDS, trials=3, workers=1, cache=cache, store=store,
+                                 min_repeats=2, cost_model=CostModel(toy))
+    assert len(store) == sum(len(r) for r in results)
+
+
+def test_store_columns_match_results():
+    store = ResultStore()
+    results = run_sweep(toy, CELLS, SEEDS, trials=2, workers=1, store=store)
+    columns = store.columns()
+    assert list(columns["steps"]) == [r[0] for cell in results for r in cell]
+    assert list(columns["x"]) == [1] * 4 + [2] * 4
+    assert columns["converged"].dtype == bool
+    assert not any(math.isnan(t) for t in columns["wall_time"])
+
+
+def toy_speeds(rng=None, speeds=(0.5,), x=0):
+    return float(np.mean(speeds)) + x, True, 1
+
+
+def test_cost_model_accepts_list_params():
+    cells = [dict(speeds=[0.3, 0.7], x=1), dict(speeds=np.array([0.5, 0.5]), x=2)]
+    cost_model = CostModel(toy_speeds)
+    assert run_sweep(toy_speeds, cells, SEEDS, workers=1, cost_model=cost_model)[0][0] == (1.5, True, 1)
+    assert cost_model.predict(cells[1]) == cost_model.predict(dict(speeds=[0.5, 0.5], x=2.0))
+    assert len(cost_model.times) == 2
+    batch_cells = [dict(x=1, y=[1, 2])]
+    run_batched_sweep(toy_batch_y, batch_cells, SEEDS, workers=1, cost_model=CostModel(toy_batch_y))
+
+
+def toy_batch_y(rngs=None, x=0, y=()):
+    return [toy(rng, x) for rng in rngs]
@@ -0,0 +1,41 @@
+# synchronous 更新：所有 agent 只读本步开始时的位置，双缓冲交替
+import numpy as np
+import pytest
+from q1_q2.swarm import Swarm as SwarmQ12
+from q3.swarm import Swarm as SwarmQ3
+from swarm_sim.engine import move_rows, move_synchronous
+from swarm_sim.world import MODES, World
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_each_row_reads_start_positions(mode):
+    rng = np.random.default_rng(0)
+    world = World(mode)
+    read = (rng.random((12, 2)) * 100).astype(np.float32)
+    speeds = rng.uniform(0.5, 3, 12).astype(np.float32)
+    targets = np.stack([rng.permutation(12)[:2] for _ in range(12)])
+    targets[3] = -1  # 没有目标的 agent 不动
+    start = read.copy()
+    write = np.empty_like(read)
+    move_synchronous(read, write, speeds, targets, "between", world)
+    assert np.array_equal(read, start)
+    for i in range(12):
+        alone = start.copy()
+        move_rows(alone, speeds, targets, [i], "between", world=world)
+        assert np.array_equal(write[i], alone[i])
+    assert np.array_equal(write[3], start[3])
+
+
+@pytest.mark.parametrize("Swarm", (SwarmQ12, SwarmQ3))
+def test_swarm_step_swaps_buffers(Swarm):
+    swarm = Swarm(20, rng=np.random.default_rng(1), update="synchronous")
+    first = swarm.positions
+    before = first.copy()
+    swarm.step("between")
+    second = swarm.positions
+    assert second is not first
+    expected = np.empty_like(before)
+    move_synchronous(before, expected, swarm.speeds, swarm.targets, "between", swarm.world)
+    assert np.array_equal(second, expected)
+    swarm.step("between")
+    assert swarm.positions is first  # 两块缓冲轮流使用，不再分配
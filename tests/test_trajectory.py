@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from q1_q2.swarm import Swarm
+from swarm_sim.recorder import TrajectoryRecorder
+from swarm_sim.trajectory import TrajectoryReader, TrajectoryWriter
+
+
+def _record(path, dtype, steps=70, chunk_frames=16):
+    num_agents = 20
+    recorder = TrajectoryRecorder(num_agents, capacity=steps + 1)
+    with TrajectoryWriter(path, num_agents, dtype=dtype, chunk_frames=chunk_frames,
+                          params={"perception_radius": 30}, seed=7) as writer:
+        swarm = Swarm(num_agents, rng=np.random.default_rng(7), recorder=recorder)
+        writer.record(0, swarm.positions)
+        for t in range(1, steps + 1):
+            swarm.step("between")
+            writer.record(t, swarm.positions)
+    return recorder.frames()
+
+
+def test_float32_roundtrip(tmp_path):
+    expected = _record(tmp_path / "run.traj", "float32")
+    reader = TrajectoryReader(tmp_path / "run.traj")
+    assert len(reader) == len(expected)
+    assert reader.params == {"perception_radius": 30} and reader.seed == 7
+    assert np.array_equal(reader.frames(), expected)
+    assert np.array_equal(reader[-1], expected[-1])
+    assert np.array_equal(reader[10:40:3], expected[10:40:3])
+    assert list(reader.steps) == list(range(len(expected)))
+
+
+def test_int16_quantized(tmp_path):
+    expected = _record(tmp_path / "run.traj", "int16")
+    reader = TrajectoryReader(tmp_path / "run.traj")
+    span = float(expected.max() - expected.min())
+    assert np.abs(reader.frames() - expected).max() <= span / 65534 + 1e-4
+
+
+def test_unclosed_writer_rejected(tmp_path):
+    writer = TrajectoryWriter(tmp_path / "run.traj", 5)
+    writer.record(0, np.zeros((5, 2), np.float32))
+    writer._file.flush()
+    with pytest.raises(ValueError):
+        TrajectoryReader(tmp_path / "run.traj")
+    writer.close()
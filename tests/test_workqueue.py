@@ -0,0 +1,103 @@
+# 本机起 worker 进程代替多台机器；toy / broken 由 worker 按文件路径 import
+import os
+import time
+
+import pytest
+from swarm_sim.sweep import run_sweep
+from swarm_sim.workqueue import FileQueue, run_distributed_sweep
+
+CELLS = [dict(x=1), dict(x=2)]
+
+
+def toy(rng=None, x=0):
+    return float(rng.random()) + x
+
+
+def broken(rng=None, x=0):
+    raise ValueError("boom")
+
+
+def test_distributed_matches_local(tmp_path):
+    queue_dir = tmp_path / "queue"
+    expected = run_sweep(toy, CELLS, [0, 1], workers=1)
+    options = dict(local_workers=2, poll=0.05)
+    assert run_distributed_sweep(toy, CELLS, [0, 1], queue_dir=queue_dir, **options) == expected
+    # 结果已经在队列目录里，重跑不需要 worker
+    assert run_distributed_sweep(toy, CELLS, [0, 1], queue_dir=queue_dir, local_workers=0) == expected
+
+
+def test_failures_stop_after_max_attempts(tmp_path):
+    with pytest.raises(RuntimeError, match="boom"):
+        run_distributed_sweep(broken, CELLS[:1], [0], queue_dir=tmp_path / "queue", local_workers=1,
+                              max_attempts=2, poll=0.05)
+
+
+def test_claim_is_exclusive(tmp_path):
+    queue = FileQueue(tmp_path, lease_timeout=60)
+    assert queue.claim("k", "a")
+    assert not queue.claim("k", "b")
+
+
+def test_stale_lease_taken_over(tmp_path):
+    queue = FileQueue(tmp_path, lease_timeout=1)
+    assert queue.claim("k", "a")
+    lease = tmp_path / "leases" / "k"
+    old = time.time() - 10
+    os.utime(lease, (old, old))
+    assert queue.claim("k", "b")
+    assert lease.read_text() == "b"
+    assert not queue.claim("k", "c")  # 刚抢到的租约是新的
+    assert sorted(os.listdir(tmp_path / "leases")) == ["k"]
+
+
+def test_stale_takeover_race(tmp_path, monkeypatch):
+    # c 判定租约过期后、rename 之前，b 已经抢到了新租约：c 必须把 b 的租约放回去并放弃
+    queue = FileQueue(tmp_path, lease_timeout=1)
+    assert queue.claim("k", "a")
+    lease = tmp_path / "leases" / "k"
+    old = time.time() - 10
+    os.utime(lease, (old, old))
+    rename = os.rename
+
+    def racing_rename(src, dst):
+        monkeypatch.setattr(os, "rename", rename)
+        assert queue.claim("k", "b")
+        rename(src, dst)
+
+    monkeypatch.setattr(os, "rename", racing_rename)
+    assert not queue.claim("k", "c")
+    assert lease.read_text() == "b"
+    assert sorted(os.listdir(tmp_path / "leases")) == ["k"]
+
+
+def test_finished_worker_keeps_new_owners_lease(tmp_path):
+    queue = FileQueue(tmp_path, lease_timeout=60)
+    key, = queue.publish([(toy, CELLS[0], 0, 0)])
+    name, claimed = queue._next("a")
+    assert claimed == key
+    lease = tmp_path / "leases" / key
+    lease.write_text("b")  # a 的租约超时后被 b 抢走
+    queue.run_one(name, key, "a")
+    assert (tmp_path / "results" / f"{key}.pkl").exists()
+    assert lease.read_text() == "b"
+    queue._release(lease, "b")
+    assert not lease.exists()
+
+
+def test_failures_counted_per_key(tmp_path):
+    queue = FileQueue(tmp_path)
+    for name in ("k1.a.1.txt", "k1.b.2.txt", "k2.a.3.txt"):
+        (tmp_path / "errors" / name).write_text("boom")
+    failures = queue.failures()
+    assert (failures["k1"], failures["k2"], failures["k3"]) == (2, 1, 0)
+
+
+def test_distributed_sweep_fills_store(tmp_path):
+    from swarm_sim.results import ResultStore
+
+    store = ResultStore(("value",))
+    results = run_distributed_sweep(toy, CELLS, [0, 1], queue_dir=tmp_path / "queue", local_workers=1,
+                                    poll=0.05, store=store)
+    assert len(store) == 4
+    assert store.columns()["value"].tolist() == [value for cell in results for value in cell]
+    assert (store.columns()["wall_time"] >= 0).all()
@@ -0,0 +1,56 @@
+# 世界边界：最近镜像、越界处理和跨边界的收敛检测
+import numpy as np
+import pytest
+from q3.swarm import Swarm
+from swarm_sim.convergence import measure
+from swarm_sim.world import MODES, World
+
+f32 = np.float32
+
+
+def test_wrap_delta():
+    delta = np.array([60, -60, 50, -50, 10, -99.5], dtype=f32)
+    assert np.array_equal(World("open").wrap_delta(delta), delta)
+    assert np.array_equal(World("reflect").wrap_delta(delta), delta)
+    wrapped = World("periodic").wrap_delta(delta)
+    assert wrapped.dtype == f32
+    assert wrapped.tolist() == [-40, 40, 50, -50, 10, 0.5]  # 正好半个边长时保持原样
+
+
+def test_confine_reflect():
+    positions = np.array([[-3, 50], [103, 100], [0, 101.5]], dtype=f32)
+    World("reflect").confine(positions)
+    assert positions.tolist() == [[3, 50], [97, 100], [0, 98.5]]
+
+
+def test_confine_periodic():
+    positions = np.array([[-3, 50], [103, 100], [f32(-1e-6), 99.99]], dtype=f32)
+    World("periodic").confine(positions)
+    assert positions[:2].tolist() == [[97, 50], [3, 0]]
+    assert 0 <= positions[2, 0] < 100  # -1e-6 + 100 在 float32 里舍入成 100，也要落回 [0, size)
+    assert positions.dtype == f32
+
+
+def test_confine_rows_only():
+    positions = np.array([[-3, 50], [-3, 50]], dtype=f32)
+    World("reflect").confine(positions, rows=[1])
+    assert positions.tolist() == [[-3, 50], [3, 50]]
+
+
+def test_unwrap_across_boundary():
+    world = World("periodic")
+    positions = np.array([[99, 50], [1, 50], [0.5, 51], [99.5, 49]], dtype=f32)
+    assert measure(positions)[0] > 40
+    assert measure(world.unwrap(positions))[0] < 2
+    assert world.unwrap(positions[:0]).shape == (0, 2)
+    assert World("reflect").unwrap(positions) is positions
+
+
+@pytest.mark.parametrize("mode", MODES[1:])
+def test_swarm_stays_inside(mode):
+    swarm = Swarm(40, speed=3.0, rng=np.random.default_rng(0), world=mode)
+    for _ in range(50):
+        swarm.step("behind")
+        assert ((swarm.positions >= 0) & (swarm.positions <= 100)).all()
+        if mode == "periodic":
+            assert (swarm.positions < 100).all()